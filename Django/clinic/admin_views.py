@@ -10,6 +10,7 @@ from django.utils import timezone
 from django.conf import settings
 from datetime import timedelta
 from clinic.models import AuditLog, CustomUser, SymptomRecord, ChatSession
+from clinic import llm_breaker, llm_cache, llm_coalesce, llm_metrics, llm_ratelimit
 import os
 
 
@@ -89,6 +90,13 @@ def backend_monitoring_dashboard(request):
         }
     }
     
+    # Circuit breakers shared by all workers (clinic/llm_breaker.py)
+    llm_circuits = llm_breaker.snapshot()
+    open_circuits = [c['provider'] for c in llm_circuits if c['state'] != 'closed']
+    llm_rate_limits = llm_ratelimit.snapshot()
+    llm_cache_stats = llm_cache.stats()
+    llm_coalesce_stats = llm_coalesce.stats()
+    
     # System Health Indicators
     health_checks = {
         'Database': {
@@ -102,6 +110,10 @@ def backend_monitoring_dashboard(request):
         'LLM Providers': {
             'status': 'healthy' if any(p['configured'] for p in llm_providers.values()) else 'warning',
             'details': f"{sum(1 for p in llm_providers.values() if p['configured'])}/4 configured"
+        },
+        'LLM Circuits': {
+            'status': 'warning' if open_circuits else 'healthy',
+            'details': f"Open: {', '.join(open_circuits)}" if open_circuits else 'All closed'
         }
     }
     
@@ -124,6 +136,10 @@ def backend_monitoring_dashboard(request):
         
         # LLM & Health
         'llm_providers': llm_providers,
+        'llm_circuits': llm_circuits,
+        'llm_rate_limits': llm_rate_limits,
+        'llm_cache_stats': llm_cache_stats,
+        'llm_coalesce_stats': llm_coalesce_stats,
         'health_checks': health_checks,
         
         # Meta
@@ -280,12 +296,14 @@ def admin_api_analytics_page(request):
     ).order_by('-count')[:10]
     
     # Error breakdown
-    error_breakdown = AuditLog.objects.filter(
+    error_breakdown = list(AuditLog.objects.filter(
         success=False,
         timestamp__gte=last_30d
     ).values('error_message').annotate(
         count=Count('id')
-    ).order_by('-count')[:8]
+    ).order_by('-count')[:8])
+    for error in error_breakdown:
+        error['percentage'] = round(error['count'] * 100 / metrics_30d['failed'], 1) if metrics_30d['failed'] else None
     
     # Recent errors
     recent_errors = AuditLog.objects.filter(
@@ -293,12 +311,17 @@ def admin_api_analytics_page(request):
         timestamp__gte=last_7d
     ).order_by('-timestamp')[:10]
     
+    # LLM provider latency percentiles; this worker's buffered calls are written first
+    llm_metrics.flush()
+    
     context = {
         'metrics_7d': metrics_7d,
         'metrics_30d': metrics_30d,
         'top_endpoints': top_endpoints,
         'error_breakdown': error_breakdown,
         'recent_errors': recent_errors,
+        'llm_providers': llm_metrics.provider_summary(days=7),
+        'llm_recent_calls': llm_metrics.recent(limit=20),
         'last_updated': now,
     }
     
@@ -0,0 +1,44 @@
+"""
+Cache backends
+AtomicDatabaseCache is Django's DatabaseCache with an incr() that holds the
+row lock while it adds, so workers counting the same key (circuit breaker and
+rate limit counters, see llm_breaker / llm_ratelimit) never lose each other's
+updates. Django's own incr() is a get() followed by a set().
+"""
+
+import base64
+import pickle
+
+from django.core.cache.backends.db import DatabaseCache
+from django.db import connections, router, transaction
+from django.utils.timezone import now as tz_now
+
+
+class AtomicDatabaseCache(DatabaseCache):
+    """DatabaseCache whose incr() / decr() are atomic across processes"""
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        db = router.db_for_write(self.cache_model_class)
+        connection = connections[db]
+        quote_name = connection.ops.quote_name
+        table = quote_name(self._table)
+        lock = ' FOR UPDATE' if connection.features.has_select_for_update else ''
+        now = connection.ops.adapt_datetimefield_value(tz_now().replace(microsecond=0))
+
+        with transaction.atomic(using=db):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT {quote_name('value')} FROM {table} "
+                    f"WHERE {quote_name('cache_key')} = %s AND {quote_name('expires')} >= %s{lock}",
+                    [key, now],
+                )
+                row = cursor.fetchone()
+                if row is None:
+                    raise ValueError(f"Key '{key}' not found")
+                value = pickle.loads(base64.b64decode(connection.ops.process_clob(row[0]).encode())) + delta
+                cursor.execute(
+                    f"UPDATE {table} SET {quote_name('value')} = %s WHERE {quote_name('cache_key')} = %s",
+                    [base64.b64encode(pickle.dumps(value, self.pickle_protocol)).decode('latin1'), key],
+                )
+        return value
@@ -0,0 +1,138 @@
+"""
+Disease metadata for ML predictions
+Compiles symptom severity weights, disease descriptions and precautions (from the
+Kaggle CSVs in ML_DATASETS_PATH) together with the communicable / chronic / ICD-10
+classification into one JSON artifact. Serving reads it with the stdlib json
+module - pandas is only used by the training scripts.
+
+Build the artifact after the datasets change:
+    python manage.py compile_disease_metadata
+"""
+
+import csv
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Tuple
+
+from django.conf import settings
+
+
+COMMUNICABLE_KEYWORDS = (
+    'common cold', 'flu', 'tuberculosis', 'pneumonia', 'covid-19',
+    'malaria', 'dengue', 'typhoid', 'hepatitis', 'chickenpox',
+    'measles', 'mumps', 'influenza',
+)
+
+CHRONIC_KEYWORDS = (
+    'diabetes', 'hypertension', 'asthma', 'arthritis', 'chronic',
+    'migraine', 'allergy', 'gerd', 'osteoporosis',
+)
+
+# Simplified mapping, first matching keyword wins
+ICD10_CODES = (
+    ('common cold', 'J00'),
+    ('influenza', 'J11'),
+    ('pneumonia', 'J18'),
+    ('diabetes', 'E11'),
+    ('hypertension', 'I10'),
+    ('asthma', 'J45'),
+    ('migraine', 'G43'),
+    ('dengue', 'A90'),
+    ('typhoid', 'A01'),
+    ('malaria', 'B54'),
+)
+
+SOURCE_FILES = ('Symptom-severity.csv', 'symptom_Description.csv', 'symptom_precaution.csv')
+
+
+def metadata_path() -> Path:
+    """Location of the compiled artifact (ML_METADATA_PATH, default: in ML_DATASETS_PATH)"""
+    return Path(getattr(settings, 'ML_METADATA_PATH', None) or settings.ML_DATASETS_PATH / 'disease_metadata.json')
+
+
+def classify_disease(disease: str) -> Tuple[bool, bool, str]:
+    """Keyword classification of a disease name: (is_communicable, is_acute, icd10_code)"""
+    name = disease.lower()
+    communicable = any(keyword in name for keyword in COMMUNICABLE_KEYWORDS)
+    acute = not any(keyword in name for keyword in CHRONIC_KEYWORDS)
+    icd10 = next((code for keyword, code in ICD10_CODES if keyword in name), '')
+    return communicable, acute, icd10
+
+
+def _read_rows(path: Path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def read_datasets(datasets_path: Path) -> Dict:
+    """Build the metadata dict straight from the CSVs (missing files are skipped)"""
+    severity, descriptions, precautions = {}, {}, {}
+
+    severity_path = datasets_path / 'Symptom-severity.csv'
+    if severity_path.exists():
+        severity = {row['Symptom']: int(row['weight']) for row in _read_rows(severity_path)}
+
+    desc_path = datasets_path / 'symptom_Description.csv'
+    if desc_path.exists():
+        descriptions = {row['Disease']: row['Description'] for row in _read_rows(desc_path)}
+
+    precaution_path = datasets_path / 'symptom_precaution.csv'
+    if precaution_path.exists():
+        for row in _read_rows(precaution_path):
+            precautions[row['Disease']] = [
+                row[f'Precaution_{i}'] for i in range(1, 5) if row.get(f'Precaution_{i}')
+            ]
+
+    diseases = {}
+    for disease in list(descriptions) + [d for d in precautions if d not in descriptions]:
+        communicable, acute, icd10 = classify_disease(disease)
+        diseases[disease] = {
+            'description': descriptions.get(disease, ''),
+            'precautions': precautions.get(disease, []),
+            'communicable': communicable,
+            'acute': acute,
+            'icd10': icd10,
+        }
+
+    return {'sources': _source_checksums(datasets_path), 'severity': severity, 'diseases': diseases}
+
+
+def _source_checksums(datasets_path: Path) -> Dict[str, str]:
+    """sha256 of each source CSV present, so a stale artifact can be detected"""
+    return {
+        name: hashlib.sha256((datasets_path / name).read_bytes()).hexdigest()
+        for name in SOURCE_FILES
+        if (datasets_path / name).exists()
+    }
+
+
+def compile_metadata(datasets_path: Path = None, output_path: Path = None) -> Path:
+    """Write the compiled artifact (atomically) and return its path"""
+    datasets_path = Path(datasets_path or settings.ML_DATASETS_PATH)
+    output_path = Path(output_path or metadata_path())
+
+    tmp_path = output_path.with_name(f'.{output_path.name}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(read_datasets(datasets_path), f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def load_metadata(datasets_path: Path = None) -> Dict:
+    """
+    Load the compiled metadata; falls back to parsing the CSVs (stdlib csv)
+    if the artifact is missing or was compiled from different CSVs.
+    """
+    datasets_path = Path(datasets_path or settings.ML_DATASETS_PATH)
+    artifact = metadata_path()
+
+    if artifact.exists():
+        with open(artifact, encoding='utf-8') as f:
+            metadata = json.load(f)
+        if metadata.get('sources') == _source_checksums(datasets_path):
+            return metadata
+        print(f"[WARNING] {artifact} does not match the datasets - run manage.py compile_disease_metadata")
+
+    return read_datasets(datasets_path)
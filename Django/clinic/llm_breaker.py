@@ -0,0 +1,173 @@
+"""
+Circuit breakers for LLM providers
+State lives in the 'llm_state' cache (settings.CACHES: a table shared by every
+worker, or Redis), so when one worker sees a provider fail, every worker skips
+it instead of paying its timeout too. Every update is a single atomic cache
+operation (add / incr, see cache_backends), so a call costs two cache round
+trips.
+
+    closed     calls go through; calls and failures are counted per
+               LLM_CIRCUIT_WINDOW-second window, and calls slower than
+               LLM_CIRCUIT_SLOW_CALL count as failures
+    open       the provider is skipped until its cooldown has passed
+    half_open  one worker sends a probe: success closes the circuit, failure reopens it
+
+The breaker fails open: if the cache cannot be used, every provider is allowed.
+"""
+
+import logging
+import time
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+def enabled() -> bool:
+    return _setting('LLM_CIRCUIT_BREAKER_ENABLED', True)
+
+
+def state_cache():
+    """The cache shared by the workers for breaker and rate limit state"""
+    return caches['llm_state']
+
+
+def incr(cache, key: str, delta: int = 1, timeout: Optional[float] = None) -> int:
+    """Atomically add `delta` to a counter, creating it (with `timeout`) if missing"""
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        if cache.add(key, delta, timeout=timeout):
+            return delta
+        return cache.incr(key, delta)
+
+
+def _key(provider: str, name: str) -> str:
+    # open       set while the cooldown runs (expires with it), holds the retry time
+    # tripped    set from opening until a probe succeeds
+    # probe      taken by the worker sending the half-open probe
+    return f'llm:circuit:{provider}:{name}'
+
+
+def allowed_providers(providers: Iterable[str]) -> List[str]:
+    """The providers a call may use right now, in the given order (one cache read)"""
+    providers = list(providers)
+    if not enabled() or not providers:
+        return providers
+    try:
+        cache = state_cache()
+        found = cache.get_many([_key(p, name) for p in providers for name in ('open', 'tripped')])
+        return [p for p in providers
+                if _allow(cache, p, _key(p, 'open') in found, _key(p, 'tripped') in found)]
+    except Exception as e:
+        logger.warning(f"Circuit breaker store unavailable, allowing all providers: {e}")
+        return providers
+
+
+def _allow(cache, provider: str, is_open: bool, tripped: bool) -> bool:
+    if is_open:
+        return False
+    if not tripped:
+        return True
+    # Cooldown over: only the worker that adds the probe key sends the probe;
+    # the key expires if that probe never reports back
+    return cache.add(_key(provider, 'probe'), True, timeout=2 * _setting('LLM_PROVIDER_TIMEOUT', 30))
+
+
+def record(provider: str, ok: bool, latency: float, error: str = '', cooldown: Optional[int] = None):
+    """
+    Report the outcome of one provider call.
+
+    Args:
+        cooldown: open the circuit right away for this many seconds
+            (errors that retrying soon cannot fix, e.g. an invalid key)
+    """
+    if not enabled():
+        return
+    failed = not ok or latency > _setting('LLM_CIRCUIT_SLOW_CALL', 15)
+    if not error and ok and failed:
+        error = f'slow call ({latency:.1f}s)'
+    try:
+        _record(state_cache(), provider, failed, error[:255], cooldown)
+    except Exception as e:
+        logger.warning(f"Could not record {provider} circuit outcome: {e}")
+
+
+def _record(cache, provider: str, failed: bool, error: str, cooldown: Optional[int]):
+    if cooldown:
+        _trip(cache, provider, cooldown, error)
+        return
+
+    state = cache.get_many([_key(provider, 'open'), _key(provider, 'tripped')])
+    if _key(provider, 'tripped') in state:
+        # Probe result (or a call that started before the circuit opened)
+        if not failed:
+            cache.delete_many([_key(provider, name) for name in ('open', 'tripped', 'probe')])
+            logger.info(f"Circuit for {provider} closed")
+        elif _key(provider, 'open') not in state:
+            _trip(cache, provider, _setting('LLM_CIRCUIT_COOLDOWN', 60), error)
+        return
+
+    window = _setting('LLM_CIRCUIT_WINDOW', 60)
+    current = int(time.time() // window)
+    calls = incr(cache, _key(provider, f'calls:{current}'), timeout=2 * window)
+    if not failed:
+        return
+    failures = incr(cache, _key(provider, f'failures:{current}'), timeout=2 * window)
+    cache.set(_key(provider, 'last_error'), error, timeout=None)
+
+    min_calls = _setting('LLM_CIRCUIT_MIN_CALLS', 5)
+    threshold = _setting('LLM_CIRCUIT_ERROR_RATE', 0.5)
+    # Only the worker that marks the circuit tripped opens it
+    if calls >= min_calls and failures / calls >= threshold and \
+            cache.add(_key(provider, 'tripped'), True, timeout=None):
+        _trip(cache, provider, _setting('LLM_CIRCUIT_COOLDOWN', 60), error)
+
+
+def _trip(cache, provider: str, cooldown: int, error: str):
+    cache.set(_key(provider, 'open'), time.time() + cooldown, timeout=cooldown)
+    cache.set_many({_key(provider, 'tripped'): True, _key(provider, 'last_error'): error}, timeout=None)
+    cache.delete(_key(provider, 'probe'))
+    incr(cache, _key(provider, 'trips'))
+    logger.warning(f"Circuit for {provider} opened for {cooldown}s: {error}")
+
+
+def snapshot() -> List[Dict]:
+    """Breaker state of every provider seen so far (for the monitoring dashboard)"""
+    from .llm_providers import registered
+
+    current = int(time.time() // _setting('LLM_CIRCUIT_WINDOW', 60))
+    names = ('open', 'tripped', 'trips', 'last_error', f'calls:{current}', f'failures:{current}')
+    try:
+        found = state_cache().get_many([_key(p, name) for p in registered() for name in names])
+    except Exception:
+        return []
+    rows = []
+    for provider in registered():
+        state = {name: found.get(_key(provider, name)) for name in names}
+        calls = state[f'calls:{current}'] or 0
+        failures = state[f'failures:{current}'] or 0
+        if not (calls or state['tripped'] or state['trips']):
+            continue
+        retry_in = None
+        if state['open'] is not None:
+            retry_in = max(0, int(state['open'] - time.time()))
+        rows.append({
+            'provider': provider,
+            'state': OPEN if state['open'] is not None else HALF_OPEN if state['tripped'] else CLOSED,
+            'calls': calls,
+            'failures': failures,
+            'error_rate': round(failures / calls, 2) if calls else 0.0,
+            'trip_count': state['trips'] or 0,
+            'retry_in': retry_in,
+            'last_error': state['last_error'] or '',
+        })
+    return rows
@@ -0,0 +1,151 @@
+"""
+Response cache for LLM results
+Near-identical complaints ("i have fever and headache" / "I have a fever &
+headache") map to the same fingerprint, so a repeated message is answered from
+the 'llm' cache (settings.CACHES) without a provider round-trip. The default
+backend is a file cache, shared by every worker on the host; entries expire
+after LLM_CACHE_TTL seconds and the cache is culled at MAX_ENTRIES.
+
+Hits and misses are counted per method with llm_metrics (see stats()).
+"""
+
+import hashlib
+import logging
+import re
+from functools import lru_cache
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+
+from . import llm_metrics
+
+logger = logging.getLogger(__name__)
+
+# Bump when a cached method's prompt or result format (or the fingerprint) changes
+CACHE_VERSION = 2
+
+METHODS = ('extract_and_predict', 'chat', 'chat_turn')
+
+# Filler words that do not change what is being asked. Negations, question
+# words and numbers are kept on purpose ("no fever", "how long", "3 days").
+STOPWORDS = frozenset("""
+a an the and & or i i'm im me my mine am is are was were be been have has had having
+got get getting feel feeling felt really very so just also too bit little kind of
+please po lang ako ko na pa
+""".split())
+
+NEGATIONS = frozenset({'no', 'not', 'without', "don't", 'dont', "didn't", 'didnt', 'never', 'hindi', 'wala'})
+
+
+@lru_cache(maxsize=1)
+def _symptom_phrases() -> Dict[tuple, str]:
+    """Word sequences of known symptom names and aliases -> canonical symptom"""
+    from .ml_service import SYMPTOM_ALIASES
+    phrases = {}
+    for alias, target in SYMPTOM_ALIASES.items():
+        phrases[tuple(target.split('_'))] = target
+        phrases[tuple(alias.split('_'))] = target
+    return phrases
+
+
+def _canonicalize(words: list) -> list:
+    """Replace symptom phrases (longest match first) with their canonical names"""
+    phrases = _symptom_phrases()
+    longest = max(map(len, phrases))
+    result, i = [], 0
+    while i < len(words):
+        for size in range(min(longest, len(words) - i), 0, -1):
+            target = phrases.get(tuple(words[i:i + size]))
+            if target:
+                result.append(target)
+                i += size
+                break
+        else:
+            result.append(words[i])
+            i += 1
+    return result
+
+
+def fingerprint(message: str) -> str:
+    """
+    Normalized form of a message: lowercased, punctuation and stopwords removed,
+    symptom phrases canonicalized. Word order is ignored, except that a number
+    and the word after it ("2 days") stay with the words before them, so
+    "headache 2 days fever 5 days" is not "headache 5 days fever 2 days". A
+    message with a negation keeps its word order, which decides what is negated.
+    """
+    words = re.findall(r"[a-z0-9']+|&", message.lower())
+    words = [w for w in _canonicalize(words) if w not in STOPWORDS]
+    if NEGATIONS.intersection(words):
+        return ' '.join(words)
+
+    clauses, clause, i = [], [], 0
+    while i < len(words):
+        if words[i].isdigit():
+            clauses.append(' '.join(sorted(set(clause)) + words[i:i + 2]))
+            clause, i = [], i + 2
+        else:
+            clause.append(words[i])
+            i += 1
+    # Words after the last number stay last
+    return ' '.join(sorted(set(clauses)) + sorted(set(clause)))
+
+
+def _cache():
+    try:
+        return caches['llm']
+    except InvalidCacheBackendError:
+        return None
+
+
+def _enabled() -> bool:
+    return getattr(settings, 'LLM_CACHE_ENABLED', True) and _cache() is not None
+
+
+def _key(method: str, message: str) -> str:
+    digest = hashlib.sha256(fingerprint(message).encode()).hexdigest()
+    return f'llm:{method}:{digest}'
+
+
+def get(method: str, message: str):
+    """Cached result for this message, or None"""
+    if not _enabled():
+        return None
+    try:
+        value = _cache().get(_key(method, message), version=CACHE_VERSION)
+    except Exception as e:
+        logger.warning(f"LLM cache read failed: {e}")
+        return None
+    llm_metrics.count(method, 'cache_hits' if value is not None else 'cache_misses')
+    if value is not None:
+        logger.info(f"{method} answered from cache")
+    return value
+
+
+def put(method: str, message: str, value, ttl: Optional[int] = None):
+    """Store a provider result (never a fallback) for LLM_CACHE_TTL seconds"""
+    if not _enabled() or value is None:
+        return
+    ttl = ttl if ttl is not None else getattr(settings, 'LLM_CACHE_TTL', 24 * 3600)
+    try:
+        _cache().set(_key(method, message), value, timeout=ttl, version=CACHE_VERSION)
+    except Exception as e:
+        logger.warning(f"LLM cache write failed: {e}")
+
+
+def stats() -> Dict[str, Dict]:
+    """Hits, misses and hit rate per cached method, across workers"""
+    result = {}
+    for method in METHODS:
+        counts = {outcome: llm_metrics.counter(method, f'cache_{outcome}') for outcome in ('hits', 'misses')}
+        total = counts['hits'] + counts['misses']
+        result[method] = {**counts, 'hit_rate': round(counts['hits'] / total, 3) if total else 0.0}
+    return result
+
+
+def clear():
+    cache = _cache()
+    if cache is not None:
+        cache.clear()
@@ -0,0 +1,187 @@
+"""
+Single-flight coalescing of identical LLM requests
+When many students send the same complaint at once, every request would make
+its own identical provider call. Requests are keyed by a hash of the method
+and prompt: the first one (the leader) calls the providers, identical requests
+arriving while it is in flight wait for its result instead.
+
+Within a process the waiters block on the leader's in-memory flight. With
+LLM_COALESCE_SHARED the leader also registers the prompt in the
+llm_inflight_requests table (LLMInflightRequest), so leaders in other workers
+poll that row for the result. A waiter that gives up (LLM_COALESCE_TIMEOUT) or
+whose leader crashed makes the call itself; like the breaker, coalescing fails
+open when its table cannot be used.
+
+Leaders and coalesced waiters are counted per method with llm_metrics (see
+stats()).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Callable, Dict, Tuple
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.utils import timezone
+
+from . import llm_metrics
+from .models import LLMInflightRequest
+
+logger = logging.getLogger(__name__)
+
+METHODS = ('chat', 'insights', 'validation', 'extract_and_predict', 'chat_turn', 'followup')
+
+
+class _Flight:
+    """A call in progress in this process, and its result once done"""
+
+    def __init__(self):
+        self.finished = threading.Event()
+        self.result = None
+        self.failed = False
+        self.waiters = 0
+
+
+_lock = threading.Lock()
+_flights: Dict[str, _Flight] = {}
+
+
+def enabled() -> bool:
+    return getattr(settings, 'LLM_COALESCE_ENABLED', True)
+
+
+def digest(method: str, key: Any) -> str:
+    """Hash identifying a request: the method and everything its prompt is built from"""
+    return hashlib.sha256(json.dumps([method, key], sort_keys=True, default=str).encode()).hexdigest()
+
+
+def single_flight(method: str, key: Any, call: Callable[[], Tuple]) -> Tuple:
+    """
+    Run `call` (a run_attempts call returning (text, provider)), or wait for an
+    identical one already in flight and return its result.
+    """
+    if not enabled() or key is None:
+        return call()
+
+    request_key = digest(method, key)
+    with _lock:
+        flight = _flights.get(request_key)
+        leader = flight is None
+        if leader:
+            flight = _flights[request_key] = _Flight()
+        else:
+            flight.waiters += 1
+
+    if not leader:
+        if flight.finished.wait(getattr(settings, 'LLM_COALESCE_TIMEOUT', 45)) and not flight.failed:
+            llm_metrics.count(method, 'coalesced')
+            logger.info(f"{method}: answered by an identical request in flight")
+            return flight.result
+        return _call(method, call)
+
+    try:
+        if getattr(settings, 'LLM_COALESCE_SHARED', False):
+            flight.result = _shared_flight(method, request_key, call)
+        else:
+            flight.result = _call(method, call)
+        return flight.result
+    except Exception:
+        flight.failed = True
+        raise
+    finally:
+        with _lock:
+            _flights.pop(request_key, None)
+        flight.finished.set()
+
+
+def _call(method: str, call: Callable[[], Tuple]) -> Tuple:
+    """A provider round-trip that is actually made (not coalesced)"""
+    llm_metrics.count(method, 'flights')
+    return call()
+
+
+def _owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def _shared_flight(method: str, request_key: str, call: Callable[[], Tuple]) -> Tuple:
+    """Lead the request across workers, or wait for the worker already leading it"""
+    timeout = getattr(settings, 'LLM_COALESCE_TIMEOUT', 45)
+    now = timezone.now()
+    try:
+        # Rows of finished or crashed leaders
+        LLMInflightRequest.objects.filter(expires_at__lt=now).delete()
+        with transaction.atomic():
+            LLMInflightRequest.objects.create(
+                key=request_key, method=method, owner=_owner(), expires_at=now + timedelta(seconds=timeout)
+            )
+    except IntegrityError:
+        return _wait_for_worker(method, request_key, call, timeout)
+    except DatabaseError as e:
+        logger.warning(f"In-flight request table unavailable, calling directly: {e}")
+        return _call(method, call)
+
+    text, provider = None, None
+    try:
+        text, provider = _call(method, call)
+        return text, provider
+    finally:
+        try:
+            # Kept briefly for waiters that are between two polls
+            LLMInflightRequest.objects.filter(key=request_key).update(
+                done=True, text=text, provider=provider or '',
+                expires_at=timezone.now() + timedelta(seconds=getattr(settings, 'LLM_COALESCE_RESULT_TTL', 5))
+            )
+        except DatabaseError as e:
+            logger.warning(f"Could not publish {method} result: {e}")
+
+
+def _wait_for_worker(method: str, request_key: str, call: Callable[[], Tuple], timeout: float) -> Tuple:
+    deadline = time.monotonic() + timeout
+    poll_interval = getattr(settings, 'LLM_COALESCE_POLL_INTERVAL', 0.1)
+    while time.monotonic() < deadline:
+        try:
+            row = LLMInflightRequest.objects.filter(key=request_key).first()
+        except DatabaseError:
+            break
+        if row is None or row.expires_at < timezone.now():
+            # The leader gave up (or crashed): answer it ourselves
+            break
+        if row.done:
+            llm_metrics.count(method, 'coalesced')
+            logger.info(f"{method}: answered by an identical request in worker {row.owner}")
+            return row.text, row.provider or None
+        time.sleep(poll_interval)
+    return _call(method, call)
+
+
+def stats() -> Dict[str, Dict]:
+    """Provider round-trips made and requests coalesced into them, per method"""
+    result = {}
+    for method in METHODS:
+        flights = llm_metrics.counter(method, 'flights')
+        coalesced = llm_metrics.counter(method, 'coalesced')
+        total = flights + coalesced
+        result[method] = {
+            'flights': flights,
+            'coalesced': coalesced,
+            'coalesced_rate': round(coalesced / total, 3) if total else 0.0,
+        }
+    return result
+
+
+def _forget_after_fork():
+    # Flights belong to the parent's threads
+    global _lock, _flights
+    _lock = threading.Lock()
+    _flights = {}
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_after_fork)
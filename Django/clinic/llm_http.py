@@ -0,0 +1,126 @@
+"""
+Shared HTTP connection pools for LLM providers
+One keep-alive httpx client per provider and process, so chat turns reuse open
+TCP/TLS connections instead of handshaking on every call. The provider SDKs
+(OpenAI-compatible Groq, Cohere, Gemini) are handed the same clients.
+
+Per-provider limits come from settings.LLM_HTTP_POOLS, e.g.
+    LLM_HTTP_POOLS = {'openrouter': {'max_connections': 20, 'timeout': 30}}
+HTTP/2 is used when the optional `h2` package is installed.
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+from importlib.util import find_spec
+
+import httpx
+from django.conf import settings
+
+HTTP2_AVAILABLE = find_spec('h2') is not None
+
+DEFAULT_POOL = {
+    'max_connections': 10,
+    'max_keepalive_connections': 5,
+    'keepalive_expiry': 60.0,
+    'connect_timeout': 5.0,
+    'timeout': 30.0,
+    'http2': True,
+}
+
+_lock = threading.Lock()
+_clients = {}
+# Async clients are bound to the event loop they were created on
+_async_clients = weakref.WeakKeyDictionary()
+# Long-lived loop for async provider calls made from sync views (see run_coroutine)
+_io_loop = None
+
+
+def pool_config(provider: str) -> dict:
+    """Pool settings for a provider: DEFAULT_POOL updated with LLM_HTTP_POOLS[provider]"""
+    overrides = getattr(settings, 'LLM_HTTP_POOLS', {}).get(provider, {})
+    return {**DEFAULT_POOL, **overrides}
+
+
+def _client_kwargs(provider: str) -> dict:
+    config = pool_config(provider)
+    return {
+        'http2': HTTP2_AVAILABLE and config['http2'],
+        'limits': httpx.Limits(
+            max_connections=config['max_connections'],
+            max_keepalive_connections=config['max_keepalive_connections'],
+            keepalive_expiry=config['keepalive_expiry'],
+        ),
+        'timeout': httpx.Timeout(config['timeout'], connect=config['connect_timeout']),
+    }
+
+
+def get_http_client(provider: str) -> httpx.Client:
+    """Pooled sync client for a provider (created on first use)"""
+    client = _clients.get(provider)
+    if client is None:
+        with _lock:
+            client = _clients.get(provider)
+            if client is None:
+                client = httpx.Client(**_client_kwargs(provider))
+                _clients[provider] = client
+    return client
+
+
+def get_async_http_client(provider: str) -> httpx.AsyncClient:
+    """Pooled async client for a provider on the running event loop"""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(provider)
+        if client is None:
+            client = httpx.AsyncClient(**_client_kwargs(provider))
+            clients[provider] = client
+    return client
+
+
+def _get_io_loop() -> asyncio.AbstractEventLoop:
+    global _io_loop
+    with _lock:
+        if _io_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='llm-io', daemon=True).start()
+            _io_loop = loop
+    return _io_loop
+
+
+def run_coroutine(coro, timeout: float = None):
+    """
+    Run a coroutine on this process's background I/O loop and wait for the result.
+    The loop lives as long as the process, so async pools keep their connections
+    between calls; on timeout the coroutine's task is cancelled.
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, _get_io_loop())
+    try:
+        return future.result(timeout)
+    except BaseException:
+        future.cancel()
+        raise
+
+
+def close_all():
+    """Close every sync pool (e.g. at shutdown or between tests)"""
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+def _forget_after_fork():
+    # Sockets inherited from the parent belong to it, and the I/O loop thread
+    # does not survive fork; start with empty pools and no loop
+    global _lock, _io_loop
+    _lock = threading.Lock()
+    _io_loop = None
+    _clients.clear()
+    _async_clients.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_after_fork)
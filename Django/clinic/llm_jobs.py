@@ -0,0 +1,243 @@
+"""
+Background jobs for slow LLM work
+Views queue an LLMJob and answer with its id instead of holding a gunicorn
+worker for the whole provider round-trip; `python manage.py run_llm_worker`
+claims queued jobs and stores their result on the row.
+
+A job is claimed with a conditional update, so any number of worker processes
+can share the table. A job still running after LLM_JOB_TIMEOUT seconds (its
+worker died) is queued again, up to LLM_JOB_MAX_ATTEMPTS tries.
+
+With LLM_JOBS_EAGER the job runs inside enqueue() (development without a
+worker process); the views then answer with the result as before.
+"""
+
+import logging
+import os
+import socket
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+
+from .ml_service import get_ai_generator, get_ml_predictor
+from .models import ChatSession, HealthInsight, LLMJob
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+
+
+# ----------------------------------------------------------------------------
+# Job handlers: keyword arguments come from the job payload, the return value
+# (JSON-serializable) becomes job.result
+# ----------------------------------------------------------------------------
+
+def health_insights(session_id: str, student_id: str, symptoms: List[str]) -> List[Dict]:
+    """Replace a chat session's insights with the top 3 generated ones"""
+    from .serializers import HealthInsightSerializer
+
+    session = ChatSession.objects.get(id=session_id, student_id=student_id)
+    HealthInsight.objects.filter(student_id=student_id, session_id=session_id).delete()
+
+    # ML predictions give the LLM context
+    prediction_results = get_ml_predictor().predict(symptoms)
+    insights_data = get_ai_generator().generate_health_insights(
+        symptoms=symptoms,
+        predictions=prediction_results,
+        # Topics are strings; a pending follow-up keeps its state as a dict among them
+        chat_summary=', '.join(t for t in session.topics_discussed if isinstance(t, str))
+    )
+
+    insights = []
+    for insight_data in insights_data[:3]:
+        insights.append(HealthInsight.objects.create(
+            student_id=student_id,
+            session_id=session_id,
+            insight_text=insight_data['text'],
+            references=[],  # LLM doesn't provide references yet
+            reliability_score=insight_data['reliability_score']
+        ))
+
+    session.insights_generated_count = len(insights)
+    session.save()
+    return HealthInsightSerializer(insights, many=True).data
+
+
+def prediction_review(symptoms: List[str], prediction: Dict) -> Dict:
+    """
+    HYBRID check of an ML prediction (Rasa webhook): the LLM validates it, which
+    boosts the confidence when it agrees, and generates health insights; both
+    run concurrently. LLM failures or timeouts leave the ML result as is.
+    """
+    ai_generator = get_ai_generator()
+    ml_confidence = prediction.get('confidence_score', 0.0)
+
+    # Independent prompts: wait for the slower one, not both in a row
+    results = ai_generator.run_concurrently({
+        'LLM validation': lambda: ai_generator.validate_ml_prediction(
+            symptoms=symptoms,
+            ml_prediction=prediction.get('predicted_disease'),
+            ml_confidence=ml_confidence
+        ),
+        'Insights generation': lambda: ai_generator.generate_health_insights(
+            symptoms=symptoms, predictions=prediction
+        ),
+    })
+    llm_validation = results.get('LLM validation')
+    insights = results.get('Insights generation') or []
+
+    # Boost confidence if LLM agrees
+    validation_confidence_boost = 0.0
+    if llm_validation and llm_validation.get('agrees_with_ml'):
+        validation_confidence_boost = llm_validation.get('confidence_boost', 0.05)
+        logger.info(f"LLM validated ML prediction: {llm_validation.get('reasoning')}")
+
+    review = {
+        'confidence': min(ml_confidence + validation_confidence_boost, 1.0),  # Cap at 100%
+        'llm_validated': llm_validation is not None,
+        'insights': insights,
+    }
+    if llm_validation:
+        review['llm_validation'] = {
+            'agrees': llm_validation.get('agrees_with_ml'),
+            'reasoning': llm_validation.get('reasoning'),
+            'confidence_boost': validation_confidence_boost,
+            'alternative_diagnosis': llm_validation.get('alternative_diagnosis')
+        }
+    return review
+
+
+def speculative_diagnosis(session_id: str, student_id: str, message: str) -> Dict:
+    """
+    Diagnose a complaint while the student answers our follow-up questions and
+    keep the diagnosis and its reply on the session (see llm_speculation)
+    """
+    from . import llm_speculation
+
+    ai_generator = get_ai_generator()
+    # Same calls as the chat view makes once the answer arrives
+    turn = ai_generator.generate_chat_turn(message, followup=False)
+    if turn:
+        diagnosis, reply = turn['diagnosis'], turn['reply']
+    else:
+        diagnosis = ai_generator.extract_and_predict(message)
+        reply = None
+        if diagnosis.get('has_symptoms') and diagnosis.get('predicted_disease'):
+            reply = ai_generator.generate_diagnosis_response(message, diagnosis)
+
+    stored = llm_speculation.store(session_id, student_id, message, diagnosis, reply)
+    return {'stored': stored, 'predicted_disease': diagnosis.get('predicted_disease')}
+
+
+HANDLERS = {
+    'health_insights': health_insights,
+    'prediction_review': prediction_review,
+    'speculative_diagnosis': speculative_diagnosis,
+}
+
+
+# ----------------------------------------------------------------------------
+# Queue
+# ----------------------------------------------------------------------------
+
+def enqueue(kind: str, payload: Dict, user=None) -> LLMJob:
+    """Queue a job (or run it right away with LLM_JOBS_EAGER)"""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = LLMJob.objects.create(
+        kind=kind,
+        payload=payload,
+        created_by=user if user is not None and user.is_authenticated else None
+    )
+    if getattr(settings, 'LLM_JOBS_EAGER', False):
+        claimed = claim('eager', job_id=job.pk)
+        if claimed:
+            return run(claimed, 'eager')
+    return job
+
+
+def job_reference(job: LLMJob) -> Dict:
+    """What a view answers when it queued a job: the id and where to follow it"""
+    return {
+        'job_id': str(job.pk),
+        'status': job.status,
+        'status_url': reverse('clinic:llm-job', args=[job.pk]),
+        'events_url': reverse('clinic:llm-job-events', args=[job.pk]),
+    }
+
+
+def _requeue_stale():
+    """Jobs whose worker stopped reporting: queue them again, or fail them after the last try"""
+    now = timezone.now()
+    stale = LLMJob.objects.filter(
+        status=RUNNING, started_at__lt=now - timedelta(seconds=getattr(settings, 'LLM_JOB_TIMEOUT', 300))
+    )
+    requeued = stale.filter(attempts__lt=getattr(settings, 'LLM_JOB_MAX_ATTEMPTS', 2)).update(
+        status=QUEUED, worker=''
+    )
+    if requeued:
+        logger.warning(f"Requeued {requeued} stale LLM job(s)")
+    stale.update(status=FAILED, error='Timed out', finished_at=now)
+
+
+def claim(worker: str, job_id=None) -> Optional[LLMJob]:
+    """Take the oldest queued job (or the given one) for this worker; None if there is none"""
+    if job_id is None:
+        _requeue_stale()
+        candidates = LLMJob.objects.filter(status=QUEUED).order_by('created_at').values_list('pk', flat=True)[:10]
+    else:
+        candidates = [job_id]
+
+    for pk in candidates:
+        # Only the worker that wins this update runs the job
+        if LLMJob.objects.filter(pk=pk, status=QUEUED).update(
+            status=RUNNING, worker=worker, started_at=timezone.now(), attempts=F('attempts') + 1
+        ) == 1:
+            return LLMJob.objects.get(pk=pk)
+    return None
+
+
+def run(job: LLMJob, worker: str) -> LLMJob:
+    """Run a claimed job and store its result or error"""
+    started = time.monotonic()
+    try:
+        result = HANDLERS[job.kind](**job.payload)
+        changes = {'status': SUCCEEDED, 'result': result, 'error': ''}
+        logger.info(f"LLM job {job.pk} ({job.kind}) done in {time.monotonic() - started:.1f}s")
+    except Exception as e:
+        changes = {'status': FAILED, 'error': str(e)}
+        logger.error(f"LLM job {job.pk} ({job.kind}) failed: {e}")
+
+    # A job requeued as stale meanwhile belongs to another worker now
+    LLMJob.objects.filter(pk=job.pk, status=RUNNING, worker=worker).update(
+        finished_at=timezone.now(), **changes
+    )
+    job.refresh_from_db()
+    return job
+
+
+def default_worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def run_pending(worker: str = None, limit: int = None) -> int:
+    """
+    Run queued jobs until the queue is empty (or `limit` jobs have run).
+
+    Returns:
+        number of jobs run
+    """
+    worker = worker or default_worker_name()
+    done = 0
+    while limit is None or done < limit:
+        job = claim(worker)
+        if job is None:
+            break
+        run(job, worker)
+        done += 1
+    return done
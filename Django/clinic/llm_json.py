@@ -0,0 +1,257 @@
+"""
+Tolerant JSON extraction from LLM completions
+Models wrap their JSON in prose or markdown fences and make small syntax
+mistakes. extract() finds the first balanced object (or array) in a completion
+and parses it in a single left-to-right scan, repairing the known quirks as it
+goes instead of rewriting the whole text with regexes first (a completion
+that is valid JSON once the prose around it is cut off skips the scan and goes
+straight to the json module's C parser):
+
+    trailing or doubled commas       {"a": 1,}            -> {"a": 1}
+    missing commas between members   {"a": 1 "b": 2}      -> {"a": 1, "b": 2}
+    single quotes, bare keys         {'a': 'x', b: 1}     -> {"a": "x", "b": 1}
+    Python literals                  True / False / None  -> true / false / null
+    copied placeholders              true/false           -> true
+    raw newlines inside strings
+
+The result can be checked against a declared schema, a small subset of JSON
+Schema (type, properties, required, items, enum, minLength, minimum, maximum).
+A candidate that does not parse or does not match is skipped for the next one
+in the text, so an example object in the model's prose does not hide the answer.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+# Candidates tried before giving up on a completion
+MAX_CANDIDATES = 5
+
+_WHITESPACE = re.compile(r'\s*')
+_DOUBLE_QUOTED = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_SINGLE_QUOTED = re.compile(r"'(?:[^'\\]|\\.)*'", re.DOTALL)
+_NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+_WORD = re.compile(r'[A-Za-z_][\w\-]*')
+# "true/false" copied from a prompt's example: the first alternative wins
+_ALTERNATIVES = re.compile(r'\s*/\s*(?:true|false|null)\b', re.IGNORECASE)
+
+_CLOSERS = {'{': '}', '[': ']'}
+
+_LITERALS = {
+    'true': True, 'false': False, 'null': None,
+    'True': True, 'False': False, 'None': None,
+}
+
+# JSON Schema type of a parsed value (an integer also matches 'number')
+_KINDS = {dict: 'object', list: 'array', str: 'string', int: 'integer', float: 'number', bool: 'boolean',
+          type(None): 'null'}
+
+
+class JSONExtractError(ValueError):
+    """No usable JSON value in a completion"""
+
+
+class SchemaError(JSONExtractError):
+    """JSON was found but does not match the declared schema"""
+
+    def __init__(self, errors: List[str]):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+class _Parser:
+    """Recursive descent over one candidate, starting at an opening bracket"""
+
+    def __init__(self, text: str, pos: int):
+        self.text = text
+        self.pos = pos
+
+    def error(self, message: str):
+        raise JSONExtractError(f"{message} at position {self.pos}")
+
+    def skip_whitespace(self) -> str:
+        if self.pos >= len(self.text):
+            return ''
+        if self.text[self.pos].isspace():
+            self.pos = _WHITESPACE.match(self.text, self.pos).end()
+            if self.pos >= len(self.text):
+                return ''
+        return self.text[self.pos]
+
+    def value(self) -> Any:
+        char = self.skip_whitespace()
+        if char == '{':
+            return self.object()
+        if char == '[':
+            return self.array()
+        if char in ('"', "'"):
+            return self.string()
+        match = _NUMBER.match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+            number = match.group().lstrip('+')
+            return float(number) if any(c in number for c in '.eE') else int(number)
+        match = _WORD.match(self.text, self.pos)
+        if match and match.group() in _LITERALS:
+            self.pos = match.end()
+            alternative = _ALTERNATIVES.match(self.text, self.pos)
+            if alternative:
+                self.pos = alternative.end()
+            return _LITERALS[match.group()]
+        self.error(f"Unexpected {char!r}" if char else "Unexpected end of text")
+
+    def string(self) -> str:
+        quote = self.text[self.pos]
+        match = (_DOUBLE_QUOTED if quote == '"' else _SINGLE_QUOTED).match(self.text, self.pos)
+        if not match:
+            self.error("Unterminated string")
+        self.pos = match.end()
+        raw = match.group()
+        if '\\' not in raw:
+            return raw[1:-1]
+        if quote == "'":
+            raw = '"' + raw[1:-1].replace("\\'", "'").replace('"', '\\"') + '"'
+        try:
+            # strict=False lets raw newlines and tabs through
+            return json.loads(raw, strict=False)
+        except json.JSONDecodeError:
+            self.error("Invalid string escape")
+
+    def key(self) -> str:
+        if self.text[self.pos] in ('"', "'"):
+            return self.string()
+        match = _WORD.match(self.text, self.pos)
+        if not match:
+            self.error("Expected a key")
+        self.pos = match.end()
+        return match.group()
+
+    def object(self) -> Dict:
+        self.pos += 1
+        result = {}
+        while True:
+            char = self.skip_whitespace()
+            if char == '}':
+                self.pos += 1
+                return result
+            if char == ',':
+                # Leading, doubled or trailing comma
+                self.pos += 1
+                continue
+            if not char:
+                self.error("Unterminated object")
+            key = self.key()
+            if self.skip_whitespace() != ':':
+                self.error("Expected ':'")
+            self.pos += 1
+            result[key] = self.value()
+            char = self.skip_whitespace()
+            if char == ',':
+                self.pos += 1
+            elif char != '}' and not (char in ('"', "'") or _WORD.match(char)):
+                self.error("Expected ',' or '}'")
+
+    def array(self) -> List:
+        self.pos += 1
+        result = []
+        while True:
+            char = self.skip_whitespace()
+            if char == ']':
+                self.pos += 1
+                return result
+            if char == ',':
+                self.pos += 1
+                continue
+            if not char:
+                self.error("Unterminated array")
+            result.append(self.value())
+
+
+def validate(value: Any, schema: Dict, path: str = '$') -> List[str]:
+    """Problems of `value` against `schema` (empty if it matches)"""
+    errors = []
+    _check(value, schema, path, errors)
+    return errors
+
+
+def _check(value: Any, schema: Dict, path: str, errors: List[str]):
+    expected = schema.get('type')
+    kind = _KINDS.get(type(value))
+    if expected is not None:
+        types = (expected,) if isinstance(expected, str) else expected
+        if kind not in types and not (kind == 'integer' and 'number' in types):
+            errors.append(f"{path}: expected {' or '.join(types)}, got {type(value).__name__}")
+            return
+
+    if 'enum' in schema and value not in schema['enum']:
+        errors.append(f"{path}: {value!r} not one of {schema['enum']}")
+    if kind == 'string':
+        if 'minLength' in schema and len(value.strip()) < schema['minLength']:
+            errors.append(f"{path}: shorter than {schema['minLength']}")
+    elif kind in ('integer', 'number'):
+        if 'minimum' in schema and value < schema['minimum']:
+            errors.append(f"{path}: below {schema['minimum']}")
+        if 'maximum' in schema and value > schema['maximum']:
+            errors.append(f"{path}: above {schema['maximum']}")
+    elif kind == 'object':
+        for name in schema.get('required', ()):
+            if name not in value:
+                errors.append(f"{path}.{name}: missing")
+        for name, subschema in schema.get('properties', {}).items():
+            if name in value:
+                _check(value[name], subschema, path + '.' + name, errors)
+    elif kind == 'array' and 'items' in schema:
+        for index, item in enumerate(value):
+            _check(item, schema['items'], f"{path}[{index}]", errors)
+
+
+def extract(text: str, schema: Optional[Dict] = None) -> Any:
+    """
+    The first JSON object in `text` (an array if the schema's type is 'array')
+    that parses and matches `schema`.
+
+    Raises:
+        SchemaError if JSON was found but none of it matched, JSONExtractError if none was found
+    """
+    if not text:
+        raise JSONExtractError("Empty completion")
+    opener = '[' if schema and schema.get('type') == 'array' else '{'
+    pos = text.find(opener)
+    if pos < 0:
+        raise JSONExtractError(f"No JSON {'array' if opener == '[' else 'object'} found")
+
+    # Most completions are valid JSON once fences and prose are cut off: C parser first
+    try:
+        value = json.loads(text[pos:text.rindex(_CLOSERS[opener]) + 1])
+        if not (schema and validate(value, schema)):
+            return value
+    except ValueError:
+        pass
+
+    error = None
+    for _ in range(MAX_CANDIDATES):
+        if pos < 0:
+            break
+        parser = _Parser(text, pos)
+        try:
+            value = parser.value()
+        except JSONExtractError as e:
+            error = error or e
+            pos = text.find(opener, pos + 1)
+            continue
+        problems = validate(value, schema) if schema else []
+        if not problems:
+            return value
+        if not isinstance(error, SchemaError):
+            error = SchemaError(problems)
+        # Objects nested in a mismatch are not the answer either
+        pos = text.find(opener, parser.pos)
+    raise error
+
+
+def repair(text: str) -> str:
+    """`text` with its first JSON object re-serialized as valid JSON (unchanged if there is none)"""
+    try:
+        return json.dumps(extract(text))
+    except JSONExtractError:
+        return text
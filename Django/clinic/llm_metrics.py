@@ -0,0 +1,339 @@
+"""
+Instrumentation of LLM provider calls
+Every provider call made through llm_routing is recorded (method, provider,
+model, latency, tokens, HTTP status, fallback depth) into an in-memory ring
+buffer. Appending is all a call pays; every LLM_METRICS_FLUSH_INTERVAL seconds
+the calls recorded since the last flush are aggregated into hourly LLMCallStats
+rows, which keep a latency histogram so p50/p95/p99 can be merged across
+workers and hours.
+
+The buffer is per process and bounded (LLM_METRICS_BUFFER_SIZE): calls that
+are overwritten before a flush, or that cannot be written, are lost - the
+provider call itself is never slowed down or failed by instrumentation.
+
+Per-method events that are not provider calls (response cache hits and
+misses, coalesced requests) are counted in memory the same way with count(),
+and added on flush to the method's hourly row without a provider.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, List, NamedTuple, Optional
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import LLMCallStats
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the latency histogram buckets; one more bucket holds slower calls
+LATENCY_BUCKETS_MS = (100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 7500, 10000, 15000, 20000, 30000, 60000)
+
+
+class Completion(str):
+    """Provider answer text that also carries the token usage reported with it"""
+
+    def __new__(cls, text: str, prompt_tokens=None, completion_tokens=None):
+        completion = super().__new__(cls, text)
+        # SDK usage fields are ints when present (anything else, e.g. a test double, is ignored)
+        completion.prompt_tokens = prompt_tokens if isinstance(prompt_tokens, int) else None
+        completion.completion_tokens = completion_tokens if isinstance(completion_tokens, int) else None
+        return completion
+
+
+def with_usage(text, prompt_tokens=None, completion_tokens=None):
+    """Attach token usage to a provider's answer (anything but a str is returned as is)"""
+    return Completion(text, prompt_tokens, completion_tokens) if isinstance(text, str) else text
+
+
+class LLMCall(NamedTuple):
+    """One provider call as recorded in the ring buffer"""
+    at: float
+    method: str
+    provider: str
+    model: str
+    latency: float
+    ok: bool
+    status: Optional[int]
+    prompt_tokens: Optional[int]
+    completion_tokens: Optional[int]
+    fallback_depth: int
+    error: str
+
+
+_lock = threading.Lock()
+_buffer = None
+# Calls appended to the buffer, and how many of those were already flushed
+_recorded = 0
+_flushed = 0
+_last_flush = time.monotonic()
+# (hour, method, outcome) -> events counted since the last flush
+_counts = Counter()
+
+
+def enabled() -> bool:
+    return getattr(settings, 'LLM_METRICS_ENABLED', True)
+
+
+def _get_buffer() -> deque:
+    global _buffer
+    if _buffer is None:
+        with _lock:
+            if _buffer is None:
+                _buffer = deque(maxlen=getattr(settings, 'LLM_METRICS_BUFFER_SIZE', 2000))
+    return _buffer
+
+
+def status_of(error: Exception) -> Optional[int]:
+    """HTTP status behind a provider error, if the SDK exposes one"""
+    while error is not None:
+        for candidate in (getattr(error, 'status_code', None), getattr(error, 'code', None),
+                          getattr(getattr(error, 'response', None), 'status_code', None)):
+            if isinstance(candidate, int) and 100 <= candidate < 600:
+                return candidate
+        match = re.search(r'\b([45]\d\d)\b', str(error))
+        if match:
+            return int(match.group(1))
+        error = error.__cause__
+    return None
+
+
+def record(method: str, provider: str, model: str, latency: float, ok: bool, text=None,
+           error: Exception = None, fallback_depth: int = 0):
+    """
+    Add one provider call to the ring buffer (and flush it if the interval has passed).
+
+    Args:
+        text: the provider's answer; token counts are read from it when it is a Completion
+        fallback_depth: position of the provider in the order tried (0 = first choice)
+    """
+    global _recorded
+    if not enabled():
+        return
+    call = LLMCall(
+        at=time.time(),
+        method=method,
+        provider=provider,
+        model=model or '',
+        latency=latency,
+        ok=ok,
+        status=200 if error is None else status_of(error),
+        prompt_tokens=getattr(text, 'prompt_tokens', None),
+        completion_tokens=getattr(text, 'completion_tokens', None),
+        fallback_depth=fallback_depth,
+        error=str(error or '')[:255],
+    )
+    buffer = _get_buffer()
+    with _lock:
+        buffer.append(call)
+        _recorded += 1
+    _flush_if_due()
+
+
+def count(method: str, outcome: str):
+    """Count one event of a method that is not a provider call, e.g. a cache hit (see counter())"""
+    if not enabled():
+        return
+    with _lock:
+        _counts[(int(time.time() // 3600), method, outcome)] += 1
+    _flush_if_due()
+
+
+def counter(method: str, outcome: str) -> int:
+    """Events added by count(): what every worker has flushed, plus this process's unflushed ones"""
+    with _lock:
+        pending = sum(n for (_, m, o), n in _counts.items() if m == method and o == outcome)
+    try:
+        rows = LLMCallStats.objects.filter(method=method, provider='').values_list('counters', flat=True)
+        return pending + sum(counters.get(outcome, 0) for counters in rows)
+    except DatabaseError:
+        return pending
+
+
+def _flush_if_due():
+    if time.monotonic() - _last_flush >= getattr(settings, 'LLM_METRICS_FLUSH_INTERVAL', 60):
+        flush()
+
+
+def recent(limit: int = 50) -> List[Dict]:
+    """The newest calls still in this process's buffer, newest first"""
+    calls = list(_get_buffer())[-limit:]
+    return [call._asdict() for call in reversed(calls)]
+
+
+def _bucket_index(latency: float) -> int:
+    latency_ms = latency * 1000
+    for index, bound in enumerate(LATENCY_BUCKETS_MS):
+        if latency_ms <= bound:
+            return index
+    return len(LATENCY_BUCKETS_MS)
+
+
+def _merge_histograms(histograms) -> List[int]:
+    merged = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    for histogram in histograms:
+        for index, count in enumerate(histogram[:len(merged)]):
+            merged[index] += count
+    return merged
+
+
+def percentile(histogram: List[int], q: float) -> Optional[float]:
+    """Latency (ms) at quantile q, interpolated within its histogram bucket"""
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for index, count in enumerate(histogram):
+        if count and seen + count >= rank:
+            low = LATENCY_BUCKETS_MS[index - 1] if index else 0
+            # Slower than the last bound: report the bound
+            high = LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else LATENCY_BUCKETS_MS[-1]
+            return round(low + (high - low) * (rank - seen) / count, 1)
+        seen += count
+    return float(LATENCY_BUCKETS_MS[-1])
+
+
+def _aggregate(calls: List[LLMCall]) -> Dict[tuple, Dict]:
+    groups = defaultdict(lambda: {
+        'calls': 0, 'failures': 0, 'fallback_wins': 0, 'prompt_tokens': 0, 'completion_tokens': 0,
+        'latency_sum': 0.0, 'histogram': [0] * (len(LATENCY_BUCKETS_MS) + 1), 'statuses': defaultdict(int),
+    })
+    tz = dt_timezone.utc if settings.USE_TZ else None
+    for call in calls:
+        hour = datetime.fromtimestamp(call.at, tz).replace(minute=0, second=0, microsecond=0)
+        group = groups[(hour, call.method, call.provider, call.model)]
+        group['calls'] += 1
+        group['failures'] += not call.ok
+        group['fallback_wins'] += call.ok and call.fallback_depth > 0
+        group['prompt_tokens'] += call.prompt_tokens or 0
+        group['completion_tokens'] += call.completion_tokens or 0
+        group['latency_sum'] += call.latency
+        group['histogram'][_bucket_index(call.latency)] += 1
+        group['statuses'][str(call.status or 'error')] += 1
+    return groups
+
+
+def _flush_counts(counts: Counter):
+    tz = dt_timezone.utc if settings.USE_TZ else None
+    rows = defaultdict(dict)
+    for (hour, method, outcome), n in counts.items():
+        rows[(datetime.fromtimestamp(hour * 3600, tz), method)][outcome] = n
+    try:
+        for (hour, method), events in rows.items():
+            with transaction.atomic():
+                stats, _ = LLMCallStats.objects.select_for_update().get_or_create(
+                    bucket_start=hour, method=method, provider='', model=''
+                )
+                counters = dict(stats.counters)
+                for outcome, n in events.items():
+                    counters[outcome] = counters.get(outcome, 0) + n
+                LLMCallStats.objects.filter(pk=stats.pk).update(counters=counters, updated_at=timezone.now())
+    except Exception as e:
+        logger.warning(f"Could not write {sum(counts.values())} LLM event counts: {e}")
+
+
+def flush() -> int:
+    """Aggregate the buffered calls into LLMCallStats; returns how many calls were written"""
+    global _flushed, _last_flush, _counts
+    buffer = _get_buffer()
+    with _lock:
+        _last_flush = time.monotonic()
+        pending, _flushed = _recorded - _flushed, _recorded
+        calls = list(buffer)[-pending:] if pending else []
+        counts, _counts = _counts, Counter()
+    if counts:
+        _flush_counts(counts)
+    if pending > len(calls):
+        logger.warning(f"{pending - len(calls)} LLM call metrics overwritten before flush")
+    if not calls:
+        return 0
+
+    try:
+        for (hour, method, provider, model), group in _aggregate(calls).items():
+            with transaction.atomic():
+                stats, _ = LLMCallStats.objects.select_for_update().get_or_create(
+                    bucket_start=hour, method=method, provider=provider, model=model
+                )
+                statuses = dict(stats.status_counts)
+                for status, count in group['statuses'].items():
+                    statuses[status] = statuses.get(status, 0) + count
+                LLMCallStats.objects.filter(pk=stats.pk).update(
+                    calls=F('calls') + group['calls'],
+                    failures=F('failures') + group['failures'],
+                    fallback_wins=F('fallback_wins') + group['fallback_wins'],
+                    prompt_tokens=F('prompt_tokens') + group['prompt_tokens'],
+                    completion_tokens=F('completion_tokens') + group['completion_tokens'],
+                    latency_sum=F('latency_sum') + group['latency_sum'],
+                    latency_histogram=_merge_histograms([stats.latency_histogram, group['histogram']]),
+                    status_counts=statuses,
+                    updated_at=timezone.now(),
+                )
+    except Exception as e:
+        logger.warning(f"Could not write {len(calls)} LLM call metrics: {e}")
+        return 0
+    return len(calls)
+
+
+def provider_summary(days: int = 7) -> List[Dict]:
+    """Calls, error rate, tokens and p50/p95/p99 latency (ms) per provider over the last `days`"""
+    since = timezone.now() - timedelta(days=days)
+    rows = defaultdict(list)
+    for stats in LLMCallStats.objects.filter(bucket_start__gte=since).exclude(provider=''):
+        rows[stats.provider].append(stats)
+
+    summary = []
+    for provider, provider_rows in sorted(rows.items()):
+        calls = sum(r.calls for r in provider_rows)
+        histogram = _merge_histograms(r.latency_histogram for r in provider_rows)
+        statuses = defaultdict(int)
+        for r in provider_rows:
+            for status, count in r.status_counts.items():
+                statuses[status] += count
+        summary.append({
+            'provider': provider,
+            'models': sorted({r.model for r in provider_rows if r.model}),
+            'calls': calls,
+            'failures': sum(r.failures for r in provider_rows),
+            'error_rate': round(sum(r.failures for r in provider_rows) / calls, 3) if calls else 0.0,
+            'fallback_wins': sum(r.fallback_wins for r in provider_rows),
+            'prompt_tokens': sum(r.prompt_tokens for r in provider_rows),
+            'completion_tokens': sum(r.completion_tokens for r in provider_rows),
+            'mean_ms': round(sum(r.latency_sum for r in provider_rows) / calls * 1000, 1) if calls else None,
+            'p50_ms': percentile(histogram, 0.50),
+            'p95_ms': percentile(histogram, 0.95),
+            'p99_ms': percentile(histogram, 0.99),
+            'status_counts': dict(sorted(statuses.items())),
+        })
+    return summary
+
+
+def clear():
+    """Drop buffered calls and event counts (tests)"""
+    global _flushed
+    buffer = _get_buffer()
+    with _lock:
+        buffer.clear()
+        _flushed = _recorded
+        _counts.clear()
+
+
+def _forget_after_fork():
+    # Calls buffered by the parent are the parent's to flush
+    global _lock, _buffer, _recorded, _flushed, _counts
+    _lock = threading.Lock()
+    _buffer = None
+    _recorded = _flushed = 0
+    _counts = Counter()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_after_fork)
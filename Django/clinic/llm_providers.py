@@ -0,0 +1,214 @@
+"""
+Provider adapters and routing policy for AIInsightGenerator
+Every LLM provider is reached through a ProviderAdapter with one interface:
+
+    complete(messages, max_tokens, temperature, stream=False, **options)
+        the answer text, or an iterator of text chunks with stream=True
+    complete_async(messages, max_tokens, temperature, **options)
+        async variant (used by hedged routing when the adapter has a native one)
+
+`messages` are chat messages, [{'role': 'system' | 'user', 'content': ...}].
+Adapters are registered by name (register()); the built-in ones wrap the
+generator's SDK clients and HTTP pools (see llm_service). Which providers a
+method uses, in which order and with which parameters is the routing policy,
+settings.LLM_ROUTING:
+
+    LLM_ROUTING = {
+        'default': {'providers': ['cohere', 'groq'], 'temperature': 0.6, 'max_tokens': 500, 'timeout': 30},
+        'chat_turn': {'json_mode': True, 'options': {'groq': {'max_tokens': 1024}}},
+    }
+
+A method's entry is merged over 'default'; 'json_mode' keeps only providers
+with a JSON output mode, 'options' holds per-provider parameters. dispatch()
+and stream() are the one path every generator method takes to the providers,
+so hedging, circuit breakers, rate limits, coalescing and metrics (see
+llm_routing) apply to all of them alike.
+
+FakeProvider answers from a script, for tests and local runs without API keys.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+from .llm_routing import ProviderAttempt, run_attempts, stream_attempts
+
+logger = logging.getLogger(__name__)
+
+# Used for whatever a policy leaves out
+DEFAULT_POLICY = {'temperature': 0.6, 'max_tokens': 500, 'timeout': 30, 'json_mode': False}
+
+
+class ProviderAdapter:
+    """One LLM provider behind the common completion interface"""
+
+    name = ''
+    model = ''
+    # The API can be asked for a JSON answer (policies with 'json_mode' use only these)
+    json_mode = False
+    # complete_async does not just run complete in a thread
+    native_async = False
+
+    def configured(self) -> bool:
+        """Whether the provider can be called (API key set, SDK installed)"""
+        return True
+
+    def complete(self, messages: List[Dict], max_tokens: int = 500, temperature: float = 0.6,
+                 stream: bool = False, **options):
+        raise NotImplementedError
+
+    async def complete_async(self, messages: List[Dict], max_tokens: int = 500, temperature: float = 0.6,
+                             **options) -> str:
+        return await asyncio.to_thread(self.complete, messages, max_tokens, temperature, **options)
+
+
+def split_messages(messages: List[Dict]) -> Tuple[Optional[str], str]:
+    """(system prompt or None, user prompt) of a single-turn conversation"""
+    system = '\n\n'.join(m['content'] for m in messages if m['role'] == 'system') or None
+    prompt = '\n\n'.join(m['content'] for m in messages if m['role'] != 'system')
+    return system, prompt
+
+
+def messages(prompt: str, system: str = None) -> List[Dict]:
+    return ([{'role': 'system', 'content': system}] if system else []) + [{'role': 'user', 'content': prompt}]
+
+
+class FakeProvider(ProviderAdapter):
+    """
+    Scripted provider for tests: answers with `replies` in turn (the last one
+    repeats). A reply can be an exception to raise, or a callable taking the
+    messages. Every call is kept in `calls`.
+    """
+
+    name = 'fake'
+    model = 'fake'
+    json_mode = True
+    native_async = True
+
+    def __init__(self, replies=('OK',), latency: float = 0.0, chunk_size: int = 8):
+        self.replies = list(replies)
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.calls = []
+
+    def _reply(self, messages: List[Dict], options: Dict) -> str:
+        self.calls.append({'messages': messages, **options})
+        reply = self.replies.pop(0) if len(self.replies) > 1 else self.replies[0]
+        if isinstance(reply, Exception):
+            raise reply
+        return reply(messages) if callable(reply) else reply
+
+    def complete(self, messages, max_tokens=500, temperature=0.6, stream=False, **options):
+        if stream:
+            return self._stream(messages, dict(options, max_tokens=max_tokens, temperature=temperature))
+        time.sleep(self.latency)
+        return self._reply(messages, dict(options, max_tokens=max_tokens, temperature=temperature))
+
+    async def complete_async(self, messages, max_tokens=500, temperature=0.6, **options):
+        await asyncio.sleep(self.latency)
+        return self._reply(messages, dict(options, max_tokens=max_tokens, temperature=temperature))
+
+    def _stream(self, messages, options) -> Iterator[str]:
+        time.sleep(self.latency)
+        text = self._reply(messages, options)
+        for start in range(0, len(text), self.chunk_size):
+            yield text[start:start + self.chunk_size]
+
+
+_factories: Dict[str, Callable[[Any], ProviderAdapter]] = {}
+
+
+def register(name: str, factory: Callable[[Any], ProviderAdapter]):
+    """Make a provider available to routing policies; `factory(owner)` builds its adapter"""
+    _factories[name] = factory
+
+
+def unregister(name: str):
+    _factories.pop(name, None)
+
+
+def registered() -> List[str]:
+    """Provider names in registration order"""
+    return list(_factories)
+
+
+def get_adapter(name: str, owner=None) -> Optional[ProviderAdapter]:
+    factory = _factories.get(name)
+    return factory(owner) if factory else None
+
+
+def policy(method: str) -> Dict:
+    """A method's routing policy: its LLM_ROUTING entry over 'default', with defaults filled in"""
+    routing = getattr(settings, 'LLM_ROUTING', {})
+    default = routing.get('default', {})
+    entry = routing.get(method, {})
+    options = {}
+    for provider, values in list(default.get('options', {}).items()) + list(entry.get('options', {}).items()):
+        options[provider] = {**options.get(provider, {}), **values}
+    return {
+        **DEFAULT_POLICY,
+        'providers': registered(),
+        **default,
+        **entry,
+        'options': options,
+    }
+
+
+def attempts(method: str, conversation: List[Dict], owner=None, stream: bool = False,
+             options: Dict[str, Dict] = None) -> List[ProviderAttempt]:
+    """
+    The method's configured providers as routing attempts, in policy order.
+    `options` adds per-provider parameters known only at call time.
+    """
+    route = policy(method)
+    params = {name: route[name] for name in ('temperature', 'max_tokens', 'timeout')}
+    if route['json_mode']:
+        params['json_mode'] = True
+
+    result = []
+    for name in route['providers']:
+        adapter = get_adapter(name, owner)
+        if adapter is None:
+            logger.warning(f"{method}: unknown LLM provider {name!r} in LLM_ROUTING")
+            continue
+        if not adapter.configured():
+            logger.debug(f"{name} not configured - skipping")
+            continue
+        if route['json_mode'] and not adapter.json_mode:
+            continue
+        kwargs = {**params, **route['options'].get(name, {}), **(options or {}).get(name, {})}
+        # ~4 characters per token, plus the completion budget
+        prompt_tokens = sum(len(m['content']) for m in conversation) // 4
+        tokens = prompt_tokens + kwargs['max_tokens']
+        acall = None
+        if adapter.native_async and not stream:
+            acall = lambda adapter=adapter, kwargs=kwargs: adapter.complete_async(conversation, **kwargs)
+        result.append(ProviderAttempt(
+            name,
+            lambda adapter=adapter, kwargs=kwargs: adapter.complete(conversation, stream=stream, **kwargs),
+            acall,
+            adapter.model,
+            tokens,
+            prompt_tokens,
+        ))
+    return result
+
+
+def dispatch(method: str, conversation: List[Dict], owner=None, options: Dict[str, Dict] = None,
+             validate: Callable[[str], bool] = None, key=None) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Answer `conversation` with the method's providers (see llm_routing.run_attempts).
+
+    Returns:
+        (text, provider) or (None, None) if every provider failed
+    """
+    return run_attempts(method, attempts(method, conversation, owner, options=options), validate=validate, key=key)
+
+
+def stream(method: str, conversation: List[Dict], owner=None, options: Dict[str, Dict] = None,
+           outcome: dict = None) -> Iterator[str]:
+    """Streaming variant of dispatch (see llm_routing.stream_attempts)"""
+    return stream_attempts(method, attempts(method, conversation, owner, stream=True, options=options), outcome)
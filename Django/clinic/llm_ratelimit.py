@@ -0,0 +1,150 @@
+"""
+Rate limits of LLM providers
+The free tiers cap requests (and for some models tokens) per minute. Each
+provider's use in the current minute is counted in the 'llm_state' cache (see
+llm_breaker), shared by every worker:
+
+    requests  at most `rpm` per minute
+    tokens    at most `tpm` per minute (only if a `tpm` is set)
+
+A call takes one request and its estimated tokens (prompt + max_tokens) before
+anything is sent, with one atomic incr() each. A provider without capacity is
+skipped like an open circuit, so traffic spills over to providers that still
+have budget instead of running into 429s. Once the provider has answered, the
+estimate is corrected with the reported usage (settle); a 429 anyway uses up
+the rest of the minute (exhaust).
+
+Budgets come from settings.LLM_RATE_LIMITS, e.g.
+    LLM_RATE_LIMITS = {'groq': {'rpm': 30, 'tpm': 6000}}
+Providers without an entry are not limited. Like the breaker, the limiter
+fails open when its cache cannot be used.
+"""
+
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from .llm_breaker import incr, state_cache
+
+logger = logging.getLogger(__name__)
+
+
+def enabled() -> bool:
+    return getattr(settings, 'LLM_RATE_LIMIT_ENABLED', True)
+
+
+def budget(provider: str) -> Optional[Dict]:
+    """{'rpm': ..., 'tpm': ...} for a provider, or None if it is not limited"""
+    if not enabled():
+        return None
+    return getattr(settings, 'LLM_RATE_LIMITS', {}).get(provider)
+
+
+def _minute() -> Tuple[int, float]:
+    """(current minute, seconds until the next one)"""
+    now = time.time()
+    return int(now // 60), 60 - now % 60
+
+
+def _key(provider: str, name: str, minute: Optional[int] = None) -> str:
+    return f'llm:ratelimit:{provider}:{name}' + (f':{minute}' if minute is not None else '')
+
+
+def acquire(provider: str, tokens: int = 0) -> Tuple[bool, float]:
+    """
+    Take one request and `tokens` from the provider's budget.
+
+    Returns:
+        (admitted, retry_after): retry_after is how many seconds until the
+        call would fit, when it was not admitted
+    """
+    limits = budget(provider)
+    if not limits:
+        return True, 0.0
+    if limits.get('tpm') and tokens > limits['tpm']:
+        return False, float('inf')
+    try:
+        cache = state_cache()
+        minute, retry_after = _minute()
+        requests_key = _key(provider, 'requests', minute)
+        if incr(cache, requests_key, timeout=120) > limits['rpm']:
+            cache.decr(requests_key)
+            incr(cache, _key(provider, 'throttled'))
+            return False, retry_after
+        if limits.get('tpm') and tokens:
+            tokens_key = _key(provider, 'tokens', minute)
+            if incr(cache, tokens_key, tokens, timeout=120) > limits['tpm']:
+                cache.decr(tokens_key, tokens)
+                cache.decr(requests_key)
+                incr(cache, _key(provider, 'throttled'))
+                return False, retry_after
+        return True, 0.0
+    except Exception as e:
+        logger.warning(f"Rate limit store unavailable, allowing {provider}: {e}")
+        return True, 0.0
+
+
+def settle(provider: str, reserved: int, used: Optional[int] = None, sent: bool = True):
+    """
+    Correct a reservation once the call is over: an unsent call gives back its
+    request and tokens; a sent one gives back the tokens it did not use
+    (if the provider reported usage). A call settled after its minute has
+    ended has nothing left to give back.
+    """
+    limits = budget(provider)
+    if not limits:
+        return
+    minute, _ = _minute()
+    refund = reserved if not sent else (reserved - used if used is not None else 0)
+    try:
+        cache = state_cache()
+        if not sent:
+            cache.decr(_key(provider, 'requests', minute))
+        if limits.get('tpm') and refund > 0:
+            cache.decr(_key(provider, 'tokens', minute), refund)
+    except ValueError:
+        pass
+    except Exception as e:
+        logger.warning(f"Could not settle {provider} rate limit: {e}")
+
+
+def exhaust(provider: str):
+    """The provider answered 429 anyway (e.g. the key is shared): use up the rest of this minute"""
+    limits = budget(provider)
+    if not limits:
+        return
+    minute, _ = _minute()
+    used = {_key(provider, 'requests', minute): limits['rpm']}
+    if limits.get('tpm'):
+        used[_key(provider, 'tokens', minute)] = limits['tpm']
+    try:
+        state_cache().set_many(used, timeout=120)
+        logger.warning(f"{provider} returned 429, holding calls until its budget refills")
+    except Exception as e:
+        logger.warning(f"Could not record {provider} 429: {e}")
+
+
+def snapshot() -> List[Dict]:
+    """Remaining budget of every limited provider (for the monitoring dashboard)"""
+    limited = getattr(settings, 'LLM_RATE_LIMITS', {})
+    minute, _ = _minute()
+    names = [(p, n, m) for p in limited for n, m in (('requests', minute), ('tokens', minute), ('throttled', None))]
+    try:
+        found = state_cache().get_many([_key(*name) for name in names])
+    except Exception:
+        return []
+    rows = []
+    for provider, limits in limited.items():
+        used = found.get(_key(provider, 'requests', minute), 0)
+        tokens_used = found.get(_key(provider, 'tokens', minute), 0)
+        rows.append({
+            'provider': provider,
+            'rpm': limits['rpm'],
+            'tpm': limits.get('tpm'),
+            'requests_left': max(0, limits['rpm'] - used),
+            'tokens_left': max(0, limits['tpm'] - tokens_used) if limits.get('tpm') else None,
+            'throttled': found.get(_key(provider, 'throttled'), 0),
+        })
+    return rows
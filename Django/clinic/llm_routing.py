@@ -0,0 +1,453 @@
+"""
+Provider routing for AIInsightGenerator
+Runs a list of provider attempts either one after another (the original
+fallback chain) or hedged: when the provider in flight has not answered
+within its observed p95 latency, the next one is started in parallel and
+the first valid answer wins; the others are cancelled. Only providers with a
+native async call are hedged (a call in a thread cannot be cancelled); the
+rest are tried one after another if the hedged ones fail.
+
+Observed latency and error rates also reorder the providers once enough
+calls have been seen (LLM_ADAPTIVE_ORDER_MIN_SAMPLES), and providers whose
+circuit is open are skipped (see llm_breaker), as are providers that have
+used up their per-minute budget (see llm_ratelimit). Every call is recorded
+for the analytics page (see llm_metrics), and identical requests in flight at
+the same time share one call (see llm_coalesce).
+
+Independent prompts (each its own fallback chain) can be run side by side
+with fan_out, under one shared deadline.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+
+from . import llm_breaker, llm_coalesce, llm_metrics, llm_ratelimit
+from .llm_http import run_coroutine
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderUnavailable(Exception):
+    """A provider error that retrying soon will not fix (bad key, region blocked)"""
+
+    def __init__(self, message: str, cooldown: int = 3600):
+        super().__init__(message)
+        self.cooldown = cooldown
+
+
+class ProviderAttempt(NamedTuple):
+    """
+    One provider's way of answering a prompt: `call` returns the text (a chunk
+    iterator for stream_attempts) or raises; `acall` is an optional async variant
+    (only attempts with one are hedged).
+    `model` labels the call's metrics; `tokens` is the estimated prompt + completion
+    size taken from the provider's rate limit budget, `prompt_tokens` the prompt
+    part of it (used to estimate what a stream actually used).
+    """
+    provider: str
+    call: Callable[[], str]
+    acall: Optional[Callable[[], Awaitable[str]]] = None
+    model: str = ''
+    tokens: int = 0
+    prompt_tokens: int = 0
+
+
+class ProviderStats:
+    """Rolling latency samples and error rate per provider (process-local)"""
+
+    def __init__(self, window: int = 200):
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._outcomes = {}
+        self.window = window
+
+    def record(self, provider: str, latency: float, ok: bool):
+        with self._lock:
+            if ok:
+                self._latencies.setdefault(provider, deque(maxlen=self.window)).append(latency)
+            self._outcomes.setdefault(provider, deque(maxlen=self.window)).append(ok)
+
+    def samples(self, provider: str) -> int:
+        return len(self._outcomes.get(provider, ()))
+
+    def error_rate(self, provider: str) -> float:
+        outcomes = self._outcomes.get(provider)
+        if not outcomes:
+            return 0.0
+        return 1.0 - sum(outcomes) / len(outcomes)
+
+    def percentile(self, provider: str, q: float) -> Optional[float]:
+        with self._lock:
+            latencies = sorted(self._latencies.get(provider, ()))
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def expected_cost(self, provider: str, timeout: float) -> float:
+        """Median latency plus the time a failure wastes, weighted by the error rate"""
+        return (self.percentile(provider, 0.5) or 0.0) + self.error_rate(provider) * timeout
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {
+            provider: {
+                'samples': self.samples(provider),
+                'error_rate': round(self.error_rate(provider), 3),
+                'p50': self.percentile(provider, 0.5),
+                'p95': self.percentile(provider, 0.95),
+            }
+            for provider in list(self._outcomes)
+        }
+
+
+provider_stats = ProviderStats()
+
+
+def order_attempts(attempts: List[ProviderAttempt]) -> List[ProviderAttempt]:
+    """Reorder by expected cost once every provider has enough samples; else keep the given order"""
+    min_samples = getattr(settings, 'LLM_ADAPTIVE_ORDER_MIN_SAMPLES', 20)
+    if min_samples <= 0 or any(provider_stats.samples(a.provider) < min_samples for a in attempts):
+        return list(attempts)
+    timeout = getattr(settings, 'LLM_PROVIDER_TIMEOUT', 30)
+    return sorted(attempts, key=lambda a: provider_stats.expected_cost(a.provider, timeout))
+
+
+def hedge_delay(provider: str) -> float:
+    """How long to wait on a provider before starting the next one: its p95, clamped"""
+    p95 = provider_stats.percentile(provider, 0.95)
+    if p95 is None or provider_stats.samples(provider) < 5:
+        p95 = getattr(settings, 'LLM_HEDGE_DEFAULT_DELAY', 2.0)
+    low, high = getattr(settings, 'LLM_HEDGE_DELAY_BOUNDS', (0.5, 10.0))
+    return max(low, min(high, p95))
+
+
+def _is_valid(text, validate) -> bool:
+    if not isinstance(text, str) or not text.strip():
+        return False
+    return validate(text) if validate else True
+
+
+def _outcome(method: str, attempt: ProviderAttempt, depth: int, latency: float, outcomes: list,
+             text=None, error=None, validate=None) -> bool:
+    """
+    Record one finished call; returns whether its answer can be used.
+    An answer that fails `validate` is not used, but the provider still counts as up.
+    """
+    ok = error is None and _is_valid(text, None)
+    if error is not None:
+        logger.warning(f"{attempt.provider} {method} failed: {error}")
+    elif not ok:
+        logger.warning(f"{attempt.provider} {method} failed: empty response")
+    provider_stats.record(attempt.provider, latency, ok)
+    outcomes.append((attempt, depth, ok, latency, text, error))
+    if ok and not _is_valid(text, validate):
+        logger.warning(f"{attempt.provider} {method} response was unusable")
+        return False
+    return ok
+
+
+def run_sequential(method: str, attempts: List[ProviderAttempt], validate: Callable[[str], bool] = None,
+                   outcomes: list = None, admit: Callable[[ProviderAttempt], bool] = None) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Original fallback chain: try each provider in turn until one gives a valid answer.
+    `admit` is asked right before each call and can hold a provider back.
+    """
+    outcomes = [] if outcomes is None else outcomes
+    for depth, attempt in enumerate(attempts):
+        if admit and not admit(attempt):
+            continue
+        started = time.monotonic()
+        text, error = None, None
+        try:
+            text = attempt.call()
+        except Exception as e:
+            error = e
+        if _outcome(method, attempt, depth, time.monotonic() - started, outcomes, text, error, validate):
+            logger.info(f"{method} answered by {attempt.provider}")
+            return text, attempt.provider
+    return None, None
+
+
+async def _run_hedged(method: str, attempts: List[ProviderAttempt], validate, outcomes: list,
+                      admit: Callable[[ProviderAttempt], bool]) -> Tuple[Optional[str], Optional[str]]:
+    # Native-async attempts only: a losing task is cancelled and its request closed
+    tasks = {}
+    started = {}
+    remaining = list(attempts)
+
+    async def launch():
+        # Budget is taken per attempt actually started, not for every hedge up front
+        while remaining:
+            attempt = remaining.pop(0)
+            if await asyncio.to_thread(admit, attempt):
+                task = asyncio.ensure_future(attempt.acall())
+                tasks[task] = attempt
+                started[task] = time.monotonic()
+                return attempt
+        return None
+
+    current = await launch()
+    try:
+        while tasks:
+            timeout = hedge_delay(current.provider) if remaining else None
+            done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                attempt = tasks.pop(task)
+                latency = time.monotonic() - started.pop(task)
+                text, error = None, None
+                try:
+                    text = task.result()
+                except Exception as e:
+                    error = e
+                if _outcome(method, attempt, attempts.index(attempt), latency, outcomes, text, error, validate):
+                    logger.info(f"{method} answered by {attempt.provider} ({len(tasks)} hedge(s) cancelled)")
+                    return text, attempt.provider
+
+            # Hedge on timeout; replace a failed provider immediately
+            launched = await launch() if remaining else None
+            if launched:
+                current = launched
+                if not done:
+                    logger.info(f"{method}: hedging with {current.provider}")
+        return None, None
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+class _Reservations:
+    """Rate limit budget taken by one run_attempts call, settled when it is over"""
+
+    def __init__(self, method: str):
+        self.method = method
+        self.held = []
+        self.waits = []
+
+    def admit(self, attempt: ProviderAttempt) -> bool:
+        admitted, retry_after = llm_ratelimit.acquire(attempt.provider, attempt.tokens)
+        if admitted:
+            self.held.append(attempt)
+        else:
+            self.waits.append(retry_after)
+            logger.info(f"{self.method}: skipping {attempt.provider} (rate limit, capacity in {retry_after:.1f}s)")
+        return admitted
+
+    def settle(self, outcomes: list):
+        sent = {id(outcome[0]): outcome for outcome in outcomes}
+        for attempt in self.held:
+            outcome = sent.get(id(attempt))
+            if outcome is None:
+                _settle(attempt, sent=False)
+                continue
+            answer, error = outcome[4], outcome[5]
+            usage = (getattr(answer, 'prompt_tokens', None), getattr(answer, 'completion_tokens', None))
+            _settle(attempt, error=error, used=sum(usage) if None not in usage else None)
+        self.held = []
+
+
+def _settle(attempt: ProviderAttempt, sent: bool = True, error: Exception = None, used: Optional[int] = None):
+    """Correct an admitted attempt's rate limit reservation once it is over"""
+    if sent and llm_metrics.status_of(error) == 429:
+        llm_ratelimit.exhaust(attempt.provider)
+    else:
+        llm_ratelimit.settle(attempt.provider, attempt.tokens, used, sent=sent)
+
+
+def _run(method: str, attempts: List[ProviderAttempt], validate, outcomes: list,
+         reservations: _Reservations) -> Tuple[Optional[str], Optional[str]]:
+    hedged = [a for a in attempts if a.acall]
+    if len(hedged) > 1 and getattr(settings, 'LLM_HEDGING_ENABLED', False):
+        # A thread-backed call cannot be cancelled: after losing a race it would
+        # run (and use rate limit budget) to the end. So only native-async
+        # providers are hedged, and the others are tried in turn if they all fail.
+        text, provider = run_coroutine(_run_hedged(method, hedged, validate, outcomes, reservations.admit))
+        if text is not None:
+            return text, provider
+        attempts = [a for a in attempts if not a.acall]
+    return run_sequential(method, attempts, validate, outcomes, admit=reservations.admit)
+
+
+def run_attempts(method: str, attempts: List[ProviderAttempt], validate: Callable[[str], bool] = None,
+                 key=None) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Answer a prompt with the first provider that succeeds.
+    If every provider is at its rate limit but one has capacity again within
+    LLM_RATE_LIMIT_MAX_WAIT seconds, the call waits for it once.
+
+    Args:
+        key: what the prompt is built from (JSON-serializable); identical
+            requests with the same key share one call (see llm_coalesce)
+
+    Returns:
+        (text, provider) or (None, None) if every provider failed
+    """
+    return llm_coalesce.single_flight(method, key, lambda: _answer(method, attempts, validate))
+
+
+def _answer(method: str, attempts: List[ProviderAttempt],
+            validate: Callable[[str], bool] = None) -> Tuple[Optional[str], Optional[str]]:
+    allowed = set(llm_breaker.allowed_providers(a.provider for a in attempts))
+    skipped = [a.provider for a in attempts if a.provider not in allowed]
+    if skipped:
+        logger.info(f"{method}: skipping {', '.join(skipped)} (circuit open)")
+    attempts = order_attempts([a for a in attempts if a.provider in allowed])
+    if not attempts:
+        return None, None
+
+    # Outcomes go to the shared breaker store from the calling thread, after the race
+    outcomes = []
+    reservations = _Reservations(method)
+    try:
+        text, provider = _run(method, attempts, validate, outcomes, reservations)
+        max_wait = getattr(settings, 'LLM_RATE_LIMIT_MAX_WAIT', 2.0)
+        if not outcomes and reservations.waits and min(reservations.waits) <= max_wait:
+            logger.info(f"{method}: all providers at their rate limit, waiting {min(reservations.waits):.1f}s")
+            time.sleep(min(reservations.waits))
+            reservations.waits = []
+            text, provider = _run(method, attempts, validate, outcomes, reservations)
+    finally:
+        reservations.settle(outcomes)
+        for attempt, depth, ok, latency, answer, error in outcomes:
+            cooldown = error.cooldown if isinstance(error, ProviderUnavailable) else None
+            llm_breaker.record(attempt.provider, ok, latency, str(error or ''), cooldown)
+            llm_metrics.record(method, attempt.provider, attempt.model, latency, ok, answer, error, depth)
+    # Plain str for callers (a Completion's usage is only for the metrics)
+    return (str(text) if text is not None else None), provider
+
+
+def stream_attempts(method: str, attempts: List[ProviderAttempt], outcome: dict = None) -> Iterator[str]:
+    """
+    Stream an answer from the first provider that produces one; each attempt's
+    `call` returns an iterator of text chunks.
+
+    A provider that fails before its first chunk is skipped like in run_attempts.
+    Once chunks have been sent they cannot be taken back, so a failure mid-stream
+    ends the answer there. Latency is recorded as time to first chunk.
+    Yields nothing if every provider failed. `outcome`, if given, receives the
+    answering provider and whether its stream completed.
+    """
+    allowed = set(llm_breaker.allowed_providers(a.provider for a in attempts))
+    for depth, attempt in enumerate(order_attempts([a for a in attempts if a.provider in allowed])):
+        admitted, retry_after = llm_ratelimit.acquire(attempt.provider, attempt.tokens)
+        if not admitted:
+            logger.info(f"{method}: skipping {attempt.provider} (rate limit, capacity in {retry_after:.1f}s)")
+            continue
+        started = time.monotonic()
+        first_chunk_at = None
+        error = None
+        streamed = 0
+        try:
+            for chunk in attempt.call():
+                if not chunk:
+                    continue
+                if first_chunk_at is None:
+                    first_chunk_at = time.monotonic()
+                streamed += len(chunk)
+                yield chunk
+        except GeneratorExit:
+            # The client went away mid-answer
+            _settle(attempt, used=_streamed_tokens(attempt, streamed))
+            raise
+        except Exception as e:
+            error = e
+        _settle(attempt, error=error, used=_streamed_tokens(attempt, streamed))
+
+        if first_chunk_at is None:
+            latency = time.monotonic() - started
+            logger.warning(f"{attempt.provider} {method} stream failed: {error or 'empty response'}")
+            provider_stats.record(attempt.provider, latency, False)
+            cooldown = error.cooldown if isinstance(error, ProviderUnavailable) else None
+            llm_breaker.record(attempt.provider, False, latency, str(error or 'empty response'), cooldown)
+            llm_metrics.record(method, attempt.provider, attempt.model, latency, False,
+                               error=error or ValueError('empty response'), fallback_depth=depth)
+            continue
+
+        latency = first_chunk_at - started
+        if error is not None:
+            logger.warning(f"{attempt.provider} {method} stream cut off: {error}")
+        else:
+            logger.info(f"{method} streamed by {attempt.provider} (first chunk after {latency:.2f}s)")
+        provider_stats.record(attempt.provider, latency, error is None)
+        llm_breaker.record(attempt.provider, error is None, latency, str(error or ''))
+        llm_metrics.record(method, attempt.provider, attempt.model, latency, error is None,
+                           error=error, fallback_depth=depth)
+        if outcome is not None:
+            outcome.update(provider=attempt.provider, complete=error is None)
+        return
+
+
+def _streamed_tokens(attempt: ProviderAttempt, characters: int) -> Optional[int]:
+    """Tokens a stream used (streams report no usage): the prompt estimate plus ~4 characters per token"""
+    if not attempt.prompt_tokens:
+        return None
+    return min(attempt.tokens, attempt.prompt_tokens + characters // 4)
+
+
+_fan_out_lock = threading.Lock()
+_fan_out_executor = None
+
+
+def _get_fan_out_executor() -> ThreadPoolExecutor:
+    global _fan_out_executor
+    with _fan_out_lock:
+        if _fan_out_executor is None:
+            _fan_out_executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'LLM_FAN_OUT_WORKERS', 8), thread_name_prefix='llm-fan-out'
+            )
+    return _fan_out_executor
+
+
+def _call_and_close_connections(call: Callable[[], Any]):
+    try:
+        return call()
+    finally:
+        # The breaker and metrics queries opened a connection in this pool thread
+        connections.close_all()
+
+
+def fan_out(calls: Dict[str, Callable[[], Any]], timeout: float = None) -> Dict[str, Any]:
+    """
+    Run independent calls in parallel, all bounded by one deadline, so the wait
+    is the slowest call (or the deadline) instead of the sum.
+
+    Returns:
+        results by name of the calls that finished in time; a call that raised
+        or missed the deadline is left out (logged). Calls still running at the
+        deadline finish in the background and their results are dropped.
+    """
+    if not calls:
+        return {}
+    executor = _get_fan_out_executor()
+    futures = {executor.submit(_call_and_close_connections, call): name for name, call in calls.items()}
+    done, pending = wait(futures, timeout=timeout)
+
+    results = {}
+    for future in done:
+        try:
+            results[futures[future]] = future.result()
+        except Exception as e:
+            logger.warning(f"{futures[future]} failed: {e}")
+    for future in pending:
+        future.cancel()
+        logger.warning(f"{futures[future]} missed the {timeout}s deadline")
+    return results
+
+
+def _forget_after_fork():
+    # Pool threads do not survive fork
+    global _fan_out_lock, _fan_out_executor
+    _fan_out_lock = threading.Lock()
+    _fan_out_executor = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_after_fork)
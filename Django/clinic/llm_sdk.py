@@ -0,0 +1,91 @@
+"""
+Provider SDKs imported on first use
+google-genai and openai take hundreds of milliseconds to import, which every
+management command, migration, test run and worker boot paid at startup - even
+for providers without an API key. Here an SDK is imported when a client for it
+is first needed, and only if that provider is configured:
+
+    LazyModule   stands in for an SDK module; the first attribute access imports it
+    LazyClient   instance attribute holding a provider's client, created on first
+                 access if the provider is configured (None otherwise)
+
+`python manage.py check_import_time` fails when startup grows past its budget
+or one of these SDKs is imported during startup again.
+"""
+
+import importlib
+import logging
+from importlib.util import find_spec
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+def sdk_available(module: str) -> bool:
+    """Whether an SDK is installed, without importing it"""
+    try:
+        return find_spec(module) is not None
+    except (ImportError, ValueError):
+        # A parent package is missing (e.g. 'google' for google.genai)
+        return False
+
+
+class LazyModule:
+    """
+    An SDK module imported on first attribute access.
+    Attributes set on it (e.g. by unittest.mock.patch) shadow the module's own.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    @property
+    def available(self) -> bool:
+        return self._module is not None or sdk_available(self._name)
+
+    def __getattr__(self, attr: str) -> Any:
+        # Only called for attributes not set on the proxy itself
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r}{'' if self._module is None else ' (imported)'}>"
+
+
+class LazyClient:
+    """
+    A provider's SDK client, created on first access (importing its SDK) if
+    `configured(instance)`, else None; None as well if creating it fails.
+    Assigning the attribute replaces the client (disabling a provider, tests).
+    """
+
+    def __init__(self, provider: str, create: Callable[[Any], Any], configured: Callable[[Any], bool]):
+        self.provider = provider
+        self.create = create
+        self.configured = configured
+        self.name = None
+
+    def __set_name__(self, owner, name: str):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        client = None
+        if self.configured(instance):
+            try:
+                client = self.create(instance)
+                logger.info(f"{self.provider} client initialized")
+            except Exception as e:
+                logger.error(f"{self.provider} initialization failed: {e}")
+        # Cached on the instance: later reads do not come back here
+        instance.__dict__[self.name] = client
+        return client
+
+    def is_configured(self, instance) -> bool:
+        """Whether the client exists or would be created, without creating it"""
+        if self.name in instance.__dict__:
+            return instance.__dict__[self.name] is not None
+        return bool(self.configured(instance))
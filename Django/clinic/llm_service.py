@@ -4,30 +4,145 @@ Supports multiple LLM providers: Gemini, OpenRouter (Qwen 3), Groq, and Cohere
 """
 
 import logging
-import re
-from typing import Dict, List
+from typing import Any, Callable, Dict, Iterator, List, Optional
 from django.conf import settings
 import os
-import requests
 import json
+import asyncio
+import weakref
+
+from . import llm_cache, llm_json, llm_providers, llm_standin
+from .llm_http import get_http_client, get_async_http_client
+from .llm_metrics import with_usage
+from .llm_routing import ProviderUnavailable, fan_out
+from .llm_sdk import LazyClient, LazyModule, sdk_available
+
+# Provider SDKs are imported on first use, and only for configured providers (see llm_sdk)
+genai = LazyModule('google.genai')
+cohere = LazyModule('cohere')
+GEMINI_AVAILABLE = genai.available
+OPENAI_AVAILABLE = sdk_available('openai')
+COHERE_AVAILABLE = cohere.available
+
+
+def OpenAI(*args, **kwargs):
+    """openai.OpenAI, imported on the first client created"""
+    from openai import OpenAI as openai_client
+    return openai_client(*args, **kwargs)
+
+
+def AsyncOpenAI(*args, **kwargs):
+    """openai.AsyncOpenAI, imported on the first client created"""
+    from openai import AsyncOpenAI as openai_client
+    return openai_client(*args, **kwargs)
+
+
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+
+# Built-in providers (see llm_providers); the order each method tries them in
+# is settings.LLM_ROUTING
+PROVIDERS = ('cohere', 'openrouter', 'groq', 'gemini')
+
+# Model used per provider (Cohere's chat endpoint answers with its default model)
+PROVIDER_MODELS = {
+    'cohere': 'default',
+    'openrouter': 'meta-llama/llama-3.2-3b-instruct:free',
+    'groq': 'llama-3.1-8b-instant',
+    'gemini': 'gemini-2.5-flash-lite',
+}
+
+# Providers whose API has a JSON output mode (the free OpenRouter model has none)
+STRUCTURED_OUTPUT_PROVIDERS = ('cohere', 'groq', 'gemini')
+
+# Shapes the JSON answers must have (see llm_json.validate); values the
+# normalizers coerce anyway, like a "0.85" confidence, are let through
+DIAGNOSIS_SCHEMA = {
+    'type': 'object',
+    'required': ['has_symptoms'],
+    'properties': {
+        'has_symptoms': {'type': 'boolean'},
+        'extracted_symptoms': {'type': ['array', 'null'], 'items': {'type': 'string'}},
+        'predicted_disease': {'type': ['string', 'null']},
+        'confidence_score': {'type': ['number', 'string', 'null']},
+        'top_predictions': {'type': ['array', 'null'], 'items': {'type': 'object'}},
+        'description': {'type': ['string', 'null']},
+        'precautions': {'type': ['array', 'null'], 'items': {'type': 'string'}},
+        'severity': {'type': ['string', 'null']},
+        'duration_days': {'type': ['number', 'string', 'null']},
+        'is_communicable': {'type': ['boolean', 'null']},
+        'is_acute': {'type': ['boolean', 'null']},
+        'icd10_code': {'type': ['string', 'null']},
+    },
+}
+
+CHAT_TURN_SCHEMA = {
+    **DIAGNOSIS_SCHEMA,
+    'required': ['has_symptoms', 'reply'],
+    'properties': {**DIAGNOSIS_SCHEMA['properties'], 'reply': {'type': 'string', 'minLength': 1}},
+}
+
+VALIDATION_SCHEMA = {
+    'type': 'object',
+    'required': ['agrees'],
+    'properties': {
+        'agrees': {'type': 'boolean'},
+        'confidence_adjustment': {'type': 'number'},
+        'reasoning': {'type': ['string', 'null']},
+        'alternative_diagnosis': {'type': ['string', 'null']},
+    },
+}
+
+INSIGHTS_SCHEMA = {
+    'type': 'array',
+    'items': {
+        'type': 'object',
+        'required': ['text'],
+        'properties': {'category': {'type': 'string'}, 'text': {'type': 'string', 'minLength': 1}},
+    },
+}
+
+CHAT_SYSTEM_PROMPT = """You are a compassionate health assistant for CPSU (Central Philippines State University) students.
+        
+Guidelines:
+- Provide supportive, empathetic health guidance
+- Support English, Filipino, and local Philippine dialects
+- Always recommend seeing clinic staff for serious concerns
+- Keep responses concise and actionable
+- Be culturally sensitive to Filipino students
+- Never diagnose - only provide general health information"""
 
-try:
-    from google import genai
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
+CHAT_FALLBACK_MESSAGE = (
+    "Thank you for your message. I'm currently experiencing technical issues with AI services. "
+    "Please consult with our clinic staff for proper evaluation."
+)
 
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
 
-try:
-    import cohere
-    COHERE_AVAILABLE = True
-except ImportError:
-    COHERE_AVAILABLE = False
+class GeneratorProvider(llm_providers.ProviderAdapter):
+    """A built-in provider: AIInsightGenerator's client and _<provider>_complete / _stream methods"""
+    
+    def __init__(self, generator: 'AIInsightGenerator', name: str):
+        self.generator = generator
+        self.name = name
+        self.model = PROVIDER_MODELS[name]
+        self.json_mode = name in STRUCTURED_OUTPUT_PROVIDERS
+        self.native_async = hasattr(generator, f'_{name}_complete_async')
+    
+    def configured(self) -> bool:
+        return self.generator._provider_configured(self.name)
+    
+    def complete(self, messages, max_tokens=500, temperature=0.6, stream=False, **options):
+        system, prompt = llm_providers.split_messages(messages)
+        complete = getattr(self.generator, f'_{self.name}_stream' if stream else f'_{self.name}_complete')
+        return complete(prompt, system=system, max_tokens=max_tokens, temperature=temperature, **options)
+    
+    async def complete_async(self, messages, max_tokens=500, temperature=0.6, **options):
+        system, prompt = llm_providers.split_messages(messages)
+        complete_async = getattr(self.generator, f'_{self.name}_complete_async')
+        return await complete_async(prompt, system=system, max_tokens=max_tokens, temperature=temperature, **options)
+
+
+for _provider in PROVIDERS:
+    llm_providers.register(_provider, lambda generator, name=_provider: GeneratorProvider(generator, name))
 
 
 class AIInsightGenerator:
@@ -37,6 +152,13 @@ class AIInsightGenerator:
     """
     _instance = None
     
+    gemini_client = LazyClient('gemini', lambda self: self._create_gemini_client(),
+                               lambda self: self._gemini_configured())
+    groq_client = LazyClient('groq', lambda self: self._create_groq_client(),
+                             lambda self: self._groq_configured())
+    cohere_client = LazyClient('cohere', lambda self: self._create_cohere_client(),
+                               lambda self: self._cohere_configured())
+    
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
@@ -49,95 +171,413 @@ class AIInsightGenerator:
         
         self.logger = logging.getLogger(__name__)
         self._initialized = True
+        # Async SDK clients by event loop (see _async_client)
+        self._async_clients = weakref.WeakKeyDictionary()
         
         # Check if we're in a production environment (Azure)
         self.is_production = os.getenv('WEBSITE_SITE_NAME') is not None  # Azure App Service indicator
         
-        # Initialize Gemini with new API (SKIP in production due to geographic restrictions)
-        self.gemini_client = None
+        # Local stand-in server for load tests (see llm_standin); any key is accepted there
+        if self._standin():
+            self.logger.warning(f"LLM providers replaced by the stand-in at {settings.LLM_STANDIN_URL}")
         
-        if not self.is_production and GEMINI_AVAILABLE and settings.GEMINI_API_KEY:
-            try:
-                self.gemini_client = genai.Client(api_key=settings.GEMINI_API_KEY)
-                self.logger.info("Gemini AI initialized successfully (new API) - Local development only")
-            except Exception as e:
-                self.logger.error(f"Gemini initialization failed: {e}")
-                self.gemini_client = None
+        # SDK clients are created on first use (see the LazyClient attributes above)
+        if self._standin():
+            self.logger.info("Gemini DISABLED (not emulated by the stand-in server)")
         elif self.is_production:
             self.logger.info("Gemini DISABLED in production (geographic restrictions)")
-        else:
+        elif not self._gemini_configured():
             self.logger.warning("Gemini not available - check API key or install google-genai")
         
         # Initialize OpenRouter (Qwen 3 free model)
         self.openrouter_api_key = None
-        if hasattr(settings, 'OPENROUTER_API_KEY') and settings.OPENROUTER_API_KEY:
-            self.openrouter_api_key = settings.OPENROUTER_API_KEY
+        if self._standin() or getattr(settings, 'OPENROUTER_API_KEY', None):
+            self.openrouter_api_key = getattr(settings, 'OPENROUTER_API_KEY', None) or 'standin'
             self.logger.info("OpenRouter API key configured (Qwen 3 free model)")
         else:
             self.logger.warning("OpenRouter not available - check OPENROUTER_API_KEY")
-            
-        # Initialize Groq (direct API, not OpenRouter)
-        self.groq_client = None
-        if OPENAI_AVAILABLE and hasattr(settings, 'GROQ_API_KEY') and settings.GROQ_API_KEY:
-            try:
-                self.groq_client = OpenAI(
-                    api_key=settings.GROQ_API_KEY,
-                    base_url="https://api.groq.com/openai/v1",
-                )
-                self.logger.info("Groq API initialized successfully")
-            except Exception as e:
-                self.logger.error(f"Groq initialization failed: {e}")
-                self.groq_client = None
-        else:
+        
+        if not self._groq_configured():
             self.logger.warning("Groq not available - check GROQ_API_KEY")
-            
-        # Initialize Cohere
-        if COHERE_AVAILABLE and settings.COHERE_API_KEY:
-            try:
-                self.cohere_client = cohere.Client(settings.COHERE_API_KEY)
-                self.logger.info("Cohere AI initialized successfully")
-            except Exception as e:
-                self.logger.error(f"Cohere initialization failed: {e}")
-                self.cohere_client = None
-        else:
-            self.cohere_client = None
+        if not self._cohere_configured():
+            self.logger.warning("Cohere not available - check COHERE_API_KEY")
         
         self.logger.info("AI Insight Generator initialized with real LLM APIs")
     
+    def _standin(self) -> bool:
+        return bool(getattr(settings, 'LLM_STANDIN_URL', ''))
+    
+    def _gemini_configured(self) -> bool:
+        # Skipped in production due to geographic restrictions
+        return bool(not self._standin() and not self.is_production and GEMINI_AVAILABLE
+                    and settings.GEMINI_API_KEY)
+    
+    def _groq_configured(self) -> bool:
+        return bool(OPENAI_AVAILABLE and (self._standin() or getattr(settings, 'GROQ_API_KEY', None)))
+    
+    def _cohere_configured(self) -> bool:
+        return bool(COHERE_AVAILABLE and (self._standin() or settings.COHERE_API_KEY))
+    
+    def _create_gemini_client(self):
+        """Gemini client on the shared connection pool"""
+        try:
+            return genai.Client(
+                api_key=settings.GEMINI_API_KEY,
+                http_options={'httpx_client': get_http_client('gemini')}
+            )
+        except (TypeError, ValueError):
+            # Older google-genai without HttpOptions.httpx_client keeps its own pool
+            return genai.Client(api_key=settings.GEMINI_API_KEY)
+    
+    def _create_groq_client(self):
+        """Groq client (OpenAI-compatible) on the shared connection pool"""
+        return OpenAI(
+            api_key=getattr(settings, 'GROQ_API_KEY', None) or 'standin',
+            base_url=llm_standin.base_url('groq') or "https://api.groq.com/openai/v1",
+            http_client=get_http_client('groq'),
+        )
+    
+    def _create_cohere_client(self):
+        """Cohere client on the shared connection pool"""
+        api_key = settings.COHERE_API_KEY or 'standin'
+        extra = {'base_url': llm_standin.base_url('cohere')} if llm_standin.base_url('cohere') else {}
+        try:
+            return cohere.Client(api_key, httpx_client=get_http_client('cohere'), **extra)
+        except TypeError:
+            # cohere < 5 has no httpx_client (or base_url) argument
+            return cohere.Client(api_key)
+    
+    def _create_gemini_async_client(self):
+        """Gemini's async API on the running loop's connection pool"""
+        try:
+            client = genai.Client(
+                api_key=settings.GEMINI_API_KEY,
+                http_options={'httpx_async_client': get_async_http_client('gemini')}
+            )
+        except (TypeError, ValueError):
+            client = genai.Client(api_key=settings.GEMINI_API_KEY)
+        return client.aio
+    
+    def _create_groq_async_client(self):
+        """Async Groq client (OpenAI-compatible) on the running loop's connection pool"""
+        return AsyncOpenAI(
+            api_key=getattr(settings, 'GROQ_API_KEY', None) or 'standin',
+            base_url=llm_standin.base_url('groq') or "https://api.groq.com/openai/v1",
+            http_client=get_async_http_client('groq'),
+        )
+    
+    def _create_cohere_async_client(self):
+        """Async Cohere client on the running loop's connection pool"""
+        api_key = settings.COHERE_API_KEY or 'standin'
+        extra = {'base_url': llm_standin.base_url('cohere')} if llm_standin.base_url('cohere') else {}
+        return cohere.AsyncClient(api_key, httpx_client=get_async_http_client('cohere'), **extra)
+    
+    def _async_client(self, provider: str):
+        """
+        A provider's async SDK client for the running event loop (async clients
+        and their pools are bound to the loop they were created on).
+        Raises ProviderUnavailable if the provider is not configured.
+        """
+        if not self._provider_configured(provider):
+            raise ProviderUnavailable(f"{provider} not configured")
+        clients = self._async_clients.setdefault(asyncio.get_running_loop(), {})
+        if provider not in clients:
+            clients[provider] = getattr(self, f'_create_{provider}_async_client')()
+        return clients[provider]
+    
+    def _openrouter_url(self) -> str:
+        standin_url = llm_standin.base_url('openrouter')
+        return f"{standin_url}/chat/completions" if standin_url else OPENROUTER_URL
+    
+    def _openrouter_headers(self) -> dict:
+        return {
+            "Authorization": f"Bearer {self.openrouter_api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "https://cpsu-health-assistant.edu.ph",
+            "X-Title": "CPSU Virtual Health Assistant",
+        }
+    
+    def _openrouter_post(self, payload: dict, timeout: float = 30):
+        """POST a chat completion to OpenRouter over the shared keep-alive pool"""
+        return get_http_client('openrouter').post(
+            self._openrouter_url(), headers=self._openrouter_headers(), json=payload, timeout=timeout
+        )
+    
+    async def _openrouter_post_async(self, payload: dict, timeout: float = 30):
+        """Async variant of _openrouter_post (pool bound to the running event loop)"""
+        return await get_async_http_client('openrouter').post(
+            self._openrouter_url(), headers=self._openrouter_headers(), json=payload, timeout=timeout
+        )
+    
     def _fix_json_response(self, text: str) -> str:
         """
         Fix common JSON errors in LLM responses.
         LLMs sometimes return malformed JSON that needs cleanup.
+        Returns the first JSON object re-serialized as valid JSON (see llm_json).
         """
         if not text:
             return text
+        return llm_json.repair(text)
+    
+    def _provider_configured(self, provider: str) -> bool:
+        """Checked without creating clients: an SDK is only imported once its provider is called"""
+        if provider == 'openrouter':
+            return bool(self.openrouter_api_key)
+        return type(self).__dict__[f'{provider}_client'].is_configured(self)
+    
+    def run_concurrently(self, calls: Dict[str, Callable[[], Any]], timeout: float = None) -> Dict[str, Any]:
+        """
+        Run independent LLM calls (e.g. validate_ml_prediction and
+        generate_health_insights) in parallel with one shared deadline
+        (default LLM_FAN_OUT_TIMEOUT seconds).
         
-        # Fix "true/false" literal (LLM copies from prompt example)
-        text = re.sub(r':\s*true/false', ': true', text)
-        
-        # Fix trailing commas before closing braces
-        text = re.sub(r',\s*}', '}', text)
-        text = re.sub(r',\s*]', ']', text)
-        
-        # Fix single quotes to double quotes
-        # Be careful not to change apostrophes in text
-        text = re.sub(r"'(\w+)':", r'"\1":', text)  # 'key': -> "key":
-        text = re.sub(r":\s*'([^']*)'", r': "\1"', text)  # : 'value' -> : "value"
-        
-        # Fix unquoted null
-        text = re.sub(r':\s*null\b', ': null', text, flags=re.IGNORECASE)
-        text = re.sub(r':\s*None\b', ': null', text)
-        
-        # Fix Python-style booleans
-        text = re.sub(r':\s*True\b', ': true', text)
-        text = re.sub(r':\s*False\b', ': false', text)
+        Returns:
+            Results by name; calls that failed or timed out are missing (partial results)
+        """
+        if timeout is None:
+            timeout = getattr(settings, 'LLM_FAN_OUT_TIMEOUT', 45)
+        return fan_out(calls, timeout)
+    
+    def _cohere_kwargs(self, prompt: str, system: str = None, json_mode: bool = False) -> dict:
+        kwargs = {'message': prompt}
+        if system:
+            kwargs['preamble'] = system
+        if json_mode:
+            kwargs['response_format'] = {"type": "json_object"}
+        return kwargs
+    
+    def _cohere_content(self, response) -> str:
+        usage = getattr(getattr(response, 'meta', None), 'billed_units', None)
+        return with_usage(response.text, getattr(usage, 'input_tokens', None), getattr(usage, 'output_tokens', None))
+    
+    def _cohere_complete(self, prompt: str, system: str = None, json_mode: bool = False, **options) -> str:
+        response = self.cohere_client.chat(**self._cohere_kwargs(prompt, system, json_mode))
+        return self._cohere_content(response)
+    
+    async def _cohere_complete_async(self, prompt: str, system: str = None, json_mode: bool = False,
+                                     **options) -> str:
+        response = await self._async_client('cohere').chat(**self._cohere_kwargs(prompt, system, json_mode))
+        return self._cohere_content(response)
+    
+    def _cohere_stream(self, prompt: str, system: str = None, **options):
+        kwargs = {'preamble': system} if system else {}
+        for event in self.cohere_client.chat_stream(message=prompt, **kwargs):
+            if getattr(event, 'event_type', None) == 'text-generation' and event.text:
+                yield event.text
+    
+    def _openrouter_payload(self, prompt: str, system: str = None, temperature: float = 0.6,
+                            max_tokens: int = 500) -> dict:
+        # Llama 3.2 3B Instruct (FREE model)
+        messages = [{"role": "system", "content": system}] if system else []
+        return {
+            "model": PROVIDER_MODELS['openrouter'],
+            "messages": messages + [{"role": "user", "content": prompt}],
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+    
+    def _openrouter_content(self, response) -> str:
+        if response.status_code != 200:
+            raise ValueError(f"OpenRouter failed with status {response.status_code}: {response.text[:200]}")
+        body = response.json()
+        content = body['choices'][0]['message']['content']
+        if not content or not content.strip():
+            raise ValueError("Empty response from OpenRouter")
+        usage = body.get('usage') or {}
+        return with_usage(content, usage.get('prompt_tokens'), usage.get('completion_tokens'))
+    
+    def _openrouter_complete(self, prompt: str, system: str = None, temperature: float = 0.6,
+                             max_tokens: int = 500, timeout: float = 30, **options) -> str:
+        response = self._openrouter_post(self._openrouter_payload(prompt, system, temperature, max_tokens), timeout=timeout)
+        return self._openrouter_content(response)
+    
+    async def _openrouter_complete_async(self, prompt: str, system: str = None, temperature: float = 0.6,
+                                         max_tokens: int = 500, timeout: float = 30, **options) -> str:
+        payload = self._openrouter_payload(prompt, system, temperature, max_tokens)
+        response = await self._openrouter_post_async(payload, timeout=timeout)
+        return self._openrouter_content(response)
+    
+    def _openrouter_stream(self, prompt: str, system: str = None, temperature: float = 0.6,
+                           max_tokens: int = 500, timeout: float = 30, **options):
+        """Server-sent chat completion chunks from OpenRouter"""
+        payload = {**self._openrouter_payload(prompt, system, temperature, max_tokens), "stream": True}
+        with get_http_client('openrouter').stream(
+            'POST', self._openrouter_url(), headers=self._openrouter_headers(), json=payload, timeout=timeout
+        ) as response:
+            if response.status_code != 200:
+                response.read()
+                raise ValueError(f"OpenRouter failed with status {response.status_code}: {response.text[:200]}")
+            for line in response.iter_lines():
+                # Lines starting with ':' are keep-alive comments
+                if not line.startswith('data:'):
+                    continue
+                data = line[len('data:'):].strip()
+                if data == '[DONE]':
+                    break
+                delta = json.loads(data)['choices'][0].get('delta', {})
+                if delta.get('content'):
+                    yield delta['content']
+    
+    def _groq_error(self, e: Exception) -> Exception:
+        """Log a Groq failure; errors a retry will not fix become ProviderUnavailable"""
+        error_msg = str(e)
+        if '403' in error_msg or 'Forbidden' in error_msg:
+            self.logger.error(f"Groq failed: 403 Forbidden - Invalid API key or rate limit exceeded")
+            return ProviderUnavailable(f"Groq 403 Forbidden: {error_msg[:100]}", cooldown=600)
+        elif '401' in error_msg:
+            self.logger.error(f"Groq failed: 401 Unauthorized - Check API key")
+            return ProviderUnavailable(f"Groq 401 Unauthorized: {error_msg[:100]}")
+        elif '429' in error_msg:
+            self.logger.error(f"Groq failed: 429 Rate limit exceeded")
+        return e
+    
+    def _groq_kwargs(self, prompt: str, system: str, temperature: float, max_tokens: int,
+                     top_p: float = None, stream: bool = False, json_mode: bool = False) -> dict:
+        messages = [{"role": "system", "content": system}] if system else []
+        extra = {'top_p': top_p} if top_p is not None else {}
+        if json_mode:
+            extra['response_format'] = {"type": "json_object"}
+        return dict(
+            model=PROVIDER_MODELS['groq'],
+            messages=messages + [{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_completion_tokens=max_tokens,
+            stream=stream,
+            **extra
+        )
+    
+    def _groq_request(self, prompt: str, system: str, temperature: float, max_tokens: int,
+                      top_p: float = None, stream: bool = False, json_mode: bool = False):
+        try:
+            return self.groq_client.chat.completions.create(
+                **self._groq_kwargs(prompt, system, temperature, max_tokens, top_p, stream, json_mode)
+            )
+        except Exception as e:
+            error = self._groq_error(e)
+            if error is e:
+                raise
+            raise error from e
+    
+    def _groq_content(self, response) -> str:
+        result = response.choices[0].message.content
+        if not result or not result.strip():
+            raise ValueError("Empty response from Groq")
+        usage = getattr(response, 'usage', None)
+        return with_usage(result, getattr(usage, 'prompt_tokens', None), getattr(usage, 'completion_tokens', None))
+    
+    def _groq_complete(self, prompt: str, system: str = None, temperature: float = 0.6,
+                       max_tokens: int = 500, top_p: float = None, json_mode: bool = False, **options) -> str:
+        response = self._groq_request(prompt, system, temperature, max_tokens, top_p, json_mode=json_mode)
+        return self._groq_content(response)
+    
+    async def _groq_complete_async(self, prompt: str, system: str = None, temperature: float = 0.6,
+                                   max_tokens: int = 500, top_p: float = None, json_mode: bool = False,
+                                   **options) -> str:
+        kwargs = self._groq_kwargs(prompt, system, temperature, max_tokens, top_p, json_mode=json_mode)
+        try:
+            response = await self._async_client('groq').chat.completions.create(**kwargs)
+        except Exception as e:
+            error = self._groq_error(e)
+            if error is e:
+                raise
+            raise error from e
+        return self._groq_content(response)
+    
+    def _groq_stream(self, prompt: str, system: str = None, temperature: float = 0.6,
+                     max_tokens: int = 500, top_p: float = None, **options):
+        for chunk in self._groq_request(prompt, system, temperature, max_tokens, top_p, stream=True):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    def _gemini_kwargs(self, prompt: str, system: str = None, context: str = None,
+                       json_mode: bool = False) -> dict:
+        if system:
+            prompt = f"{system}\n\nUser message: {prompt}"
+        if context is not None:
+            prompt += f"\n\nContext: {context}"
+        extra = {'config': {'response_mime_type': 'application/json'}} if json_mode else {}
+        return dict(model=PROVIDER_MODELS['gemini'], contents=prompt, **extra)
+    
+    def _gemini_error(self, e: Exception) -> Exception:
+        """Log a Gemini failure; a geographic restriction disables Gemini (ProviderUnavailable)"""
+        error_msg = str(e)
+        if 'FAILED_PRECONDITION' in error_msg or 'location is not supported' in error_msg:
+            self.logger.error(f"Gemini failed: Geographic restriction - User location not supported")
+            # Disable Gemini in this process; the open circuit covers the other workers
+            self.gemini_client = None
+            return ProviderUnavailable("Gemini: location not supported")
+        elif '400' in error_msg:
+            self.logger.error(f"Gemini failed: 400 Bad Request - {error_msg[:100]}")
+        return e
+    
+    def _gemini_request(self, prompt: str, system: str = None, context: str = None, stream: bool = False,
+                        json_mode: bool = False):
+        gemini_client = self.gemini_client
+        if gemini_client is None:
+            raise ValueError("Gemini disabled")
+        generate = gemini_client.models.generate_content_stream if stream else gemini_client.models.generate_content
+        try:
+            return generate(**self._gemini_kwargs(prompt, system, context, json_mode))
+        except Exception as e:
+            error = self._gemini_error(e)
+            if error is e:
+                raise
+            raise error from e
+    
+    def _gemini_content(self, response) -> str:
+        usage = getattr(response, 'usage_metadata', None)
+        return with_usage(response.text, getattr(usage, 'prompt_token_count', None),
+                          getattr(usage, 'candidates_token_count', None))
+    
+    def _gemini_complete(self, prompt: str, system: str = None, context: str = None,
+                         json_mode: bool = False, **options) -> str:
+        return self._gemini_content(self._gemini_request(prompt, system, context, json_mode=json_mode))
+    
+    async def _gemini_complete_async(self, prompt: str, system: str = None, context: str = None,
+                                     json_mode: bool = False, **options) -> str:
+        kwargs = self._gemini_kwargs(prompt, system, context, json_mode)
+        try:
+            response = await self._async_client('gemini').models.generate_content(**kwargs)
+        except Exception as e:
+            error = self._gemini_error(e)
+            if error is e:
+                raise
+            raise error from e
+        return self._gemini_content(response)
+    
+    def _gemini_stream(self, prompt: str, system: str = None, context: str = None, **options):
+        for chunk in self._gemini_request(prompt, system, context, stream=True):
+            if chunk.text:
+                yield chunk.text
+    
+    def _dispatch(self, method: str, prompt: str, system: str = None, options: Dict[str, Dict] = None,
+                  validate: Callable[[str], bool] = None, key=None):
+        """
+        The one path from a generator method to the providers: the method's
+        routing policy (settings.LLM_ROUTING) picks and orders them.
         
-        return text
+        Returns:
+            (text, provider) or (None, None) if every provider failed
+        """
+        return llm_providers.dispatch(method, llm_providers.messages(prompt, system), self,
+                                      options=options, validate=validate, key=key)
+    
+    def _dispatch_stream(self, method: str, prompt: str, system: str = None, options: Dict[str, Dict] = None,
+                         outcome: dict = None) -> Iterator[str]:
+        """Streaming variant of _dispatch"""
+        return llm_providers.stream(method, llm_providers.messages(prompt, system), self,
+                                    options=options, outcome=outcome)
+    
+    def _chat_options(self, context: dict = None) -> dict:
+        # Only Gemini gets the conversation context appended
+        return {'gemini': {'context': context.get('summary', '') if context else None}}
     
     def generate_chat_response(self, message: str, context: dict = None) -> str:
         """
         Generate AI response for health chat using available LLM.
-        Tries Groq first, then Qwen (OpenRouter), then Cohere, then Gemini.
+        Tries Cohere first, then OpenRouter, then Groq, then Gemini. With
+        LLM_HEDGING_ENABLED a slow provider is raced against the next one
+        (see llm_routing). Context-free replies are cached (see llm_cache).
         
         Args:
             message: User's message
@@ -146,136 +586,46 @@ class AIInsightGenerator:
         Returns:
             AI-generated response
         """
-        # Build system prompt
-        system_prompt = """You are a compassionate health assistant for CPSU (Central Philippines State University) students.
-        
-Guidelines:
-- Provide supportive, empathetic health guidance
-- Support English, Filipino, and local Philippine dialects
-- Always recommend seeing clinic staff for serious concerns
-- Keep responses concise and actionable
-- Be culturally sensitive to Filipino students
-- Never diagnose - only provide general health information"""
-        
-        # Fallback chain: Cohere → OpenRouter → Groq (Gemini disabled in production)
-        # Cohere is most reliable for global deployments
+        # Replies depend on the context, so only context-free turns are cached
+        if not context:
+            cached = llm_cache.get('chat', message)
+            if cached is not None:
+                return cached
         
-        # Try Cohere first (most reliable globally)
-        if self.cohere_client:
-            try:
-                response = self.cohere_client.chat(
-                    message=message,
-                    preamble=system_prompt
-                )
-                self.logger.info("Response from Cohere")
-                return response.text
-            except Exception as e:
-                self.logger.warning(f"Cohere failed: {e}, trying OpenRouter...")
-        else:
-            self.logger.info("Cohere client not initialized - skipping")
-        
-        # Try OpenRouter second (free models available)
-        if self.openrouter_api_key:
-            try:
-                # Use Llama 3.2 3B Instruct (FREE model)
-                payload = {
-                    "model": "meta-llama/llama-3.2-3b-instruct:free",
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": message}
-                    ],
-                    "temperature": 0.6,
-                    "max_tokens": 500
-                }
-                
-                response = requests.post(
-                    url="https://openrouter.ai/api/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.openrouter_api_key}",
-                        "Content-Type": "application/json",
-                        "HTTP-Referer": "https://cpsu-health-assistant.edu.ph",
-                        "X-Title": "CPSU Virtual Health Assistant",
-                    },
-                    json=payload,
-                    timeout=30
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    content = result['choices'][0]['message']['content']
-                    if content and content.strip():
-                        self.logger.info("Response from OpenRouter (Llama 3.2 3B Free)")
-                        return content
-                    else:
-                        raise ValueError("Empty response from OpenRouter")
-                else:
-                    self.logger.error(f"OpenRouter failed with status {response.status_code}: {response.text[:200]}")
-            except Exception as e:
-                self.logger.warning(f"OpenRouter failed: {e}, trying Groq...")
-        else:
-            self.logger.info("OpenRouter API key not configured - skipping")
-        
-        # Try Groq third (fast, free tier)
-        if self.groq_client:
-            try:
-                response = self.groq_client.chat.completions.create(
-                    model="llama-3.1-8b-instant",
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": message}
-                    ],
-                    temperature=0.6,
-                    max_completion_tokens=1024,
-                    top_p=0.95,
-                    stream=False
-                )
-                result = response.choices[0].message.content
-                if result and result.strip():
-                    self.logger.info("Response from Groq (Llama 3.1 8B Instant - FREE)")
-                    return result
-                else:
-                    raise ValueError("Empty response from Groq")
-            except Exception as e:
-                error_msg = str(e)
-                if '403' in error_msg or 'Forbidden' in error_msg:
-                    self.logger.error(f"Groq failed: 403 Forbidden - Invalid API key or rate limit exceeded")
-                elif '401' in error_msg:
-                    self.logger.error(f"Groq failed: 401 Unauthorized - Check API key")
-                elif '429' in error_msg:
-                    self.logger.error(f"Groq failed: 429 Rate limit exceeded")
-                else:
-                    self.logger.warning(f"Groq failed: {error_msg}, trying Gemini...")
-        else:
-            self.logger.info("Groq client not initialized - skipping")
-        
-        # Try Gemini second (ONLY in local development)
-        if self.gemini_client:
-            try:
-                prompt = f"{system_prompt}\n\nUser message: {message}"
-                if context:
-                    prompt += f"\n\nContext: {context.get('summary', '')}"
-                
-                response = self.gemini_client.models.generate_content(
-                    model="gemini-2.5-flash-lite",
-                    contents=prompt
-                )
-                self.logger.info("Response from Gemini 2.5 Flash")
-                return response.text
-            except Exception as e:
-                error_msg = str(e)
-                if 'FAILED_PRECONDITION' in error_msg or 'location is not supported' in error_msg:
-                    self.logger.error(f"Gemini failed: Geographic restriction - User location not supported")
-                    # Disable Gemini for future requests in this session
-                    self.gemini_client = None
-                elif '400' in error_msg:
-                    self.logger.error(f"Gemini failed: 400 Bad Request - {error_msg[:100]}")
-                else:
-                    self.logger.warning(f"Gemini failed: {e}, trying OpenRouter...")
-        else:
-            self.logger.info("Gemini client not available - skipping")
+        text, provider = self._dispatch('chat', message, CHAT_SYSTEM_PROMPT, self._chat_options(context),
+                                        key=[message, context])
+        if text:
+            if not context:
+                llm_cache.put('chat', message, text)
+            return text
         
         # Ultimate fallback message if all providers fail
-        return "Thank you for your message. I'm currently experiencing technical issues with AI services. Please consult with our clinic staff for proper evaluation."
+        return CHAT_FALLBACK_MESSAGE
+    
+    def _stream_chat(self, message: str, context: dict = None) -> Iterator[str]:
+        """Chat reply chunks from the first provider that streams one (nothing if all fail)"""
+        if not context:
+            cached = llm_cache.get('chat', message)
+            if cached is not None:
+                yield cached
+                return
+        
+        parts = []
+        outcome = {}
+        for chunk in self._dispatch_stream('chat', message, CHAT_SYSTEM_PROMPT, self._chat_options(context), outcome):
+            parts.append(chunk)
+            yield chunk
+        if parts and outcome.get('complete') and not context:
+            llm_cache.put('chat', message, ''.join(parts))
+    
+    def stream_chat_response(self, message: str, context: dict = None) -> Iterator[str]:
+        """Streaming variant of generate_chat_response: yields text chunks as they arrive"""
+        streamed = False
+        for chunk in self._stream_chat(message, context):
+            streamed = True
+            yield chunk
+        if not streamed:
+            yield CHAT_FALLBACK_MESSAGE
     
     def generate_health_insights(self, symptoms: list, predictions: dict, chat_summary: str = None) -> list:
         """
@@ -307,69 +657,8 @@ Respond ONLY with a JSON array in this exact format:
 
 Keep each insight under 100 words. Be culturally sensitive to Filipino students."""
 
-        # Try providers in order: Cohere → OpenRouter → Groq (Gemini disabled in production)
-        insights_text = None
-        
-        # Try Cohere first (most reliable)
-        if self.cohere_client:
-            try:
-                response = self.cohere_client.chat(
-                    message=prompt
-                )
-                insights_text = response.text
-                self.logger.info("Health insights from Cohere")
-            except Exception as e:
-                self.logger.warning(f"Cohere insights failed: {e}")
-        
-        # Try OpenRouter second (free model)
-        if not insights_text and self.openrouter_api_key:
-            try:
-                response = requests.post(
-                    url="https://openrouter.ai/api/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.openrouter_api_key}",
-                        "Content-Type": "application/json",
-                    },
-                    json={
-                        "model": "meta-llama/llama-3.2-3b-instruct:free",
-                        "messages": [{"role": "user", "content": prompt}],
-                        "temperature": 0.5,
-                        "max_tokens": 800
-                    },
-                    timeout=30
-                )
-                if response.status_code == 200:
-                    insights_text = response.json()['choices'][0]['message']['content']
-                    self.logger.info("Health insights from OpenRouter")
-            except Exception as e:
-                self.logger.warning(f"OpenRouter insights failed: {e}")
-        
-        # Try Groq third
-        if not insights_text and self.groq_client:
-            try:
-                response = self.groq_client.chat.completions.create(
-                    model="llama-3.1-8b-instant",
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.5,
-                    max_completion_tokens=800,
-                    stream=False
-                )
-                insights_text = response.choices[0].message.content
-                self.logger.info("Health insights from Groq (Llama 3.1 8B - FREE)")
-            except Exception as e:
-                self.logger.warning(f"Groq insights failed: {e}")
-        
-        # Try Gemini last (ONLY in local development)
-        if not insights_text and self.gemini_client:
-            try:
-                response = self.gemini_client.models.generate_content(
-                    model="gemini-2.5-flash-lite",
-                    contents=prompt
-                )
-                insights_text = response.text
-                self.logger.info("Health insights from Gemini")
-            except Exception as e:
-                self.logger.warning(f"Gemini insights failed: {e}")
+        # Providers in LLM_ROUTING order: Cohere → OpenRouter → Groq → Gemini (local development only)
+        insights_text, provider = self._dispatch('insights', prompt, key=prompt)
         
         # Parse LLM response into structured insights
         if insights_text:
@@ -383,21 +672,7 @@ Keep each insight under 100 words. Be culturally sensitive to Filipino students.
     
     def _parse_insights_response(self, insights_text: str, disease: str, confidence: float) -> list:
         """Parse LLM response into structured insights"""
-        # Clean up response - extract JSON if wrapped in markdown
-        text = insights_text.strip()
-        if '```json' in text:
-            text = text.split('```json')[1].split('```')[0].strip()
-        elif '```' in text:
-            text = text.split('```')[1].split('```')[0].strip()
-        
-        # Try to find JSON array
-        if not text.startswith('['):
-            json_match = re.search(r'\[[\s\S]*\]', text)
-            if json_match:
-                text = json_match.group(0)
-        
-        # Parse JSON
-        parsed = json.loads(text)
+        parsed = llm_json.extract(insights_text, INSIGHTS_SCHEMA)
         
         # Add reliability scores based on category
         reliability_map = {'Prevention': 0.85, 'Monitoring': 0.90, 'Medical Advice': confidence or 0.75}
@@ -467,83 +742,16 @@ Respond ONLY in this exact JSON format:
 
 Be concise. Focus on medical accuracy."""
 
-            # Try Cohere first (most globally reliable from Azure)
-            if self.cohere_client:
-                try:
-                    response = self.cohere_client.chat(message=prompt)
-                    result_text = response.text.strip()
-                    parsed = self._extract_validation_json(result_text)
-                    if parsed:
-                        self.logger.info(f"Cohere validation: agrees={parsed.get('agrees')}")
-                        return parsed
-                except Exception as e:
-                    self.logger.warning(f"Cohere validation failed: {e}, trying Groq...")
-
-            # Try Groq second (fast, but 403 from some Azure regions)
-            if self.groq_client:
-                try:
-                    response = self.groq_client.chat.completions.create(
-                        model="llama-3.1-8b-instant",
-                        messages=[{"role": "user", "content": prompt}],
-                        temperature=0.3,
-                        max_completion_tokens=500,
-                        stream=False
-                    )
-                    result_text = response.choices[0].message.content
-                    if result_text and result_text.strip():
-                        parsed = self._extract_validation_json(result_text.strip())
-                        if parsed:
-                            self.logger.info(f"Groq validation: agrees={parsed.get('agrees_with_ml')}")
-                            return parsed
-                except Exception as e:
-                    self.logger.warning(f"Groq validation failed: {e}, trying OpenRouter...")
-
-            # Try OpenRouter third
-            if self.openrouter_api_key:
-                try:
-                    response = requests.post(
-                        url="https://openrouter.ai/api/v1/chat/completions",
-                        headers={
-                            "Authorization": f"Bearer {self.openrouter_api_key}",
-                            "Content-Type": "application/json",
-                            "HTTP-Referer": "https://cpsu-health-assistant.edu.ph",
-                            "X-Title": "CPSU Virtual Health Assistant",
-                        },
-                        json={
-                            "model": "meta-llama/llama-3.2-3b-instruct:free",
-                            "messages": [{"role": "user", "content": prompt}],
-                            "temperature": 0.3,
-                            "max_tokens": 500
-                        },
-                        timeout=30
-                    )
-                    if response.status_code == 200:
-                        result_text = response.json()['choices'][0]['message']['content']
-                        if result_text and result_text.strip():
-                            parsed = self._extract_validation_json(result_text.strip())
-                            if parsed:
-                                self.logger.info(f"OpenRouter validation: agrees={parsed.get('agrees_with_ml')}")
-                                return parsed
-                    else:
-                        self.logger.warning(f"OpenRouter returned {response.status_code}")
-                except Exception as e:
-                    self.logger.warning(f"OpenRouter validation failed: {e}")
-
-            # Try Gemini last (local dev only)
-            if self.gemini_client:
-                try:
-                    response = self.gemini_client.models.generate_content(
-                        model="gemini-2.5-flash-lite",
-                        contents=prompt
-                    )
-                    parsed = self._extract_validation_json(response.text.strip())
-                    if parsed:
-                        self.logger.info(f"Gemini validation: agrees={parsed.get('agrees_with_ml')}")
-                        return parsed
-                except Exception as e:
-                    if 'FAILED_PRECONDITION' in str(e) or 'location is not supported' in str(e):
-                        self.gemini_client = None
-                    self.logger.warning(f"Gemini validation failed: {e}")
+            # Provider order is LLM_ROUTING['validation']
+            result_text, provider = self._dispatch(
+                'validation', prompt,
+                validate=lambda text: self._extract_validation_json(text.strip()) is not None,
+                key=prompt
+            )
+            if result_text:
+                parsed = self._extract_validation_json(result_text.strip())
+                self.logger.info(f"{provider} validation: agrees={parsed.get('agrees_with_ml')}")
+                return parsed
 
             return {
                 'agrees_with_ml': True,
@@ -582,6 +790,9 @@ Be concise. Focus on medical accuracy."""
                 "icd10_code": "J00"
             }
         """
+        cached = llm_cache.get('extract_and_predict', message)
+        if cached is not None:
+            return cached
 
         prompt = f"""You are an expert medical diagnostic assistant. A university student sent the following message in a health chatbot:
 
@@ -622,76 +833,28 @@ Respond ONLY with this JSON (no markdown fences, no explanation):
   "icd10_code": ""
 }}"""
 
-        result_text = None
-
-        if self.cohere_client:
-            try:
-                resp = self.cohere_client.chat(message=prompt)
-                result_text = resp.text
-                self.logger.info("Symptom extraction + prediction from Cohere")
-            except Exception as e:
-                self.logger.warning(f"Cohere extract_and_predict failed: {e}")
-
-        if not result_text and self.openrouter_api_key:
-            try:
-                resp = requests.post(
-                    url="https://openrouter.ai/api/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.openrouter_api_key}",
-                        "Content-Type": "application/json",
-                    },
-                    json={
-                        "model": "meta-llama/llama-3.2-3b-instruct:free",
-                        "messages": [{"role": "user", "content": prompt}],
-                        "temperature": 0.3,
-                        "max_tokens": 600,
-                    },
-                    timeout=30,
-                )
-                if resp.status_code == 200:
-                    result_text = resp.json()["choices"][0]["message"]["content"]
-                    self.logger.info("Symptom extraction + prediction from OpenRouter")
-            except Exception as e:
-                self.logger.warning(f"OpenRouter extract_and_predict failed: {e}")
-
-        if not result_text and self.groq_client:
-            try:
-                resp = self.groq_client.chat.completions.create(
-                    model="llama-3.1-8b-instant",
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.3,
-                    max_completion_tokens=600,
-                    stream=False,
-                )
-                result_text = resp.choices[0].message.content
-                self.logger.info("Symptom extraction + prediction from Groq")
-            except Exception as e:
-                self.logger.warning(f"Groq extract_and_predict failed: {e}")
+        result_text, provider = self._dispatch('extract_and_predict', prompt, key=prompt)
 
         if result_text:
             try:
-                return self._parse_prediction_result(result_text)
+                result = self._parse_prediction_result(result_text)
+                llm_cache.put('extract_and_predict', message, result)
+                return result
             except Exception as e:
                 self.logger.error(f"Failed to parse extract_and_predict result: {e}")
 
         return self._empty_prediction()
 
+    def _load_json_object(self, text: str, schema: Dict = DIAGNOSIS_SCHEMA) -> Dict:
+        """Parse a JSON object from an LLM response (markdown fences and common errors tolerated)"""
+        return llm_json.extract(text, schema)
+
     def _parse_prediction_result(self, text: str) -> Dict:
         """Parse the combined extraction+prediction JSON from Cohere."""
-        clean = text.strip()
-        if "```json" in clean:
-            clean = clean.split("```json")[1].split("```")[0].strip()
-        elif "```" in clean:
-            clean = clean.split("```")[1].split("```")[0].strip()
-
-        if not clean.startswith("{"):
-            json_match = re.search(r'\{[\s\S]*\}', clean)
-            if json_match:
-                clean = json_match.group(0)
-
-        clean = self._fix_json_response(clean)
-        parsed = json.loads(clean)
+        return self._prediction_from_json(self._load_json_object(text))
 
+    def _prediction_from_json(self, parsed: Dict) -> Dict:
+        """Normalize the extraction+prediction fields of a parsed LLM answer"""
         has_symptoms = parsed.get("has_symptoms", False)
         if not has_symptoms:
             return self._empty_prediction()
@@ -752,15 +915,110 @@ Respond ONLY with this JSON (no markdown fences, no explanation):
             "icd10_code": "",
         }
 
-    def generate_followup_questions(self, symptoms: list, message: str) -> str:
+    def _chat_turn_prompt(self, message: str, followup: bool) -> str:
+        if followup:
+            reply_task = """4. Write "reply", the message the student will read:
+   - No symptoms: a short, supportive answer (general health information only, never a diagnosis).
+   - Symptoms present: do NOT give the diagnosis yet. Write a warm, empathetic opening (1 sentence
+     acknowledging their symptoms), then ask 1-2 SHORT follow-up questions. You MUST always ask how many
+     days they have had these symptoms; the second question should be directly relevant to the symptoms
+     (e.g. dry cough or phlegm, throbbing or constant headache). Under 80 words."""
+        else:
+            reply_task = """4. Write "reply", the message the student will read:
+   - No symptoms: a short, supportive answer (general health information only).
+   - Symptoms present: acknowledge their symptoms empathetically, share the predicted condition and
+     confidence level, give 2-3 practical self-care tips from the precautions, and remind them to visit
+     the CPSU campus clinic if symptoms persist or worsen. Under 200 words. Do NOT use markdown headers;
+     plain text with bullet points (•) if needed."""
+
+        return f"""You are a caring health assistant and expert medical diagnostic assistant for CPSU (Central Philippines State University) students. Support English, Filipino, and local Philippine dialects and be culturally sensitive to Filipino students.
+
+STUDENT MESSAGE: "{message}"
+
+Your tasks:
+1. Determine if the message contains any health symptoms. If the student is just greeting, asking a general question, or chatting casually, set "has_symptoms" to false and leave the diagnosis fields empty.
+2. If symptoms are present:
+   a. Extract every symptom mentioned (use medical terminology with underscores, e.g. "bad cough" → "cough", "runny nose" → "continuous_sneezing", "mild fever" → "mild_fever").
+   b. Predict the most likely disease/condition with a confidence score (0.0 to 1.0) and the top 3 most likely conditions.
+   c. Write a brief 1-2 sentence description of the predicted disease and 3-4 practical precautions.
+   d. Estimate severity (mild/moderate/severe) and duration in days (default 1 if not mentioned).
+   e. Determine if the disease is communicable and if it is acute, and give the ICD-10 code if you know it.
+3. Base the reply on your own analysis in the same answer.
+{reply_task}
+
+Respond ONLY with this JSON (no markdown fences, no explanation):
+{{
+  "has_symptoms": true,
+  "extracted_symptoms": ["symptom_one", "symptom_two"],
+  "predicted_disease": "Disease Name",
+  "confidence_score": 0.85,
+  "top_predictions": [
+    {{"disease": "Disease Name", "confidence": 0.85}},
+    {{"disease": "Second Disease", "confidence": 0.10}},
+    {{"disease": "Third Disease", "confidence": 0.05}}
+  ],
+  "description": "Brief description of the predicted disease.",
+  "precautions": ["precaution 1", "precaution 2", "precaution 3"],
+  "severity": "moderate",
+  "duration_days": 1,
+  "is_communicable": false,
+  "is_acute": true,
+  "icd10_code": "",
+  "reply": "Message to the student"
+}}"""
+
+    def _parse_chat_turn(self, text: str, followup: bool) -> Optional[Dict]:
+        try:
+            parsed = self._load_json_object(text, CHAT_TURN_SCHEMA)
+            reply = parsed.get("reply")
+            diagnosis = self._prediction_from_json(parsed)
+        except Exception as e:
+            self.logger.warning(f"Unusable chat turn answer: {e}")
+            return None
+        if not isinstance(reply, str) or not reply.strip():
+            return None
+        return {
+            "diagnosis": diagnosis,
+            "reply": reply.strip(),
+            "awaiting_followup": followup and diagnosis["has_symptoms"] and bool(diagnosis["extracted_symptoms"]),
+        }
+
+    def generate_chat_turn(self, message: str, followup: bool = True) -> Optional[Dict]:
         """
-        Given initial symptoms, use Cohere to ask 1-2 targeted clarifying questions
-        before making a final diagnosis.  Returns a plain-text reply the chatbot
-        can send directly to the student.
+        One structured completion for a whole chat turn: extract_and_predict's
+        diagnosis plus the reply text (follow-up questions when `followup` and
+        symptoms were found, otherwise the diagnosis or general reply).
+        Only providers with a JSON output mode are used (json_mode in LLM_ROUTING['chat_turn']).
+
+        Returns:
+            {"diagnosis": {...}, "reply": str, "awaiting_followup": bool}, or None
+            if no such provider answered - callers then make the separate calls
         """
+        if not getattr(settings, 'LLM_COMBINED_CHAT_TURN', True):
+            return None
+        # Only first turns repeat across students; follow-up answers carry the original complaint
+        if followup:
+            cached = llm_cache.get('chat_turn', message)
+            if cached is not None:
+                return cached
+
+        text, provider = self._dispatch(
+            'chat_turn', self._chat_turn_prompt(message, followup),
+            validate=lambda text: self._parse_chat_turn(text, followup) is not None,
+            key=[message, followup]
+        )
+        if not text:
+            return None
+
+        result = self._parse_chat_turn(text, followup)
+        if followup:
+            llm_cache.put('chat_turn', message, result)
+        return result
+
+    def _followup_prompt(self, symptoms: list, message: str) -> str:
         symptoms_str = ", ".join(s.replace("_", " ") for s in symptoms)
 
-        prompt = f"""You are a caring health assistant for CPSU (Central Philippines State University) students.
+        return f"""You are a caring health assistant for CPSU (Central Philippines State University) students.
 
 A student said: "{message}"
 Detected symptoms so far: {symptoms_str}
@@ -778,57 +1036,41 @@ Examples of good follow-up questions:
 Write a warm, empathetic opening (1 sentence acknowledging their symptoms), then ask your questions.
 Keep the entire response under 80 words. Do NOT give a diagnosis yet. Do NOT use markdown."""
 
-        # Try Cohere first (primary for chat)
-        if self.cohere_client:
-            try:
-                resp = self.cohere_client.chat(message=prompt)
-                text = resp.text.strip()
-                if text:
-                    self.logger.info("Follow-up questions generated by Cohere")
-                    return text
-            except Exception as e:
-                self.logger.warning(f"Cohere follow-up questions failed: {e}")
-
-        # Fallback: OpenRouter
-        if self.openrouter_api_key:
-            try:
-                resp = requests.post(
-                    url="https://openrouter.ai/api/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.openrouter_api_key}",
-                        "Content-Type": "application/json",
-                    },
-                    json={
-                        "model": "meta-llama/llama-3.2-3b-instruct:free",
-                        "messages": [{"role": "user", "content": prompt}],
-                        "temperature": 0.6,
-                        "max_tokens": 150,
-                    },
-                    timeout=20,
-                )
-                if resp.status_code == 200:
-                    text = resp.json()["choices"][0]["message"]["content"].strip()
-                    if text:
-                        return text
-            except Exception as e:
-                self.logger.warning(f"OpenRouter follow-up questions failed: {e}")
-
-        # Static fallback
+    def _followup_fallback(self, symptoms: list) -> str:
+        symptoms_str = ", ".join(s.replace("_", " ") for s in symptoms)
         return (
             f"I see you're experiencing {symptoms_str}. "
             "To help me give you a more accurate assessment, could you answer: "
             "How many days have you had these symptoms? And have they been getting worse?"
         )
 
-    def generate_diagnosis_response(self, message: str, diagnosis: Dict) -> str:
+    def generate_followup_questions(self, symptoms: list, message: str) -> str:
         """
-        Generate a friendly diagnostic chat reply using Cohere.
-        Called after extract_and_predict() so the response references the results.
-
-        Args:
-            message: Original user message
-            diagnosis: Result dict from extract_and_predict()
+        Given initial symptoms, use Cohere to ask 1-2 targeted clarifying questions
+        before making a final diagnosis.  Returns a plain-text reply the chatbot
+        can send directly to the student.
         """
+        text, provider = self._dispatch('followup', self._followup_prompt(symptoms, message),
+                                        key=[symptoms, message])
+        if text:
+            return text.strip()
+
+        # Static fallback
+        return self._followup_fallback(symptoms)
+
+    def stream_followup_questions(self, symptoms: list, message: str) -> Iterator[str]:
+        """Streaming variant of generate_followup_questions"""
+        streamed = False
+        for chunk in self._dispatch_stream('followup', self._followup_prompt(symptoms, message)):
+            # Drop leading whitespace like generate_followup_questions' strip()
+            chunk = chunk if streamed else chunk.lstrip()
+            if chunk:
+                streamed = True
+                yield chunk
+        if not streamed:
+            yield self._followup_fallback(symptoms)
+
+    def _diagnosis_prompt(self, message: str, diagnosis: Dict) -> str:
         symptoms_str = ", ".join(s.replace("_", " ") for s in diagnosis.get("extracted_symptoms", []))
         disease = diagnosis.get("predicted_disease", "Unknown")
         confidence = diagnosis.get("confidence_score", 0)
@@ -840,7 +1082,7 @@ Keep the entire response under 80 words. Do NOT give a diagnosis yet. Do NOT use
             f"  - {p['disease']} ({p['confidence']:.0%})" for p in top3[:3]
         ) if top3 else "N/A"
 
-        prompt = f"""You are a caring health assistant for CPSU (Central Philippines State University) students.
+        return f"""You are a caring health assistant for CPSU (Central Philippines State University) students.
 
 A student said: "{message}"
 
@@ -861,50 +1103,63 @@ Write a warm, helpful response that:
 
 Do NOT use markdown headers. Use plain text with bullet points (•) if needed."""
 
-        response_text = self.generate_chat_response(prompt)
+    def _diagnosis_fallback(self, diagnosis: Dict) -> str:
+        """Templated diagnosis reply used when no provider answers"""
+        symptoms_str = ", ".join(s.replace("_", " ") for s in diagnosis.get("extracted_symptoms", []))
+        disease = diagnosis.get("predicted_disease", "Unknown")
+        confidence = diagnosis.get("confidence_score", 0)
+        description = diagnosis.get("description", "")
+        precautions = diagnosis.get("precautions", [])
+
+        lines = [
+            f"I noticed you're experiencing {symptoms_str}. Based on my analysis, this could be **{disease}** (confidence: {confidence:.0%}).",
+            "",
+        ]
+        if description:
+            lines.append(f"**About this condition:** {description}")
+            lines.append("")
+        if precautions:
+            lines.append("**Recommended precautions:**")
+            for p in precautions[:4]:
+                lines.append(f"• {p}")
+            lines.append("")
+        lines.append("If your symptoms persist or worsen, please visit the CPSU campus clinic for a proper check-up. Take care!")
+        return "\n".join(lines)
+
+    def generate_diagnosis_response(self, message: str, diagnosis: Dict) -> str:
+        """
+        Generate a friendly diagnostic chat reply using Cohere.
+        Called after extract_and_predict() so the response references the results.
+
+        Args:
+            message: Original user message
+            diagnosis: Result dict from extract_and_predict()
+        """
+        response_text = self.generate_chat_response(self._diagnosis_prompt(message, diagnosis))
         if not response_text or "technical issues" in response_text.lower():
-            lines = [
-                f"I noticed you're experiencing {symptoms_str}. Based on my analysis, this could be **{disease}** (confidence: {confidence:.0%}).",
-                "",
-            ]
-            if description:
-                lines.append(f"**About this condition:** {description}")
-                lines.append("")
-            if precautions:
-                lines.append("**Recommended precautions:**")
-                for p in precautions[:4]:
-                    lines.append(f"• {p}")
-                lines.append("")
-            lines.append("If your symptoms persist or worsen, please visit the CPSU campus clinic for a proper check-up. Take care!")
-            response_text = "\n".join(lines)
+            response_text = self._diagnosis_fallback(diagnosis)
 
         return response_text
 
+    def stream_diagnosis_response(self, message: str, diagnosis: Dict) -> Iterator[str]:
+        """Streaming variant of generate_diagnosis_response"""
+        streamed = False
+        for chunk in self._stream_chat(self._diagnosis_prompt(message, diagnosis)):
+            streamed = True
+            yield chunk
+        if not streamed:
+            yield self._diagnosis_fallback(diagnosis)
+
     def _extract_validation_json(self, text: str) -> Dict:
         """Extract and parse validation JSON from LLM response text."""
         try:
-            if '```json' in text:
-                text = text.split('```json')[1].split('```')[0].strip()
-            elif '```' in text:
-                text = text.split('```')[1].split('```')[0].strip()
-
-            if not text.startswith('{'):
-                json_match = re.search(r'\{[\s\S]*?"agrees"[\s\S]*?\}', text)
-                if json_match:
-                    text = json_match.group(0)
-
-            text = self._fix_json_response(text)
-            if not text or not text.startswith('{'):
-                return None
-
-            result = json.loads(text)
-            return {
-                'agrees_with_ml': result.get('agrees', True),
-                'confidence_boost': max(-0.15, min(0.15, result.get('confidence_adjustment', 0.0))),
-                'reasoning': result.get('reasoning', 'LLM validation completed'),
-                'alternative_diagnosis': result.get('alternative_diagnosis')
-            }
-        except (json.JSONDecodeError, ValueError, KeyError) as e:
+            result = llm_json.extract(text, VALIDATION_SCHEMA)
+        except llm_json.JSONExtractError as e:
             self.logger.warning(f"JSON parse failed: {e}")
             return None
-
+        return {
+            'agrees_with_ml': result['agrees'],
+            'confidence_boost': max(-0.15, min(0.15, result.get('confidence_adjustment', 0.0))),
+            'reasoning': result.get('reasoning') or 'LLM validation completed',
+            'alternative_diagnosis': result.get('alternative_diagnosis')
+        }
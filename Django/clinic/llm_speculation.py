@@ -0,0 +1,133 @@
+"""
+Speculative diagnosis while a student answers follow-up questions
+When symptoms are first detected the chat asks 1-2 follow-up questions and the
+diagnosis waits for the answer. With LLM_SPECULATIVE_DIAGNOSIS the diagnosis
+and its reply are started right away as a background job (see llm_jobs) on the
+original complaint, and stored in the session's pending follow-up state
+(ChatSession.topics_discussed).
+
+Most answers only say how long the symptoms have lasted ("3 days po"). Such an
+answer adds nothing the diagnosis depends on, so the stored result is used as
+is, with the duration taken from the answer. An answer with anything else in
+it (a new symptom, a negation, "dry cough") gets a fresh diagnosis, as does any
+answer arriving before the job has finished.
+"""
+
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from . import llm_cache
+from .models import ChatSession
+
+logger = logging.getLogger(__name__)
+
+# Words an answer about how long and how sure may contain (after llm_cache's
+# stopwords are removed) without adding anything to the diagnosis
+NEUTRAL_WORDS = frozenset("""
+day days week weeks month araw linggo since yesterday today tonight morning night last ago
+about around almost only already more than less for maybe think guess sure still same
+yes yeah yep oo opo oh ok okay um uhm started start starting nung kahapon kanina
+one two three four five six seven eight nine ten isa dalawa tatlo apat lima
+isang dalawang tatlong limang
+""".split())
+
+NUMBER_WORDS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10,
+    'a': 1, 'an': 1, 'isa': 1, 'isang': 1, 'dalawa': 2, 'dalawang': 2, 'tatlo': 3, 'tatlong': 3,
+    'apat': 4, 'lima': 5, 'limang': 5,
+}
+
+_DURATION = re.compile(r"\b(\d+|(?:%s)\b)\s*(days?|araw|weeks?|linggo)\b" % '|'.join(NUMBER_WORDS))
+
+
+def enabled() -> bool:
+    # An eager job would run inside the request, delaying the follow-up questions
+    return getattr(settings, 'LLM_SPECULATIVE_DIAGNOSIS', True) and not getattr(settings, 'LLM_JOBS_EAGER', False)
+
+
+def start(session: ChatSession, message: str, user=None):
+    """Queue the diagnosis of `message` for the follow-up pending on `session`"""
+    if not enabled():
+        return None
+    from .llm_jobs import enqueue
+    try:
+        return enqueue('speculative_diagnosis', {
+            'session_id': str(session.pk),
+            'student_id': str(session.student_id),
+            'message': message,
+        }, user=user)
+    except Exception as e:
+        # Speculation is an optimization: the diagnosis is made when the answer arrives
+        logger.warning(f"Could not start speculative diagnosis: {e}")
+        return None
+
+
+def store(session_id: str, student_id: str, message: str, diagnosis: Dict, reply: Optional[str]) -> bool:
+    """
+    Save a finished speculative diagnosis on the session.
+    Returns False when the follow-up it was made for is no longer pending.
+    """
+    with transaction.atomic():
+        session = ChatSession.objects.select_for_update().filter(id=session_id, student_id=student_id).first()
+        state = pending_state(session.topics_discussed if session else None)
+        if state is None or state.get('original_message') != message:
+            return False
+        state['speculative'] = {'diagnosis': diagnosis, 'reply': reply}
+        session.save(update_fields=['topics_discussed'])
+    return True
+
+
+def pending_state(topics: Optional[List]) -> Optional[Dict]:
+    """The pending follow-up state (the last element of topics_discussed), or None"""
+    if topics and isinstance(topics[-1], dict) and topics[-1].get('_followup_pending'):
+        return topics[-1]
+    return None
+
+
+def answer_days(answer: str) -> Optional[int]:
+    """How many days the answer says the symptoms have lasted, if it says so"""
+    text = answer.lower()
+    match = _DURATION.search(text)
+    if match:
+        amount, unit = match.groups()
+        count = int(amount) if amount.isdigit() else NUMBER_WORDS.get(amount)
+        if count:
+            return count * 7 if unit in ('week', 'weeks', 'linggo') else count
+    if 'yesterday' in text or 'kahapon' in text:
+        return 1
+    return None
+
+
+def adds_nothing_new(answer: str, symptoms: List[str]) -> bool:
+    """Whether every word of the answer is a reported symptom or about duration/certainty"""
+    words = llm_cache.fingerprint(answer).split()
+    if llm_cache.NEGATIONS.intersection(words):
+        return False
+    reported = set(llm_cache.fingerprint(' '.join(s.replace('_', ' ') for s in symptoms)).split())
+    return all(w in reported or w in NEUTRAL_WORDS or w.isdigit() for w in words)
+
+
+def reuse(state: Dict, answer: str) -> Optional[Tuple[Dict, Optional[str]]]:
+    """
+    The stored speculative (diagnosis, reply) if it still holds for this answer,
+    with the answer's duration applied; None if a fresh diagnosis is needed.
+    """
+    speculative = state.get('speculative')
+    if not speculative:
+        if enabled():
+            logger.info("Speculative diagnosis not ready, diagnosing now")
+        return None
+    if not adds_nothing_new(answer, state.get('symptoms', [])):
+        logger.info("Follow-up answer adds new information, diagnosing again")
+        return None
+
+    diagnosis = dict(speculative['diagnosis'])
+    days = answer_days(answer)
+    if days:
+        diagnosis['duration_days'] = days
+    logger.info(f"Using speculative diagnosis: {diagnosis.get('predicted_disease')}")
+    return diagnosis, speculative.get('reply')
@@ -0,0 +1,310 @@
+"""
+Local stand-in for the LLM provider APIs (offline load and benchmark testing)
+Speaks the wire formats AIInsightGenerator uses:
+
+    POST /openrouter/api/v1/chat/completions   OpenAI chat completions (OpenRouter)
+    POST /groq/openai/v1/chat/completions      OpenAI chat completions (Groq)
+    POST /cohere/v1/chat                       Cohere v1 chat
+    GET  /_standin/stats                       requests served per provider and status
+
+Set LLM_STANDIN_URL (e.g. http://127.0.0.1:8765) and AIInsightGenerator sends
+every provider call here instead (Gemini, whose API is not emulated, is
+disabled). Start it with `python manage.py run_llm_standin`.
+
+Answers are replayed from a recordings file, keyed by a hash of the system
+prompt and the user message; `--record` forwards unknown prompts to the real
+provider once and saves the answer. Latency, error rate and streaming speed
+come from a profile (DEFAULT_PROFILE, overridable per provider), drawn from a
+seeded random generator so runs are repeatable:
+
+    {"seed": 7,
+     "default": {"latency": {"distribution": "lognormal", "median_ms": 700, "sigma": 0.4}},
+     "providers": {"groq": {"latency": {"distribution": "fixed", "ms": 250}, "error_rate": 0.05}}}
+"""
+
+import hashlib
+import json
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Path prefix of each provider on the stand-in, matching the real API's base URL
+PREFIXES = {
+    'openrouter': '/openrouter/api/v1',
+    'groq': '/groq/openai/v1',
+    'cohere': '/cohere',
+}
+
+UPSTREAM = {
+    'openrouter': 'https://openrouter.ai/api/v1/chat/completions',
+    'groq': 'https://api.groq.com/openai/v1/chat/completions',
+    'cohere': 'https://api.cohere.com/v1/chat',
+}
+
+DEFAULT_PROFILE = {
+    'latency': {'distribution': 'lognormal', 'median_ms': 700, 'sigma': 0.4},
+    'error_rate': 0.0,
+    'error_status': 429,
+    'chunk_chars': 16,
+    'chunk_delay_ms': 25,
+}
+
+DEFAULT_TEXT = "I'm here to help. Please rest, drink plenty of fluids, and visit the CPSU clinic if you feel worse."
+
+
+def base_url(provider: str) -> Optional[str]:
+    """Where `provider` is reached when LLM_STANDIN_URL is set (None: the real API)"""
+    url = getattr(settings, 'LLM_STANDIN_URL', '')
+    if not url or provider not in PREFIXES:
+        return None
+    return url.rstrip('/') + PREFIXES[provider]
+
+
+def prompt_key(system: Optional[str], message: str) -> str:
+    return hashlib.sha256(json.dumps([system or '', message]).encode()).hexdigest()
+
+
+def sample_latency(latency: Dict, rng: random.Random) -> float:
+    """Seconds drawn from a latency distribution (fixed, uniform, normal or lognormal; in ms)"""
+    distribution = latency.get('distribution', 'fixed')
+    if distribution == 'uniform':
+        ms = rng.uniform(latency['low_ms'], latency['high_ms'])
+    elif distribution == 'normal':
+        ms = rng.gauss(latency['mean_ms'], latency.get('stddev_ms', 0))
+    elif distribution == 'lognormal':
+        ms = rng.lognormvariate(math.log(latency['median_ms']), latency.get('sigma', 0.5))
+    else:
+        ms = latency.get('ms', 0)
+    return max(0.0, ms) / 1000
+
+
+class Recordings:
+    """Recorded answers by provider and prompt key, saved as JSON"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self.entries = {}
+        if self.path and self.path.exists():
+            for entry in json.loads(self.path.read_text())['recordings']:
+                self.entries[(entry['provider'], entry['key'])] = entry
+
+    def find(self, provider: str, key: str) -> Optional[Dict]:
+        """The provider's own recording of this prompt, else any provider's"""
+        entry = self.entries.get((provider, key))
+        if entry is None:
+            entry = next((e for (_, k), e in self.entries.items() if k == key), None)
+        return entry
+
+    def add(self, provider: str, key: str, prompt: str, text: str, latency: float):
+        with self._lock:
+            self.entries[(provider, key)] = {
+                'provider': provider, 'key': key, 'prompt': prompt[:200],
+                'text': text, 'latency_ms': round(latency * 1000),
+            }
+            if self.path:
+                self.path.write_text(json.dumps({'recordings': list(self.entries.values())}, indent=2))
+
+
+class StandInServer:
+    """
+    The stand-in HTTP server; start() serves from a background thread.
+
+    Args:
+        config: {'seed', 'default', 'providers', 'default_text'} (see module docstring)
+        recordings: path of the recordings file
+        record: forward prompts without a recording to the real provider and save the answer
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8765, config: Dict = None,
+                 recordings: str = None, record: bool = False):
+        config = config or {}
+        self.profiles = {
+            provider: {**DEFAULT_PROFILE, **config.get('default', {}), **config.get('providers', {}).get(provider, {})}
+            for provider in PREFIXES
+        }
+        self.default_text = config.get('default_text', DEFAULT_TEXT)
+        self.recordings = Recordings(recordings)
+        self.record = record
+        self.stats = Counter()
+        self._rng = random.Random(config.get('seed', 0))
+        self._rng_lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.standin = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'StandInServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='llm-standin', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def draw(self, provider: str) -> Tuple[float, bool]:
+        """(latency in seconds, whether this call fails) from the provider's profile"""
+        profile = self.profiles[provider]
+        with self._rng_lock:
+            return sample_latency(profile['latency'], self._rng), self._rng.random() < profile['error_rate']
+
+    def answer(self, provider: str, system: Optional[str], message: str, request: Dict,
+               headers) -> str:
+        """Recorded answer to a prompt (recording it first in record mode)"""
+        key = prompt_key(system, message)
+        entry = self.recordings.find(provider, key)
+        if entry is not None:
+            return entry['text']
+        if self.record:
+            started = time.monotonic()
+            text = _forward(provider, request, headers)
+            self.recordings.add(provider, key, message, text, time.monotonic() - started)
+            return text
+        return self.default_text
+
+
+def _forward(provider: str, request: Dict, headers) -> str:
+    """The real provider's answer to a request (non-streaming)"""
+    import httpx
+
+    forwarded = {name: headers[name] for name in ('Authorization', 'HTTP-Referer', 'X-Title') if headers.get(name)}
+    response = httpx.post(UPSTREAM[provider], json={**request, 'stream': False}, headers=forwarded, timeout=60)
+    response.raise_for_status()
+    body = response.json()
+    return body['text'] if provider == 'cohere' else body['choices'][0]['message']['content']
+
+
+def _chunks(text: str, size: int) -> Iterator[str]:
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive, so load tests exercise the app's connection pools
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/_standin/stats':
+            stats = {f"{provider} {status}": count for (provider, status), count in self.server.standin.stats.items()}
+            return self._send_json(200, stats)
+        self._send_json(404, {'error': {'message': f'Unknown path {self.path}'}})
+
+    def do_POST(self):
+        standin = self.server.standin
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        provider = next((p for p, prefix in PREFIXES.items() if self.path.startswith(prefix + '/')), None)
+        if provider is None:
+            return self._send_json(404, {'error': {'message': f'Unknown path {self.path}'}})
+
+        if provider == 'cohere':
+            system, message = body.get('preamble'), body.get('message', '')
+        else:
+            messages = body.get('messages', [])
+            system = next((m['content'] for m in messages if m['role'] == 'system'), None)
+            message = next((m['content'] for m in reversed(messages) if m['role'] == 'user'), '')
+
+        latency, failed = standin.draw(provider)
+        time.sleep(latency)
+        if failed:
+            status = standin.profiles[provider]['error_status']
+            standin.stats[(provider, status)] += 1
+            error = f'Stand-in error {status}'
+            return self._send_json(status, {'message': error} if provider == 'cohere' else {'error': {'message': error}})
+
+        try:
+            text = standin.answer(provider, system, message, body, self.headers)
+        except Exception as e:
+            standin.stats[(provider, 502)] += 1
+            return self._send_json(502, {'message': f'Recording failed: {e}'})
+        standin.stats[(provider, 200)] += 1
+
+        usage = (_tokens((system or '') + message), _tokens(text))
+        if body.get('stream'):
+            self._stream(provider, text, usage, standin.profiles[provider])
+        elif provider == 'cohere':
+            self._send_json(200, _cohere_response(text, usage))
+        else:
+            self._send_json(200, {
+                'id': f'chatcmpl-{uuid.uuid4().hex}', 'object': 'chat.completion', 'created': int(time.time()),
+                'model': body.get('model', ''),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': usage[0], 'completion_tokens': usage[1], 'total_tokens': sum(usage)},
+            })
+
+    def _send_json(self, status: int, data: Dict):
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _write_chunk(self, data: str):
+        payload = data.encode()
+        self.wfile.write(f'{len(payload):x}\r\n'.encode() + payload + b'\r\n')
+        self.wfile.flush()
+
+    def _stream(self, provider: str, text: str, usage: Tuple[int, int], profile: Dict):
+        """Server-sent events (OpenAI format) or newline-delimited JSON events (Cohere)"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/stream+json' if provider == 'cohere' else 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        completion_id = f'chatcmpl-{uuid.uuid4().hex}'
+        if provider == 'cohere':
+            self._write_chunk(json.dumps({'is_finished': False, 'event_type': 'stream-start',
+                                          'generation_id': completion_id}) + '\n')
+        for index, part in enumerate(_chunks(text, profile['chunk_chars'])):
+            if index:
+                time.sleep(profile['chunk_delay_ms'] / 1000)
+            if provider == 'cohere':
+                event = json.dumps({'is_finished': False, 'event_type': 'text-generation', 'text': part}) + '\n'
+            else:
+                event = 'data: ' + json.dumps({
+                    'id': completion_id, 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                    'model': '', 'choices': [{'index': 0, 'delta': {'content': part}, 'finish_reason': None}],
+                }) + '\n\n'
+            self._write_chunk(event)
+        if provider == 'cohere':
+            self._write_chunk(json.dumps({'is_finished': True, 'event_type': 'stream-end', 'finish_reason': 'COMPLETE',
+                                          'response': _cohere_response(text, usage)}) + '\n')
+        else:
+            self._write_chunk('data: [DONE]\n\n')
+        self.wfile.write(b'0\r\n\r\n')
+        self.wfile.flush()
+
+
+def _cohere_response(text: str, usage: Tuple[int, int]) -> Dict:
+    return {
+        'response_id': str(uuid.uuid4()), 'generation_id': str(uuid.uuid4()), 'text': text,
+        'finish_reason': 'COMPLETE', 'chat_history': [],
+        'meta': {'billed_units': {'input_tokens': usage[0], 'output_tokens': usage[1]}},
+    }
@@ -0,0 +1,79 @@
+"""
+Management command that benchmarks JSON extraction from LLM completions
+Runs clinic.llm_json over a corpus of completions and reports, per answer kind,
+how many were handled correctly (parsed when they should be, rejected when not)
+and the time per completion, next to a plain json.loads baseline.
+Usage: python manage.py benchmark_llm_json [--corpus path.json] [--repeat 200]
+"""
+
+import json
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from clinic import llm_json
+from clinic.llm_service import CHAT_TURN_SCHEMA, DIAGNOSIS_SCHEMA, INSIGHTS_SCHEMA, VALIDATION_SCHEMA
+
+DEFAULT_CORPUS = Path(__file__).resolve().parents[2] / 'data' / 'llm_completions.json'
+
+SCHEMAS = {
+    'diagnosis': DIAGNOSIS_SCHEMA,
+    'chat_turn': CHAT_TURN_SCHEMA,
+    'validation': VALIDATION_SCHEMA,
+    'insights': INSIGHTS_SCHEMA,
+}
+
+
+def _strict(text: str, schema: dict) -> bool:
+    """Baseline: the completion is valid JSON as is and matches the schema"""
+    try:
+        return not llm_json.validate(json.loads(text), schema)
+    except ValueError:
+        return False
+
+
+def _tolerant(text: str, schema: dict) -> bool:
+    try:
+        llm_json.extract(text, schema)
+        return True
+    except llm_json.JSONExtractError:
+        return False
+
+
+class Command(BaseCommand):
+    help = 'Benchmark parse success rate and time of the LLM JSON extractor'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corpus', type=str, default=str(DEFAULT_CORPUS),
+                            help='JSON file: {"completions": [{"kind", "text", "valid"}]}')
+        parser.add_argument('--repeat', type=int, default=200, help='Timed runs per completion')
+
+    def handle(self, *args, **options):
+        with open(options['corpus']) as f:
+            completions = json.load(f)['completions']
+        repeat = options['repeat']
+
+        rows = defaultdict(lambda: {'total': 0, 'strict': 0, 'tolerant': 0, 'strict_s': 0.0, 'tolerant_s': 0.0})
+        for completion in completions:
+            schema = SCHEMAS[completion['kind']]
+            expected = completion.get('valid', True)
+            row = rows[completion['kind']]
+            row['total'] += 1
+            for name, parse in (('strict', _strict), ('tolerant', _tolerant)):
+                row[name] += parse(completion['text'], schema) == expected
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    parse(completion['text'], schema)
+                row[f'{name}_s'] += (time.perf_counter() - started) / repeat
+
+        self.stdout.write(f"{'kind':<12}{'n':>4}{'json.loads':>14}{'llm_json':>12}{'µs (loads)':>13}{'µs (llm_json)':>15}")
+        for kind, row in sorted(rows.items()):
+            self.stdout.write(
+                f"{kind:<12}{row['total']:>4}"
+                f"{row['strict'] / row['total']:>14.0%}{row['tolerant'] / row['total']:>12.0%}"
+                f"{row['strict_s'] / row['total'] * 1e6:>13.1f}{row['tolerant_s'] / row['total'] * 1e6:>15.1f}"
+            )
+        handled = sum(r['tolerant'] for r in rows.values())
+        self.stdout.write(self.style.SUCCESS(f"✅ {handled}/{len(completions)} completions handled correctly"))
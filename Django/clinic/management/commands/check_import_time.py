@@ -0,0 +1,85 @@
+"""
+Management command that checks worker startup import time
+Imports Django, the settings and every URL module (what a worker does before
+its first request) in a fresh interpreter with `python -X importtime`, and
+reports the slowest top-level imports. Fails when the total exceeds
+IMPORT_TIME_BUDGET_MS or when a provider SDK is imported at startup (they are
+imported on first use, see clinic/llm_sdk.py).
+Usage: python manage.py check_import_time [--budget 1200] [--top 15]
+"""
+
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Imported by the first LLM call, never at startup
+LAZY_SDKS = ('openai', 'google.genai', 'cohere')
+
+STARTUP = (
+    "import django; django.setup(); "
+    "from django.urls import get_resolver; get_resolver().url_patterns"
+)
+
+
+def measure(code: str = STARTUP) -> Tuple[float, Dict[str, float]]:
+    """
+    Run `code` in a new interpreter with -X importtime.
+
+    Returns:
+        (total milliseconds, {module: cumulative milliseconds}) - the total is
+        the sum of the top-level imports, so nested modules are not counted twice
+    """
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE)}
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise CommandError(f"Startup failed:\n{result.stderr[-2000:]}")
+
+    total_us = 0
+    modules = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|', 2)
+        modules[name.strip()] = int(cumulative) / 1000
+        # Nested imports are indented below the one that triggered them
+        if not name[1:2].isspace():
+            total_us += int(cumulative)
+    return total_us / 1000, modules
+
+
+class Command(BaseCommand):
+    help = 'Measure worker startup import time and fail if it is over budget or imports a provider SDK'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget', type=float, default=getattr(settings, 'IMPORT_TIME_BUDGET_MS', 1200),
+                            help='Maximum total import time in milliseconds')
+        parser.add_argument('--top', type=int, default=15, help='Number of slowest top-level imports to list')
+
+    def handle(self, *args, **options):
+        total, modules = measure()
+
+        top_level = self._top_level(modules)
+        self.stdout.write(f"{'module':<48}{'ms':>10}")
+        for name, ms in top_level[:options['top']]:
+            self.stdout.write(f"{name:<48}{ms:>10.1f}")
+        self.stdout.write(f"{'total':<48}{total:>10.1f}")
+
+        eager = sorted(sdk for sdk in LAZY_SDKS if sdk in modules)
+        if eager:
+            raise CommandError(f"Provider SDKs imported at startup: {', '.join(eager)}")
+        if total > options['budget']:
+            raise CommandError(f"Startup imports took {total:.0f}ms (budget {options['budget']:.0f}ms)")
+        self.stdout.write(self.style.SUCCESS(f"✅ Startup imports {total:.0f}ms (budget {options['budget']:.0f}ms)"))
+
+    def _top_level(self, modules: Dict[str, float]) -> List[Tuple[str, float]]:
+        # Packages only: a submodule's time is already part of its package's
+        packages = {name: ms for name, ms in modules.items() if '.' not in name}
+        return sorted(packages.items(), key=lambda item: item[1], reverse=True)
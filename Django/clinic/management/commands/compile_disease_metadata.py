@@ -0,0 +1,28 @@
+"""
+Management command to compile disease metadata for the ML predictor
+Run after changing the CSVs in ML_DATASETS_PATH or the classification tables
+in clinic/disease_metadata.py.
+Usage: python manage.py compile_disease_metadata
+"""
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from clinic.disease_metadata import compile_metadata
+
+
+class Command(BaseCommand):
+    help = 'Compile severity, descriptions, precautions and ICD-10/communicable/chronic tables into one JSON artifact'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', type=str, help='Output path (default: ML_METADATA_PATH)')
+
+    def handle(self, *args, **options):
+        output_path = compile_metadata(output_path=options.get('output'))
+        with open(output_path, encoding='utf-8') as f:
+            metadata = json.load(f)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Compiled metadata for {len(metadata['diseases'])} diseases and "
+            f"{len(metadata['severity'])} symptoms to {output_path}"
+        ))
@@ -0,0 +1,56 @@
+"""
+Management command to publish a trained model to the versioned registry
+Running workers pick up the new version within ML_MODEL_CHECK_INTERVAL seconds.
+Usage:
+    python manage.py publish_model [path/to/disease_predictor_v2.pkl]
+    python manage.py publish_model --list
+    python manage.py publish_model --activate <version>
+"""
+
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from clinic.model_registry import activate_version, load_registry, publish_model, registry_path
+
+
+class Command(BaseCommand):
+    help = 'Publish a trained ML model (and its compiled .npz) as the current registry version'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model_path', nargs='?', type=str, help='Model pickle (default: ML_MODEL_PATH)')
+        parser.add_argument('--keep', type=int, default=3, help='Number of versions to keep on disk')
+        parser.add_argument('--activate', type=str, help='Switch to an already published version (rollback)')
+        parser.add_argument('--list', action='store_true', help='List published versions')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            registry = load_registry()
+            if not registry:
+                self.stdout.write(self.style.WARNING(f'No registry at {registry_path()}'))
+                return
+            for entry in registry['versions']:
+                marker = '*' if entry['version'] == registry['current'] else ' '
+                compiled = 'compiled' if entry.get('compiled') else 'pickle only'
+                self.stdout.write(f"{marker} {entry['version']}  {entry['published_at']}  ({compiled})")
+            return
+
+        if options['activate']:
+            try:
+                activate_version(options['activate'])
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(f"✅ Model version {options['activate']} is now current"))
+            return
+
+        model_path = Path(options['model_path'] or settings.ML_MODEL_PATH)
+        if not model_path.exists():
+            raise CommandError(f'Model not found: {model_path}')
+        if not model_path.with_suffix('.npz').exists():
+            self.stdout.write(self.style.WARNING(
+                'No compiled .npz next to the model - workers will load the pickle with scikit-learn'
+            ))
+
+        version = publish_model(model_path, keep=options['keep'])
+        self.stdout.write(self.style.SUCCESS(f'✅ Published model version {version} to {registry_path()}'))
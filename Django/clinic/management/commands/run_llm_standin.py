@@ -0,0 +1,49 @@
+"""
+Management command that runs the local LLM stand-in server (see clinic/llm_standin.py)
+Point the app at it with LLM_STANDIN_URL=http://127.0.0.1:8765 for offline load tests.
+Usage: python manage.py run_llm_standin [--port 8765] [--config profile.json]
+                                        [--recordings recordings.json] [--record]
+"""
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from clinic.llm_standin import StandInServer
+
+
+class Command(BaseCommand):
+    help = 'Serve recorded LLM answers in the OpenRouter/Groq/Cohere wire formats'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--config', type=str, help='JSON latency / error / streaming profile')
+        parser.add_argument('--recordings', type=str, help='JSON file of recorded answers')
+        parser.add_argument('--record', action='store_true',
+                            help='Forward prompts without a recording to the real provider and save the answer')
+        parser.add_argument('--seed', type=int, help='Random seed (overrides the profile)')
+
+    def handle(self, *args, **options):
+        config = {}
+        if options.get('config'):
+            with open(options['config']) as f:
+                config = json.load(f)
+        if options.get('seed') is not None:
+            config['seed'] = options['seed']
+
+        server = StandInServer(
+            host=options['host'], port=options['port'], config=config,
+            recordings=options.get('recordings'), record=options.get('record')
+        )
+        self.stdout.write(
+            f"LLM stand-in on {server.url} ({len(server.recordings.entries)} recordings"
+            f"{', recording' if options.get('record') else ''}); set LLM_STANDIN_URL={server.url}"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
+        self.stdout.write(self.style.SUCCESS(f"✅ Served: {dict(server.stats)}"))
@@ -0,0 +1,46 @@
+"""
+Management command that runs queued LLM jobs (insights, prediction reviews)
+Start one or more next to gunicorn; they share the llm_jobs table.
+Usage: python manage.py run_llm_worker [--once] [--poll-interval 1.0]
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from clinic import llm_jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued LLM jobs until stopped (or until the queue is empty with --once)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+        parser.add_argument('--poll-interval', type=float,
+                            help='Seconds between queue checks when idle (default: LLM_JOB_POLL_INTERVAL)')
+        parser.add_argument('--name', type=str, help='Worker name stored on claimed jobs (default: host:pid)')
+
+    def handle(self, *args, **options):
+        worker = options.get('name') or llm_jobs.default_worker_name()
+        poll_interval = options.get('poll_interval') or getattr(settings, 'LLM_JOB_POLL_INTERVAL', 1.0)
+        self.stdout.write(f"LLM worker {worker} started")
+
+        total = 0
+        try:
+            while True:
+                # Drop database connections that went stale while idle
+                close_old_connections()
+                done = llm_jobs.run_pending(worker)
+                total += done
+                if options.get('once'):
+                    break
+                if not done:
+                    time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            close_old_connections()
+
+        self.stdout.write(self.style.SUCCESS(f"✅ LLM worker {worker} ran {total} job(s)"))
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clinic", "0011_customuser_email"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DiseaseOverride",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "disease",
+                    models.CharField(
+                        help_text="Disease name exactly as predicted by the model",
+                        max_length=100,
+                        unique=True,
+                    ),
+                ),
+                ("is_communicable", models.BooleanField(blank=True, null=True)),
+                ("is_acute", models.BooleanField(blank=True, null=True)),
+                ("icd10_code", models.CharField(blank=True, max_length=10)),
+                ("description", models.TextField(blank=True)),
+                (
+                    "precautions",
+                    models.JSONField(
+                        blank=True,
+                        default=list,
+                        help_text="Replaces the dataset precautions when not empty",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "updated_by",
+                    models.ForeignKey(
+                        blank=True,
+                        limit_choices_to={"role": "staff"},
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="disease_overrides",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Disease Override",
+                "db_table": "disease_overrides",
+                "ordering": ["disease"],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:43
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clinic", "0012_diseaseoverride"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProviderCircuit",
+            fields=[
+                (
+                    "provider",
+                    models.CharField(max_length=30, primary_key=True, serialize=False),
+                ),
+                (
+                    "state",
+                    models.CharField(
+                        choices=[
+                            ("closed", "Closed"),
+                            ("open", "Open"),
+                            ("half_open", "Half-open"),
+                        ],
+                        default="closed",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "window_started_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("calls", models.PositiveIntegerField(default=0)),
+                ("failures", models.PositiveIntegerField(default=0)),
+                ("opened_at", models.DateTimeField(blank=True, null=True)),
+                ("cooldown_seconds", models.PositiveIntegerField(default=60)),
+                ("probe_started_at", models.DateTimeField(blank=True, null=True)),
+                ("trip_count", models.PositiveIntegerField(default=0)),
+                ("last_error", models.CharField(blank=True, max_length=255)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "LLM Provider Circuit",
+                "db_table": "provider_circuits",
+                "ordering": ["provider"],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clinic", "0013_providercircuit"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LLMCallStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket_start", models.DateTimeField(db_index=True)),
+                ("method", models.CharField(max_length=40)),
+                ("provider", models.CharField(max_length=30)),
+                ("model", models.CharField(blank=True, max_length=100)),
+                ("calls", models.PositiveIntegerField(default=0)),
+                ("failures", models.PositiveIntegerField(default=0)),
+                (
+                    "fallback_wins",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Successful calls made after an earlier provider in the order failed or was slow",
+                    ),
+                ),
+                ("prompt_tokens", models.PositiveBigIntegerField(default=0)),
+                ("completion_tokens", models.PositiveBigIntegerField(default=0)),
+                ("latency_sum", models.FloatField(default=0.0, help_text="Seconds")),
+                ("latency_histogram", models.JSONField(blank=True, default=list)),
+                (
+                    "status_counts",
+                    models.JSONField(
+                        blank=True, default=dict, help_text="HTTP status -> calls"
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "LLM Call Statistics",
+                "verbose_name_plural": "LLM Call Statistics",
+                "db_table": "llm_call_stats",
+                "ordering": ["-bucket_start", "provider", "method"],
+                "unique_together": {("bucket_start", "method", "provider", "model")},
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:07
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clinic", "0015_llmjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProviderRateLimit",
+            fields=[
+                (
+                    "provider",
+                    models.CharField(max_length=30, primary_key=True, serialize=False),
+                ),
+                (
+                    "requests",
+                    models.FloatField(help_text="Requests that can be sent right now"),
+                ),
+                (
+                    "tokens",
+                    models.FloatField(
+                        blank=True,
+                        help_text="Tokens left (empty: no token budget)",
+                        null=True,
+                    ),
+                ),
+                (
+                    "refilled_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("version", models.PositiveIntegerField(default=0)),
+                (
+                    "throttled",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Calls held back for lack of capacity"
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "LLM Provider Rate Limit",
+                "db_table": "provider_rate_limits",
+                "ordering": ["provider"],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clinic", "0016_providerratelimit"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LLMInflightRequest",
+            fields=[
+                (
+                    "key",
+                    models.CharField(
+                        help_text="SHA-256 of method and prompt",
+                        max_length=64,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("method", models.CharField(max_length=50)),
+                (
+                    "owner",
+                    models.CharField(
+                        help_text="Worker answering the prompt", max_length=100
+                    ),
+                ),
+                ("started_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("expires_at", models.DateTimeField()),
+                ("done", models.BooleanField(default=False)),
+                ("text", models.TextField(blank=True, null=True)),
+                ("provider", models.CharField(blank=True, max_length=30)),
+            ],
+            options={
+                "verbose_name": "LLM In-flight Request",
+                "db_table": "llm_inflight_requests",
+            },
+        ),
+    ]
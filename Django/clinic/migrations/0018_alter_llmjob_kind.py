@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clinic", "0017_llminflightrequest"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="llmjob",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("health_insights", "Health insights for a chat session"),
+                    ("prediction_review", "LLM review of an ML prediction"),
+                    (
+                        "speculative_diagnosis",
+                        "Diagnosis made while follow-up questions are answered",
+                    ),
+                ],
+                max_length=30,
+            ),
+        ),
+    ]
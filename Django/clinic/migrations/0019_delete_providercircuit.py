@@ -0,0 +1,16 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:52
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clinic", "0018_alter_llmjob_kind"),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name="ProviderCircuit",
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:53
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clinic", "0019_delete_providercircuit"),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name="ProviderRateLimit",
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clinic", "0020_delete_providerratelimit"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="llmcallstats",
+            name="counters",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text="Events other than provider calls (cache hits, coalesced requests); on rows without a provider",
+            ),
+        ),
+    ]
@@ -3,17 +3,156 @@ ML/AI Integration Services
 Handles disease prediction and health insights generation
 """
 
+import copy
 import pickle
+import re
+import threading
+import time
 import numpy as np
-import pandas as pd
+from collections import OrderedDict
 from pathlib import Path
+from types import MappingProxyType
 from django.conf import settings
-from typing import Dict, List, Tuple
+from django.core.cache import caches
+from django.db import DatabaseError, connection
+from typing import Dict, List, NamedTuple, Optional, Tuple
 import os
 import logging
 
 # Import LLM service
 from .llm_service import AIInsightGenerator
+from .tree_engine import CompiledTreeEnsemble, file_sha256
+from .model_registry import registry_path, resolve_model_path
+from .disease_metadata import classify_disease, load_metadata
+from .models import DiseaseOverride
+
+
+# Spellings emitted by the LLM / typed by students that don't match a model column.
+# Keys and values are in normalized form (see normalize_symptom).
+SYMPTOM_ALIASES = {
+    'fever': 'high_fever',
+    'low_grade_fever': 'mild_fever',
+    'slight_fever': 'mild_fever',
+    'sneezing': 'continuous_sneezing',
+    'runny_nose_and_sneezing': 'continuous_sneezing',
+    'sore_throat': 'throat_irritation',
+    'throat_pain': 'throat_irritation',
+    'shortness_of_breath': 'breathlessness',
+    'difficulty_breathing': 'breathlessness',
+    'tiredness': 'fatigue',
+    'body_pain': 'muscle_pain',
+    'body_ache': 'muscle_pain',
+    'body_aches': 'muscle_pain',
+    'muscle_ache': 'muscle_pain',
+    'stomach_ache': 'stomach_pain',
+    'stomachache': 'stomach_pain',
+    'rash': 'skin_rash',
+    'diarrhea': 'diarrhoea',
+    'chill': 'chills',
+    'vomit': 'vomiting',
+    'stuffy_nose': 'congestion',
+    'nasal_congestion': 'congestion',
+    'watery_eyes': 'watering_from_eyes',
+    'red_eyes': 'redness_of_eyes',
+    'cold_hands_and_feet': 'cold_hands_and_feets',
+    'swollen_lymph_nodes': 'swelled_lymph_nodes',
+    'toxic_look': 'toxic_look_(typhos)',
+}
+
+
+def normalize_symptom(symptom: str) -> str:
+    """Normalize a symptom name: lowercase, underscores instead of spaces/hyphens"""
+    return re.sub(r'[\s_\-]+', '_', symptom.strip().lower()).strip('_')
+
+
+def load_disease_overrides() -> Dict[str, DiseaseOverride]:
+    """Staff overrides by disease name (empty if the table is not migrated/reachable)"""
+    try:
+        return {override.disease: override for override in DiseaseOverride.objects.all()}
+    except DatabaseError:
+        return {}
+
+
+# Bumped in the 'llm' cache (a file cache shared by the workers on the host)
+# whenever staff change a disease override
+OVERRIDES_VERSION_KEY = 'ml:disease-overrides-version'
+
+
+def _overrides_stamp() -> Optional[int]:
+    try:
+        return caches['llm'].get(OVERRIDES_VERSION_KEY)
+    except Exception:
+        return None
+
+
+def overrides_changed():
+    """Staff changed a disease override: have every worker reload, this one right away"""
+    try:
+        caches['llm'].set(OVERRIDES_VERSION_KEY, time.time_ns(), timeout=None)
+    except Exception as e:
+        print(f"[WARNING] Could not publish disease override change to other workers: {e}")
+    check_for_model_update(force=True)
+
+
+class DiseaseInfo(NamedTuple):
+    """Everything attached to a prediction of one model class"""
+    is_communicable: bool
+    is_acute: bool
+    icd10_code: str
+    description: str
+    precautions: Tuple[str, ...]
+
+
+class PredictionCache:
+    """
+    Bounded, thread-safe LRU cache of prediction results.
+    Keys are (model version, encoded symptom columns), so lists that differ only
+    in order, spelling, or aliases share one entry.
+    """
+    
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key) -> Optional[Dict]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+    
+    def put(self, key, result: Dict):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
 
 
 class MLPredictor:
@@ -22,26 +161,40 @@ class MLPredictor:
     Integrates with models from ML/models/ directory
     """
     
-    def __init__(self):
+    def __init__(self, model_path: Optional[Path] = None):
         self.model = None
         self.feature_names = None
         self.severity_dict = {}
         self.description_dict = {}
         self.precaution_dict = {}
-        self._load_model()
+        self.disease_info = {}
+        self.class_table = ()
+        self._class_index = {}
+        self.feature_index = MappingProxyType({})
+        self._sparse_input = True
+        self.model_path = None
+        self.model_version = ''
+        self.prediction_cache = PredictionCache(getattr(settings, 'ML_PREDICTION_CACHE_SIZE', 1024))
+        self._load_model(model_path or resolve_model_path())
+        self._build_feature_index()
         self._load_metadata()
+        self._build_class_table()
     
-    def _load_model(self):
+    def _load_model(self, model_path: Path):
         """Load trained ML model (gracefully handles missing files)"""
-        model_path = settings.ML_MODEL_PATH
         
         try:
+            # Prefer the compiled NumPy engine (no scikit-learn import needed)
+            if self._load_compiled_model(model_path):
+                return
+            
             # Try v2 model first
             if model_path.exists():
                 with open(model_path, 'rb') as f:
                     model_data = pickle.load(f)
                 self.model = model_data['model']
                 self.feature_names = model_data['feature_names']
+                self._set_model_version(model_path)
                 print(f"[OK] Loaded ML model from {model_path}")
             else:
                 # Fallback to v1 model
@@ -51,6 +204,7 @@ class MLPredictor:
                         model_data = pickle.load(f)
                     self.model = model_data['model']
                     self.feature_names = model_data['feature_names']
+                    self._set_model_version(fallback_path)
                     print(f"[OK] Loaded ML model from {fallback_path}")
                 else:
                     print(f"[WARNING] ML model not found at {model_path} or {fallback_path}")
@@ -63,6 +217,100 @@ class MLPredictor:
             self.model = None
             self.feature_names = []
     
+    def _load_compiled_model(self, model_path: Path) -> bool:
+        """
+        Load the flattened tree ensemble exported next to the pickle
+        (ML/scripts/export_compiled_model.py). Skipped if disabled, missing,
+        or exported from a different pickle than the one on disk.
+        """
+        compiled_path = model_path.with_suffix('.npz')
+        if not getattr(settings, 'ML_USE_COMPILED_MODEL', True) or not compiled_path.exists():
+            return False
+        
+        try:
+            compiled = CompiledTreeEnsemble.load(compiled_path, mmap=getattr(settings, 'ML_MMAP_MODEL', True))
+            if model_path.exists() and compiled.source_sha256 != file_sha256(model_path):
+                print(f"[WARNING] Compiled model {compiled_path} is stale - re-run export_compiled_model.py")
+                return False
+        except Exception as e:
+            print(f"[WARNING] Could not load compiled model {compiled_path}: {e}")
+            return False
+        
+        self.model = compiled
+        self.feature_names = compiled.feature_names
+        # Same version as the source pickle, so cache keys survive toggling the engine
+        self._set_model_version(compiled_path, compiled.source_sha256)
+        print(f"[OK] Loaded compiled ML model from {compiled_path}")
+        return True
+    
+    def _set_model_version(self, path: Path, checksum: str = ''):
+        """Record which file the model came from; the version is a short content checksum"""
+        self.model_path = path
+        self.model_version = (checksum or file_sha256(path))[:12]
+    
+    def cache_stats(self) -> Dict:
+        """Prediction cache counters plus the model version the entries belong to"""
+        return {**self.prediction_cache.stats(), 'model_version': self.model_version}
+    
+    def _build_feature_index(self):
+        """
+        Build a frozen symptom -> column lookup once at load time.
+        Includes each raw column name, its normalized spelling (some dataset
+        columns contain stray spaces, e.g. 'spotting_ urination') and aliases.
+        """
+        index = {}
+        for col, name in enumerate(self.feature_names or []):
+            index[name] = col
+            index.setdefault(normalize_symptom(name), col)
+        for alias, target in SYMPTOM_ALIASES.items():
+            if target in index:
+                index.setdefault(alias, index[target])
+        self.feature_index = MappingProxyType(index)
+        
+        # The compiled engine and SVC trained on dense data need dense input;
+        # scikit-learn tree ensembles accept sparse
+        self._sparse_input = (
+            not isinstance(self.model, CompiledTreeEnsemble)
+            and getattr(self.model, '_sparse', None) is not False
+        )
+    
+    def encode_symptoms(self, symptoms: List[str]) -> Tuple[np.ndarray, List[str]]:
+        """
+        Encode a symptom list as a sparse row: the sorted, de-duplicated column
+        indices that are set. Cost is O(#symptoms), independent of the feature count.
+        
+        Returns:
+            (column indices as int16 array, matched symptom names)
+        """
+        columns = {}
+        for symptom in symptoms:
+            normalized = normalize_symptom(symptom)
+            col = self.feature_index.get(normalized)
+            if col is not None and col not in columns:
+                columns[col] = self.feature_names[col]
+        return np.array(sorted(columns), dtype=np.int16), list(columns.values())
+    
+    def _encode_batch(self, encoded_rows: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Stack encoded rows (see encode_symptoms) as CSR components (indptr, indices)"""
+        indptr = np.zeros(len(encoded_rows) + 1, dtype=np.int32)
+        indptr[1:] = np.cumsum([len(cols) for cols in encoded_rows])
+        indices = np.concatenate(encoded_rows).astype(np.int32) if encoded_rows else np.zeros(0, dtype=np.int32)
+        return indptr, indices
+    
+    def _model_input(self, indptr: np.ndarray, indices: np.ndarray):
+        """Materialize encoded rows as the input matrix the loaded model expects"""
+        n_rows = len(indptr) - 1
+        
+        if not self._sparse_input:
+            matrix = np.zeros((n_rows, len(self.feature_names)), dtype=np.float32)
+            matrix[np.repeat(np.arange(n_rows), np.diff(indptr)), indices] = 1
+            return matrix
+        
+        from scipy import sparse
+        
+        data = np.ones(len(indices), dtype=np.float32)
+        return sparse.csr_matrix((data, indices, indptr), shape=(n_rows, len(self.feature_names)))
+    
     def _load_metadata(self):
         """Load symptom severity, descriptions, and precautions (gracefully handles missing files)"""
         datasets_path = settings.ML_DATASETS_PATH
@@ -73,38 +321,53 @@ class MLPredictor:
             print("[WARNING] ML metadata will be empty until datasets are uploaded")
             return
         
-        original_datasets_path = datasets_path
-        
         try:
-            # Load symptom severity
-            severity_path = datasets_path / 'Symptom-severity.csv'
-            if severity_path.exists():
-                severity_df = pd.read_csv(severity_path)
-                self.severity_dict = dict(zip(severity_df['Symptom'], severity_df['weight']))
-            
-            # Load disease descriptions
-            desc_path = datasets_path / 'symptom_Description.csv'
-            if desc_path.exists():
-                desc_df = pd.read_csv(desc_path)
-                self.description_dict = dict(zip(desc_df['Disease'], desc_df['Description']))
-            
-            # Load precautions
-            precaution_path = datasets_path / 'symptom_precaution.csv'
-            if precaution_path.exists():
-                precaution_df = pd.read_csv(precaution_path)
-                for _, row in precaution_df.iterrows():
-                    disease = row['Disease']
-                    precautions = [
-                        row[f'Precaution_{i}'] 
-                        for i in range(1, 5) 
-                        if pd.notna(row.get(f'Precaution_{i}', ''))
-                    ]
-                    self.precaution_dict[disease] = precautions
+            # Compiled JSON artifact (see disease_metadata.py) - no pandas on the serving path
+            metadata = load_metadata(datasets_path)
+            self.severity_dict = metadata['severity']
+            self.disease_info = metadata['diseases']
+            self.description_dict = {name: info['description'] for name, info in self.disease_info.items()}
+            self.precaution_dict = {name: info['precautions'] for name, info in self.disease_info.items()}
             
             print("[OK] Loaded disease metadata")
         except Exception as e:
             print(f"[WARN] Error loading metadata: {e}")
     
+    def _build_class_table(self):
+        """
+        Resolve the metadata of every model class once, in model.classes_ order,
+        so post-processing a prediction is a single index into class_table.
+        Staff overrides (DiseaseOverride) take precedence over the compiled metadata.
+        """
+        if self.model is None:
+            return
+        
+        overrides = load_disease_overrides()
+        table = []
+        for disease in self.model.classes_:
+            disease = str(disease)
+            info = self.disease_info.get(disease)
+            if info is not None:
+                communicable, acute, icd10 = info['communicable'], info['acute'], info['icd10']
+                description, precautions = info['description'], info['precautions']
+            else:
+                (communicable, acute, icd10), description, precautions = classify_disease(disease), '', []
+            
+            override = overrides.get(disease)
+            if override is not None:
+                if override.is_communicable is not None:
+                    communicable = override.is_communicable
+                if override.is_acute is not None:
+                    acute = override.is_acute
+                icd10 = override.icd10_code or icd10
+                description = override.description or description
+                precautions = override.precautions or precautions
+            
+            table.append(DiseaseInfo(communicable, acute, icd10, description, tuple(precautions)))
+        
+        self.class_table = tuple(table)
+        self._class_index = {str(disease): idx for idx, disease in enumerate(self.model.classes_)}
+    
     def predict(self, symptoms: List[str]) -> Dict:
         """
         Predict disease from symptoms
@@ -115,115 +378,145 @@ class MLPredictor:
         Returns:
             Dictionary with prediction results
         """
+        return self.predict_batch([symptoms])[0]
+    
+    def predict_batch(self, symptom_lists: List[List[str]]) -> List[Dict]:
+        """
+        Predict diseases for many symptom lists at once
+        
+        Results are memoized per canonical symptom set and model version;
+        cache misses are scored together with a single predict_proba call
+        (the predicted class is the argmax of each probability row).
+        
+        Args:
+            symptom_lists: List of symptom lists (e.g., [['fever'], ['cough', 'headache']])
+        
+        Returns:
+            List of prediction result dicts, in the same order as the input
+        """
         if not self.model or not self.feature_names:
-            return {
-                'predicted_disease': 'ML Model Not Available',
-                'confidence': 0.0,
-                'matched_symptoms': symptoms,
-                'unmatched_symptoms': [],
-                'top_predictions': [],
-                'description': 'The ML prediction model is not currently available. Please upload the ML models to enable predictions.',
-                'precautions': ['Contact clinic staff for assistance', 'Monitor your symptoms', 'Rest and stay hydrated', 'Seek medical attention if symptoms worsen'],
-                'severity_score': 0,
-                'warning': 'ML model not loaded - predictions unavailable'
-            }
+            return [self._unavailable_result(symptoms) for symptoms in symptom_lists]
         
-        # Normalize symptom names (lowercase, replace spaces with underscores)
-        normalized_symptoms = [s.lower().replace(' ', '_') for s in symptoms]
+        if not symptom_lists:
+            return []
         
-        # Create input vector
-        input_vector = np.zeros(len(self.feature_names))
-        matched_symptoms = []
+        encoded = [self.encode_symptoms(symptoms) for symptoms in symptom_lists]
+        keys = [(self.model_version, cols.tobytes()) for cols, _ in encoded]
+        results = [None] * len(encoded)
+        pending = {}
         
-        for symptom in normalized_symptoms:
-            if symptom in self.feature_names:
-                idx = self.feature_names.index(symptom)
-                input_vector[idx] = 1
-                matched_symptoms.append(symptom)
+        for i, key in enumerate(keys):
+            cached = self.prediction_cache.get(key)
+            if cached is not None:
+                results[i] = self._with_matched(cached, encoded[i][1])
+            else:
+                # Duplicates within one batch are scored once
+                pending.setdefault(key, []).append(i)
         
-        # Get prediction
-        prediction = self.model.predict(input_vector.reshape(1, -1))[0]
+        if pending:
+            rows = [encoded[positions[0]][0] for positions in pending.values()]
+            for positions, result in zip(pending.values(), self._predict_rows(rows)):
+                self.prediction_cache.put(keys[positions[0]], result)
+                for i in positions:
+                    results[i] = self._with_matched(result, encoded[i][1])
         
-        # Get confidence scores (initialize empty list first)
-        top_predictions = []
+        return results
+    
+    @staticmethod
+    def _with_matched(result: Dict, matched_symptoms: List[str]) -> Dict:
+        """Private copy of a cached result, with the caller's own matched symptom names"""
+        result = copy.deepcopy(result)
+        result['matched_symptoms'] = matched_symptoms
+        return result
+    
+    def _predict_rows(self, rows: List[np.ndarray]) -> List[Dict]:
+        """Score encoded rows with one predict_proba call (matched_symptoms left empty)"""
+        indptr, indices = self._encode_batch(rows)
+        input_matrix = self._model_input(indptr, indices)
+        
+        results = []
         
         if hasattr(self.model, 'predict_proba'):
-            proba = self.model.predict_proba(input_vector.reshape(1, -1))[0]
-            top_3_idx = np.argsort(proba)[::-1][:3]
+            # One pass supplies both the top-3 ranking and the argmax prediction
+            proba_matrix = self.model.predict_proba(input_matrix)
+            # Stable descending sort: ties keep classes_ order, so top-1 is the model's argmax
+            top_3_matrix = np.argsort(-proba_matrix, axis=1, kind='stable')[:, :3]
             
-            for idx in top_3_idx:
-                disease = self.model.classes_[idx]
-                confidence = float(proba[idx])
-                top_predictions.append({
-                    'disease': disease,
-                    'confidence': confidence
-                })
+            for row in range(len(rows)):
+                top_predictions = [
+                    {
+                        'disease': self.model.classes_[idx],
+                        'confidence': float(proba_matrix[row, idx])
+                    }
+                    for idx in top_3_matrix[row]
+                ]
+                results.append(self._build_result(
+                    top_predictions[0]['disease'], top_predictions, [], self.class_table[top_3_matrix[row, 0]]
+                ))
         else:
             # Fallback if model doesn't support probability
-            top_predictions.append({
-                'disease': prediction,
-                'confidence': 0.85  # Default confidence for non-probabilistic models
-            })
-        
-        # Get disease information
-        description = self.description_dict.get(prediction, '')
-        precautions = self.precaution_dict.get(prediction, [])
-        
-        # Categorize disease
-        is_communicable = self._is_communicable(prediction)
-        is_acute = self._is_acute(prediction)
-        icd10_code = self._get_icd10_code(prediction)
+            for prediction in self.model.predict(input_matrix):
+                top_predictions = [{
+                    'disease': prediction,
+                    'confidence': 0.85  # Default confidence for non-probabilistic models
+                }]
+                results.append(self._build_result(prediction, top_predictions, [], self.disease_info_for(prediction)))
         
+        return results
+    
+    def _build_result(self, prediction: str, top_predictions: List[Dict], matched_symptoms: List[str],
+                      info: DiseaseInfo) -> Dict:
+        """Attach disease metadata (a class_table row) to a raw model prediction"""
         return {
             'predicted_disease': prediction,
             'confidence_score': float(top_predictions[0]['confidence']) if top_predictions else 0.0,
             'top_predictions': top_predictions,
-            'description': description,
-            'precautions': precautions,
+            'description': info.description,
+            'precautions': list(info.precautions),
             'matched_symptoms': matched_symptoms,
-            'is_communicable': is_communicable,
-            'is_acute': is_acute,
-            'icd10_code': icd10_code
+            'is_communicable': info.is_communicable,
+            'is_acute': info.is_acute,
+            'icd10_code': info.icd10_code,
+            'model_version': self.model_version
         }
     
+    def _unavailable_result(self, symptoms: List[str]) -> Dict:
+        """Placeholder result returned while no model is loaded"""
+        return {
+            'predicted_disease': 'ML Model Not Available',
+            'confidence': 0.0,
+            'matched_symptoms': symptoms,
+            'unmatched_symptoms': [],
+            'top_predictions': [],
+            'description': 'The ML prediction model is not currently available. Please upload the ML models to enable predictions.',
+            'precautions': ['Contact clinic staff for assistance', 'Monitor your symptoms', 'Rest and stay hydrated', 'Seek medical attention if symptoms worsen'],
+            'severity_score': 0,
+            'model_version': None,
+            'warning': 'ML model not loaded - predictions unavailable'
+        }
+    
+    def disease_info_for(self, disease: str) -> DiseaseInfo:
+        """class_table row for a disease name (keyword classification for unknown names)"""
+        idx = self._class_index.get(str(disease))
+        if idx is not None:
+            return self.class_table[idx]
+        return DiseaseInfo(*classify_disease(disease), '', ())
+    
     def _is_communicable(self, disease: str) -> bool:
         """Determine if disease is communicable"""
-        communicable_diseases = [
-            'common cold', 'flu', 'tuberculosis', 'pneumonia', 'covid-19',
-            'malaria', 'dengue', 'typhoid', 'hepatitis', 'chickenpox',
-            'measles', 'mumps', 'influenza'
-        ]
-        return any(comm in disease.lower() for comm in communicable_diseases)
+        return self.disease_info_for(disease).is_communicable
     
     def _is_acute(self, disease: str) -> bool:
         """Determine if disease is acute (vs chronic)"""
-        chronic_diseases = [
-            'diabetes', 'hypertension', 'asthma', 'arthritis', 'chronic',
-            'migraine', 'allergy', 'gerd', 'osteoporosis'
-        ]
-        return not any(chronic in disease.lower() for chronic in chronic_diseases)
+        return self.disease_info_for(disease).is_acute
     
     def _get_icd10_code(self, disease: str) -> str:
         """Get ICD-10 code for disease (simplified mapping)"""
-        icd10_mapping = {
-            'common cold': 'J00',
-            'influenza': 'J11',
-            'pneumonia': 'J18',
-            'diabetes': 'E11',
-            'hypertension': 'I10',
-            'asthma': 'J45',
-            'migraine': 'G43',
-            'dengue': 'A90',
-            'typhoid': 'A01',
-            'malaria': 'B54',
-        }
-        
-        disease_lower = disease.lower()
-        for key, code in icd10_mapping.items():
-            if key in disease_lower:
-                return code
-        
-        return ''
+        return self.disease_info_for(disease).icd10_code
+    
+    def class_names(self) -> List[str]:
+        """Diseases the model can predict, in class_table order"""
+        return list(self._class_index)
     
     def get_available_symptoms(self) -> List[str]:
         """Get list of all available symptoms the model can recognize"""
@@ -234,12 +527,97 @@ class MLPredictor:
 _ml_predictor = None
 _ai_generator = None
 
+# Hot reload state: a changed stamp loads a new predictor in a background thread
+_reload_lock = threading.Lock()
+_reload_thread = None
+_model_stamp = None
+_last_model_check = 0.0
+
+
+def _current_stamp() -> Tuple:
+    """
+    (mtime, size) of the registry and the model files it may point at (None for
+    missing files), plus the disease overrides version (see overrides_changed);
+    no database query
+    """
+    model_path = resolve_model_path()
+    stamp = []
+    for path in (registry_path(), model_path, model_path.with_suffix('.npz'),
+                 settings.ML_MODEL_PATH.parent / 'disease_predictor.pkl'):
+        try:
+            stat = path.stat()
+            stamp.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stamp.append(None)
+    stamp.append(_overrides_stamp())
+    return tuple(stamp)
+
+
+def _reload_predictor():
+    """Build a predictor for the current model files and swap it in if it loaded"""
+    global _ml_predictor, _reload_thread
+    try:
+        predictor = MLPredictor()
+        if predictor.model is None and _ml_predictor is not None and _ml_predictor.model is not None:
+            print("[WARNING] New ML model failed to load - keeping version "
+                  f"{_ml_predictor.model_version}")
+            return
+        previous = _ml_predictor.model_version if _ml_predictor else ''
+        # Single reference assignment: in-flight requests finish on the old predictor
+        _ml_predictor = predictor
+        print(f"[OK] Swapped ML model {previous or '(none)'} -> {predictor.model_version}")
+    except Exception as e:
+        print(f"[ERROR] ML model reload failed: {e}")
+    finally:
+        _reload_thread = None
+
+
+def _reload_in_background():
+    _reload_predictor()
+    # Loading overrides opened a connection owned by this thread
+    connection.close()
+
+
+def check_for_model_update(force: bool = False) -> Optional[threading.Thread]:
+    """
+    Start a background reload if the model files or disease overrides changed
+    since the last check. Checks are throttled to one pass per
+    ML_MODEL_CHECK_INTERVAL seconds unless force=True.
+    
+    Returns:
+        The reload thread if one was started, else None
+    """
+    global _model_stamp, _last_model_check, _reload_thread
+    if not getattr(settings, 'ML_MODEL_HOT_RELOAD', True):
+        return None
+    
+    now = time.monotonic()
+    if not force and now - _last_model_check < getattr(settings, 'ML_MODEL_CHECK_INTERVAL', 5):
+        return None
+    
+    with _reload_lock:
+        _last_model_check = now
+        stamp = _current_stamp()
+        if stamp == _model_stamp or _reload_thread is not None:
+            return None
+        _model_stamp = stamp
+        _reload_thread = threading.Thread(target=_reload_in_background, name='ml-model-reload', daemon=True)
+        _reload_thread.start()
+        return _reload_thread
+
 
 def get_ml_predictor() -> MLPredictor:
-    """Get ML predictor singleton instance"""
-    global _ml_predictor
+    """Get ML predictor singleton instance (swapped in place when a new model is published)"""
+    global _ml_predictor, _model_stamp, _last_model_check
     if _ml_predictor is None:
-        _ml_predictor = MLPredictor()
+        with _reload_lock:
+            if _ml_predictor is None:
+                _model_stamp = _current_stamp()
+                _last_model_check = time.monotonic()
+                _ml_predictor = MLPredictor()
+        return _ml_predictor
+    
+    check_for_model_update()
     return _ml_predictor
 
 
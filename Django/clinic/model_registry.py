@@ -0,0 +1,115 @@
+"""
+Versioned ML model registry
+A small JSON file next to settings.ML_MODEL_PATH records every published model
+and which one is current. Publishing copies the model (and its compiled .npz)
+to version-stamped file names and then atomically rewrites the registry, so
+running workers never see a half-written model and can swap it in on their own.
+
+registry.json:
+    {
+        "current": "fcdc04a6e1b2",
+        "versions": [
+            {"version": "fcdc04a6e1b2",
+             "model": "disease_predictor_v2-fcdc04a6e1b2.pkl",
+             "compiled": "disease_predictor_v2-fcdc04a6e1b2.npz",
+             "published_at": "2026-10-17T08:00:00+00:00"}
+        ]
+    }
+"""
+
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from .tree_engine import file_sha256
+
+
+def registry_path() -> Path:
+    """Location of registry.json (ML_MODEL_REGISTRY, default: next to ML_MODEL_PATH)"""
+    return Path(getattr(settings, 'ML_MODEL_REGISTRY', None) or settings.ML_MODEL_PATH.parent / 'registry.json')
+
+
+def load_registry() -> Optional[Dict]:
+    """Parsed registry, or None if no model has been published through it"""
+    try:
+        with open(registry_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def resolve_model_path() -> Path:
+    """Pickle of the current registry version, falling back to settings.ML_MODEL_PATH"""
+    registry = load_registry()
+    if registry:
+        for entry in registry.get('versions', []):
+            if entry['version'] == registry.get('current'):
+                return registry_path().parent / entry['model']
+    return settings.ML_MODEL_PATH
+
+
+def _atomic_copy(source: Path, target: Path):
+    tmp_path = target.with_name(f'.{target.name}.tmp')
+    shutil.copy2(source, tmp_path)
+    os.replace(tmp_path, target)
+
+
+def _write_registry(registry: Dict):
+    path = registry_path()
+    tmp_path = path.with_name(f'.{path.name}.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(registry, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def publish_model(model_path: Path, keep: int = 3) -> str:
+    """
+    Register a trained model (plus its compiled .npz, if exported) and make it current.
+    Files of versions beyond the newest `keep` are deleted.
+
+    Returns:
+        The new version id (short checksum of the pickle)
+    """
+    model_path = Path(model_path)
+    version = file_sha256(model_path)[:12]
+    registry_dir = registry_path().parent
+    registry = load_registry() or {'current': None, 'versions': []}
+
+    entry = {
+        'version': version,
+        'model': f'{model_path.stem}-{version}{model_path.suffix}',
+        'compiled': None,
+        'published_at': timezone.now().isoformat(),
+    }
+    _atomic_copy(model_path, registry_dir / entry['model'])
+
+    compiled_path = model_path.with_suffix('.npz')
+    if compiled_path.exists():
+        entry['compiled'] = f'{model_path.stem}-{version}.npz'
+        _atomic_copy(compiled_path, registry_dir / entry['compiled'])
+
+    versions = [v for v in registry['versions'] if v['version'] != version] + [entry]
+    for stale in versions[:-keep] if keep > 0 else []:
+        for name in (stale['model'], stale.get('compiled')):
+            if name:
+                # Workers still using a memory-mapped copy keep their mapping after unlink
+                (registry_dir / name).unlink(missing_ok=True)
+
+    registry['versions'] = versions[-keep:] if keep > 0 else versions
+    registry['current'] = version
+    _write_registry(registry)
+    return version
+
+
+def activate_version(version: str):
+    """Point the registry at an already published version (e.g. to roll back)"""
+    registry = load_registry()
+    if not registry or version not in {v['version'] for v in registry['versions']}:
+        raise ValueError(f"Model version {version} is not in the registry")
+    registry['current'] = version
+    _write_registry(registry)
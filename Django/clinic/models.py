@@ -8,6 +8,7 @@ from django.db import models
 from django.utils import timezone
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.core.serializers.json import DjangoJSONEncoder
 import uuid
 
 
@@ -1032,3 +1033,170 @@ class Appointment(models.Model):
 
     def __str__(self):
         return f"Appointment: {self.student.school_id} on {self.scheduled_date}"
+
+
+class DiseaseOverride(models.Model):
+    """
+    Clinic staff correction of the metadata attached to an ML prediction
+    Empty fields keep the compiled value (ML/Datasets/active/disease_metadata.json);
+    workers pick up changes with the next model check (see ml_service.get_ml_predictor)
+    """
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    disease = models.CharField(
+        max_length=100,
+        unique=True,
+        help_text='Disease name exactly as predicted by the model'
+    )
+    
+    is_communicable = models.BooleanField(null=True, blank=True)
+    is_acute = models.BooleanField(null=True, blank=True)
+    icd10_code = models.CharField(max_length=10, blank=True)
+    description = models.TextField(blank=True)
+    precautions = models.JSONField(
+        default=list,
+        blank=True,
+        help_text='Replaces the dataset precautions when not empty'
+    )
+    
+    updated_by = models.ForeignKey(
+        CustomUser,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='disease_overrides',
+        limit_choices_to={'role': 'staff'}
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'disease_overrides'
+        verbose_name = 'Disease Override'
+        ordering = ['disease']
+    
+    def __str__(self):
+        return f"Override: {self.disease}"
+
+
+class LLMCallStats(models.Model):
+    """
+    LLM provider calls aggregated per hour, method, provider and model
+    Written by clinic.llm_metrics from each worker's in-memory buffer; the latency
+    histogram (counts per llm_metrics.LATENCY_BUCKETS_MS bucket) lets percentiles
+    be combined across rows
+    """
+    
+    bucket_start = models.DateTimeField(db_index=True)
+    method = models.CharField(max_length=40)
+    provider = models.CharField(max_length=30)
+    model = models.CharField(max_length=100, blank=True)
+    
+    calls = models.PositiveIntegerField(default=0)
+    failures = models.PositiveIntegerField(default=0)
+    fallback_wins = models.PositiveIntegerField(
+        default=0,
+        help_text='Successful calls made after an earlier provider in the order failed or was slow'
+    )
+    prompt_tokens = models.PositiveBigIntegerField(default=0)
+    completion_tokens = models.PositiveBigIntegerField(default=0)
+    latency_sum = models.FloatField(default=0.0, help_text='Seconds')
+    latency_histogram = models.JSONField(default=list, blank=True)
+    status_counts = models.JSONField(default=dict, blank=True, help_text='HTTP status -> calls')
+    counters = models.JSONField(
+        default=dict, blank=True,
+        help_text='Events other than provider calls (cache hits, coalesced requests); on rows without a provider'
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'llm_call_stats'
+        verbose_name = 'LLM Call Statistics'
+        verbose_name_plural = 'LLM Call Statistics'
+        ordering = ['-bucket_start', 'provider', 'method']
+        unique_together = ['bucket_start', 'method', 'provider', 'model']
+    
+    def __str__(self):
+        return f"{self.provider} {self.method} @ {self.bucket_start:%Y-%m-%d %H:00}: {self.calls} calls"
+
+
+class LLMJob(models.Model):
+    """
+    Slow LLM work queued by a view and run by `manage.py run_llm_worker`
+    The view answers right away with the job id; clients poll /api/jobs/<id>/
+    (or listen on /api/jobs/<id>/events/) for the result. See clinic.llm_jobs.
+    """
+    
+    KIND_CHOICES = [
+        ('health_insights', 'Health insights for a chat session'),
+        ('prediction_review', 'LLM review of an ML prediction'),
+        ('speculative_diagnosis', 'Diagnosis made while follow-up questions are answered'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+    
+    # Jobs queued by a logged-in user are only visible to that user
+    created_by = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='llm_jobs'
+    )
+    worker = models.CharField(max_length=100, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'llm_jobs'
+        verbose_name = 'LLM Job'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} ({self.status})"
+    
+    @property
+    def is_finished(self):
+        return self.status in ('succeeded', 'failed')
+
+
+class LLMInflightRequest(models.Model):
+    """
+    An LLM prompt being answered by one worker, so identical requests from other
+    workers wait for its result instead of calling the provider too
+    Maintained by clinic.llm_coalesce (LLM_COALESCE_SHARED); rows are short-lived
+    """
+    
+    key = models.CharField(max_length=64, primary_key=True, help_text='SHA-256 of method and prompt')
+    method = models.CharField(max_length=50)
+    owner = models.CharField(max_length=100, help_text='Worker answering the prompt')
+    started_at = models.DateTimeField(default=timezone.now)
+    # A crashed owner's row is taken over after this
+    expires_at = models.DateTimeField()
+    done = models.BooleanField(default=False)
+    text = models.TextField(null=True, blank=True)
+    provider = models.CharField(max_length=30, blank=True)
+    
+    class Meta:
+        db_table = 'llm_inflight_requests'
+        verbose_name = 'LLM In-flight Request'
+    
+    def __str__(self):
+        return f"{self.method} {self.key[:12]} ({'done' if self.done else self.owner})"
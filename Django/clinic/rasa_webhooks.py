@@ -6,8 +6,11 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
+from django.urls import reverse
 from .ml_service import get_ml_predictor
-from .llm_service import AIInsightGenerator
+from .models import LLMJob
+from .serializers import LLMJobSerializer
+from . import llm_jobs
 import logging
 
 logger = logging.getLogger(__name__)
@@ -35,8 +38,15 @@ def rasa_webhook_predict(request):
         "top_predictions": [...],
         "description": "...",
         "precautions": [...],
-        "insights": [...]  # if generate_insights=true
+        "llm_review": {"job_id": ..., "status": ..., "status_url": ...}  # if generate_insights=true
     }
+    
+    With generate_insights the LLM validation and insights run in a background
+    job (manage.py run_llm_worker, see llm_jobs.prediction_review); the ML result
+    is returned right away and the Rasa action polls status_url (GET
+    /api/rasa/review/<job_id>/) for the job result, which holds "confidence",
+    "llm_validated", "llm_validation" and "insights". With LLM_JOBS_EAGER they
+    are merged into this response instead.
     """
     try:
         # Validate request
@@ -53,71 +63,37 @@ def rasa_webhook_predict(request):
         predictor = get_ml_predictor()
         prediction = predictor.predict(symptoms)
         
-        # HYBRID: Use LLM to validate ML prediction (FREE tier)
-        llm_validation = None
-        validation_confidence_boost = 0.0
-        
-        if generate_insights:
-            try:
-                llm_validator = AIInsightGenerator()
-                llm_validation = llm_validator.validate_ml_prediction(
-                    symptoms=symptoms,
-                    ml_prediction=prediction.get('predicted_disease'),
-                    ml_confidence=prediction.get('confidence_score')
-                )
-                
-                # Boost confidence if LLM agrees
-                if llm_validation and llm_validation.get('agrees_with_ml'):
-                    validation_confidence_boost = llm_validation.get('confidence_boost', 0.05)
-                    logger.info(f"LLM validated ML prediction: {llm_validation.get('reasoning')}")
-                
-            except Exception as e:
-                logger.warning(f"LLM validation failed (continuing with ML only): {e}")
-        
-        # Calculate final confidence (ML + LLM validation boost)
-        final_confidence = min(
-            prediction.get('confidence_score', 0.0) + validation_confidence_boost,
-            1.0  # Cap at 100%
-        )
-        
         # Prepare response
         response_data = {
             'predicted_disease': prediction.get('predicted_disease'),
-            'confidence': final_confidence,
+            'confidence': prediction.get('confidence_score', 0.0),
             'ml_confidence': prediction.get('confidence_score'),  # Original ML score
-            'llm_validated': llm_validation is not None,
+            'llm_validated': False,
             'top_predictions': prediction.get('top_predictions', [])[:3],
             'description': prediction.get('description'),
             'precautions': prediction.get('precautions', []),
             'is_communicable': prediction.get('is_communicable', False),
             'is_acute': prediction.get('is_acute', False),
             'icd10_code': prediction.get('icd10_code', ''),
-            'matched_symptoms': prediction.get('matched_symptoms', [])
+            'matched_symptoms': prediction.get('matched_symptoms', []),
+            'model_version': prediction.get('model_version')
         }
         
-        # Add LLM validation results to response
-        if llm_validation:
-            response_data['llm_validation'] = {
-                'agrees': llm_validation.get('agrees_with_ml'),
-                'reasoning': llm_validation.get('reasoning'),
-                'confidence_boost': validation_confidence_boost,
-                'alternative_diagnosis': llm_validation.get('alternative_diagnosis')
-            }
-        
-        # Generate AI insights if requested (optional, uses LLM)
+        # HYBRID: LLM validation of the ML prediction + insights (FREE tier), in the background
         if generate_insights:
-            try:
-                ai_generator = AIInsightGenerator()
-                insights = ai_generator.generate_health_insights(
-                    symptoms=symptoms,
-                    predictions=prediction
-                )
-                response_data['insights'] = insights
-            except Exception as e:
-                logger.error(f"Failed to generate insights: {e}")
-                response_data['insights'] = []
+            job = llm_jobs.enqueue('prediction_review', {'symptoms': symptoms, 'prediction': prediction})
+            if job.status == llm_jobs.SUCCEEDED:
+                response_data.update(job.result)
+            else:
+                # The Rasa action has no user to authenticate as: it follows the
+                # job on the Rasa review endpoint instead of /api/jobs/<id>/
+                response_data['llm_review'] = {
+                    'job_id': str(job.pk),
+                    'status': job.status,
+                    'status_url': reverse('clinic:rasa-review', args=[job.pk]),
+                }
         
-        logger.info(f"Rasa webhook prediction for {sender_id}: {prediction.get('predicted_disease')} (confidence: {final_confidence:.2f}, validated: {llm_validation is not None})")
+        logger.info(f"Rasa webhook prediction for {sender_id}: {prediction.get('predicted_disease')} (confidence: {response_data['confidence']:.2f}, validated: {response_data['llm_validated']})")
         
         return Response(response_data)
         
@@ -129,6 +105,23 @@ def rasa_webhook_predict(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])  # Rasa webhook - secure with API key in production
+def rasa_webhook_review(request, job_id):
+    """
+    Status and result of the LLM review queued by rasa_webhook_predict
+    
+    GET /api/rasa/review/<job_id>/
+    
+    Response: same fields as /api/jobs/<job_id>/. Only prediction_review jobs
+    are served here; every other job stays behind /api/jobs/.
+    """
+    job = LLMJob.objects.filter(pk=job_id, kind='prediction_review').first()
+    if job is None:
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(LLMJobSerializer(job).data)
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def rasa_webhook_symptoms(request):
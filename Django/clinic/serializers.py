@@ -8,7 +8,7 @@ from django.contrib.auth import get_user_model
 from .models import (
     SymptomRecord, HealthInsight, ChatSession, 
     ConsentLog, AuditLog, DepartmentStats, EmergencyAlert,
-    Medication, MedicationLog, FollowUp
+    Medication, MedicationLog, FollowUp, DiseaseOverride, LLMJob
 )
 
 User = get_user_model()
@@ -103,6 +103,34 @@ class SymptomSubmissionSerializer(serializers.Serializer):
     )
 
 
+class BatchPredictionSerializer(serializers.Serializer):
+    """Serializer for batch prediction endpoint (staff re-scoring)"""
+    symptom_lists = serializers.ListField(
+        child=serializers.ListField(child=serializers.CharField(max_length=100)),
+        required=False,
+        max_length=10000,
+        help_text='List of symptom lists to score'
+    )
+    record_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        required=False,
+        max_length=10000,
+        help_text='SymptomRecord IDs to re-score with the current model'
+    )
+    update_records = serializers.BooleanField(
+        default=False,
+        required=False,
+        help_text='Save the new predictions onto the given records'
+    )
+    
+    def validate(self, attrs):
+        if not attrs.get('symptom_lists') and not attrs.get('record_ids'):
+            raise serializers.ValidationError('Provide symptom_lists or record_ids')
+        if attrs.get('symptom_lists') and attrs.get('record_ids'):
+            raise serializers.ValidationError('Provide either symptom_lists or record_ids, not both')
+        return attrs
+
+
 class DiseasePredictionSerializer(serializers.Serializer):
     """Serializer for disease prediction response"""
     predicted_disease = serializers.CharField()
@@ -407,3 +435,35 @@ class AppointmentSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+
+
+
+class DiseaseOverrideSerializer(serializers.ModelSerializer):
+    """Staff override of the metadata attached to one predicted disease"""
+    updated_by_name = serializers.CharField(source='updated_by.name', read_only=True)
+    precautions = serializers.ListField(
+        child=serializers.CharField(max_length=200),
+        required=False,
+        max_length=10
+    )
+
+    class Meta:
+        model = DiseaseOverride
+        fields = [
+            'id', 'disease', 'is_communicable', 'is_acute', 'icd10_code',
+            'description', 'precautions', 'updated_by', 'updated_by_name',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'updated_by', 'created_at', 'updated_at']
+        # Upserts by disease name, so uniqueness is handled in the view
+        extra_kwargs = {'disease': {'validators': []}}
+
+
+class LLMJobSerializer(serializers.ModelSerializer):
+    """Status and result of a queued LLM job (see clinic.llm_jobs)"""
+    job_id = serializers.UUIDField(source='id', read_only=True)
+
+    class Meta:
+        model = LLMJob
+        fields = ['job_id', 'kind', 'status', 'result', 'error', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
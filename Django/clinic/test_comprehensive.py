@@ -15,7 +15,7 @@ import uuid
 
 from .models import (
     SymptomRecord, EmergencyAlert, Medication, MedicationLog, 
-    FollowUp, ChatSession, HealthInsight, AuditLog
+    FollowUp, ChatSession, HealthInsight, AuditLog, LLMCallStats, LLMJob, LLMInflightRequest
 )
 from .ml_service import get_ml_predictor
 from .llm_service import AIInsightGenerator
@@ -829,6 +829,1215 @@ class LLMServiceTests(TestCase):
         self.assertNotIn(',}', fixed_json)
 
 
+class LLMHttpPoolTests(TestCase):
+    """Test shared LLM provider connection pools"""
+    
+    def tearDown(self):
+        from .llm_http import close_all
+        close_all()
+    
+    def test_client_reused_per_provider(self):
+        """Test each provider gets one pooled client per process"""
+        from .llm_http import get_http_client
+        
+        self.assertIs(get_http_client('openrouter'), get_http_client('openrouter'))
+        self.assertIsNot(get_http_client('openrouter'), get_http_client('groq'))
+    
+    def test_pool_limits_from_settings(self):
+        """Test per-provider overrides are merged over the defaults"""
+        from .llm_http import pool_config
+        
+        with self.settings(LLM_HTTP_POOLS={'groq': {'max_connections': 3}}):
+            config = pool_config('groq')
+        
+        self.assertEqual(config['max_connections'], 3)
+        self.assertIn('keepalive_expiry', config)
+    
+    def test_openrouter_uses_pooled_client(self):
+        """Test OpenRouter calls go through the shared pool"""
+        import httpx
+        
+        def handler(request):
+            self.assertEqual(request.headers['authorization'], 'Bearer test-key')
+            return httpx.Response(200, json={'choices': [{'message': {'content': 'Stay hydrated.'}}]})
+        
+        pooled = httpx.Client(transport=httpx.MockTransport(handler))
+        ai_generator = AIInsightGenerator()
+        with patch('clinic.llm_service.get_http_client', return_value=pooled) as get_client, \
+                patch.object(ai_generator, 'cohere_client', None), \
+                patch.object(ai_generator, 'openrouter_api_key', 'test-key'):
+            response = ai_generator.generate_chat_response("I feel dizzy")
+        
+        self.assertEqual(response, 'Stay hydrated.')
+        get_client.assert_called_with('openrouter')
+
+
+class LLMRoutingTests(TestCase):
+    """Test provider fallback, hedging and adaptive ordering"""
+    
+    def setUp(self):
+        from .llm_routing import ProviderStats
+        self.stats_patch = patch('clinic.llm_routing.provider_stats', ProviderStats())
+        self.stats = self.stats_patch.start()
+    
+    def tearDown(self):
+        self.stats_patch.stop()
+    
+    def test_sequential_falls_through_failures(self):
+        """Test failed or empty providers are skipped and recorded"""
+        from .llm_routing import ProviderAttempt, run_attempts
+        
+        def broken():
+            raise ValueError("503")
+        
+        attempts = [
+            ProviderAttempt('cohere', broken),
+            ProviderAttempt('openrouter', lambda: '  '),
+            ProviderAttempt('groq', lambda: 'Drink water.'),
+        ]
+        text, provider = run_attempts('chat', attempts)
+        
+        self.assertEqual((text, provider), ('Drink water.', 'groq'))
+        self.assertEqual(self.stats.error_rate('cohere'), 1.0)
+        self.assertEqual(self.stats.error_rate('groq'), 0.0)
+    
+    def test_hedged_request_uses_faster_provider(self):
+        """Test a slow provider is raced by the next one through the SDK adapters and the loser is cancelled"""
+        import asyncio
+        import weakref
+        from types import SimpleNamespace
+        
+        cancelled = []
+        sent = []
+        
+        class SlowCohere:
+            async def chat(self, message, **kwargs):
+                sent.append('cohere')
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.append('cohere')
+                    raise
+        
+        async def groq_create(**kwargs):
+            sent.append('groq')
+            message = SimpleNamespace(content='Rest well.')
+            usage = SimpleNamespace(prompt_tokens=40, completion_tokens=3)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+        
+        groq = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=groq_create)))
+        ai_generator = AIInsightGenerator()
+        with self.settings(LLM_HEDGING_ENABLED=True, LLM_HEDGE_DEFAULT_DELAY=0.05,
+                           LLM_HEDGE_DELAY_BOUNDS=(0.01, 1.0)), \
+                patch.object(ai_generator, 'cohere_client', Mock()) as cohere_client, \
+                patch.object(ai_generator, 'groq_client', Mock()) as groq_client, \
+                patch.object(ai_generator, 'gemini_client', None), \
+                patch.object(ai_generator, 'openrouter_api_key', None), \
+                patch.object(ai_generator, '_create_cohere_async_client', return_value=SlowCohere()), \
+                patch.object(ai_generator, '_create_groq_async_client', return_value=groq), \
+                patch.object(ai_generator, '_async_clients', weakref.WeakKeyDictionary()):
+            response = ai_generator.generate_chat_response("I feel tired")
+        
+        self.assertEqual(response, 'Rest well.')
+        self.assertEqual(sent, ['cohere', 'groq'])
+        self.assertEqual(cancelled, ['cohere'])
+        # Neither synchronous client was used
+        cohere_client.chat.assert_not_called()
+        groq_client.chat.completions.create.assert_not_called()
+    
+    def test_hedging_skips_thread_backed_providers(self):
+        """Test only native-async providers are raced, and budget is taken only for started calls"""
+        from .llm_routing import ProviderAttempt, run_attempts
+        
+        async def fast():
+            return 'Rest well.'
+        
+        async def unused():
+            return 'Unused.'
+        
+        attempts = [
+            ProviderAttempt('openrouter', lambda: 'Thread-backed.'),
+            ProviderAttempt('cohere', lambda: 'unused', fast),
+            ProviderAttempt('groq', lambda: 'unused', unused),
+        ]
+        with self.settings(LLM_HEDGING_ENABLED=True, LLM_HEDGE_DEFAULT_DELAY=1.0), \
+                patch('clinic.llm_routing.llm_ratelimit.acquire', return_value=(True, 0.0)) as acquire:
+            text, provider = run_attempts('chat', attempts)
+        
+        self.assertEqual((text, provider), ('Rest well.', 'cohere'))
+        self.assertEqual([c.args[0] for c in acquire.call_args_list], ['cohere'])
+    
+    def test_adaptive_order_prefers_fast_reliable_provider(self):
+        """Test providers are reordered by observed latency and errors"""
+        from .llm_routing import ProviderAttempt, order_attempts
+        
+        attempts = [ProviderAttempt('cohere', str), ProviderAttempt('groq', str)]
+        for _ in range(3):
+            self.stats.record('cohere', 4.0, True)
+            self.stats.record('groq', 0.5, True)
+        
+        with self.settings(LLM_ADAPTIVE_ORDER_MIN_SAMPLES=5):
+            self.assertEqual([a.provider for a in order_attempts(attempts)], ['cohere', 'groq'])
+        with self.settings(LLM_ADAPTIVE_ORDER_MIN_SAMPLES=3):
+            self.assertEqual([a.provider for a in order_attempts(attempts)], ['groq', 'cohere'])
+
+
+class LLMCircuitBreakerTests(TestCase):
+    """Test per-provider circuit breakers shared through the 'llm_state' cache"""
+    
+    def test_circuit_opens_on_error_rate(self):
+        """Test a failing provider is skipped once its error rate trips the breaker"""
+        from . import llm_breaker
+        from .llm_routing import ProviderAttempt, run_attempts
+        
+        calls = []
+        
+        def broken():
+            calls.append('cohere')
+            raise ConnectionError("cohere down")
+        
+        attempts = [ProviderAttempt('cohere', broken), ProviderAttempt('groq', lambda: 'Rest.')]
+        with self.settings(LLM_CIRCUIT_MIN_CALLS=3, LLM_CIRCUIT_ERROR_RATE=0.5):
+            for _ in range(5):
+                self.assertEqual(run_attempts('chat', attempts), ('Rest.', 'groq'))
+        
+        self.assertEqual(len(calls), 3)
+        circuit = {c['provider']: c for c in llm_breaker.snapshot()}['cohere']
+        self.assertEqual(circuit['state'], 'open')
+        self.assertEqual(circuit['trip_count'], 1)
+        self.assertEqual(llm_breaker.allowed_providers(['cohere', 'groq']), ['groq'])
+    
+    def test_half_open_probe_closes_circuit(self):
+        """Test one probe is let through after the cooldown and closes the circuit"""
+        from . import llm_breaker
+        
+        llm_breaker.record('openrouter', ok=False, latency=0.4, error='503', cooldown=60)
+        self.assertEqual(llm_breaker.allowed_providers(['openrouter']), [])
+        # Cooldown over
+        llm_breaker.state_cache().delete('llm:circuit:openrouter:open')
+        
+        self.assertEqual(llm_breaker.allowed_providers(['openrouter']), ['openrouter'])
+        # Other workers are held back while the probe is in flight
+        self.assertEqual(llm_breaker.allowed_providers(['openrouter']), [])
+        
+        llm_breaker.record('openrouter', ok=True, latency=0.4)
+        self.assertEqual(llm_breaker.allowed_providers(['openrouter']), ['openrouter'])
+        self.assertEqual({c['provider']: c for c in llm_breaker.snapshot()}['openrouter']['state'], 'closed')
+    
+    def test_open_circuit_shared_between_workers(self):
+        """Test a breaker tripped through one cache client is seen through another (the default table)"""
+        from . import llm_breaker
+        from .cache_backends import AtomicDatabaseCache
+        
+        worker_a = AtomicDatabaseCache('llm_state_cache', {})
+        worker_b = AtomicDatabaseCache('llm_state_cache', {})
+        with patch.object(llm_breaker, 'state_cache', return_value=worker_a):
+            llm_breaker.record('groq', ok=False, latency=0.4, error='503', cooldown=60)
+        with patch.object(llm_breaker, 'state_cache', return_value=worker_b):
+            self.assertEqual(llm_breaker.allowed_providers(['groq', 'cohere']), ['cohere'])
+        
+        llm_breaker.incr(worker_a, 'llm:test:counter')
+        llm_breaker.incr(worker_b, 'llm:test:counter', 2)
+        self.assertEqual(worker_a.get('llm:test:counter'), 3)
+    
+    def test_unavailable_provider_opens_immediately(self):
+        """Test errors retrying cannot fix open the circuit on the first failure"""
+        from . import llm_breaker
+        from .llm_routing import ProviderAttempt, ProviderUnavailable, run_attempts
+        
+        def blocked():
+            raise ProviderUnavailable("Gemini: location not supported", cooldown=3600)
+        
+        run_attempts('chat', [ProviderAttempt('gemini', blocked)])
+        
+        circuit = {c['provider']: c for c in llm_breaker.snapshot()}['gemini']
+        self.assertEqual(circuit['state'], 'open')
+        self.assertGreater(circuit['retry_in'], 3500)
+    
+    def test_monitoring_dashboard_shows_circuits(self):
+        """Test breaker state and trip counts appear on the monitoring page"""
+        from . import llm_breaker
+        
+        admin = User.objects.create_superuser(school_id='ADMIN-CB-001', password='pass123', name='Admin')
+        for _ in range(4):
+            llm_breaker.record('cohere', ok=False, latency=1.0, error='503 Service Unavailable', cooldown=60)
+        self.client.force_login(admin)
+        
+        # No collectstatic manifest in tests
+        storages = {'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}}
+        with self.settings(STORAGES=storages):
+            response = self.client.get('/api/admin/monitoring/')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Circuit Breakers')
+        self.assertContains(response, '503 Service Unavailable')
+        self.assertEqual(response.context['llm_circuits'][0]['trip_count'], 4)
+
+
+class LLMResponseCacheTests(TestCase):
+    """Test the fingerprint-keyed LLM response cache"""
+    
+    def test_fingerprint_normalizes_phrasing(self):
+        """Test near-identical complaints share a fingerprint but negations do not"""
+        from .llm_cache import fingerprint
+        
+        self.assertEqual(
+            fingerprint("i have fever and headache"),
+            fingerprint("I have a fever & headache!")
+        )
+        self.assertEqual(fingerprint("sore throat and body ache"), fingerprint("muscle pain, throat pain"))
+        self.assertNotEqual(fingerprint("fever, no headache"), fingerprint("headache, no fever"))
+        self.assertEqual(fingerprint("headache 2 days, fever 5 days"), fingerprint("fever 5 days and headache 2 days"))
+        self.assertNotEqual(fingerprint("headache 2 days fever 5 days"), fingerprint("headache 5 days fever 2 days"))
+    
+    def test_repeated_complaint_skips_provider(self):
+        """Test extract_and_predict answers a repeated complaint from the cache"""
+        from . import llm_cache
+        
+        result_json = json.dumps({
+            "has_symptoms": True, "extracted_symptoms": ["fever", "headache"],
+            "predicted_disease": "Common Cold", "confidence_score": 0.8
+        })
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = result_json
+        mock_client = Mock()
+        mock_client.chat.completions.create.return_value = mock_response
+        
+        ai_generator = AIInsightGenerator()
+        with patch.object(ai_generator, 'groq_client', mock_client), \
+                patch.object(ai_generator, 'cohere_client', None), \
+                patch.object(ai_generator, 'openrouter_api_key', None):
+            first = ai_generator.extract_and_predict("i have fever and headache")
+            second = ai_generator.extract_and_predict("I have a fever & headache")
+        
+        self.assertEqual(first, second)
+        self.assertEqual(mock_client.chat.completions.create.call_count, 1)
+        stats = llm_cache.stats()['extract_and_predict']
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+    
+    def test_fallback_reply_not_cached(self):
+        """Test the all-providers-failed message is never cached"""
+        from . import llm_cache
+        
+        ai_generator = AIInsightGenerator()
+        with patch.object(ai_generator, 'groq_client', None), \
+                patch.object(ai_generator, 'gemini_client', None), \
+                patch.object(ai_generator, 'cohere_client', None), \
+                patch.object(ai_generator, 'openrouter_api_key', None):
+            ai_generator.generate_chat_response("Hello there")
+        
+        self.assertIsNone(llm_cache.get('chat', "Hello there"))
+
+
+class LLMMetricsTests(TestCase):
+    """Test LLM call instrumentation and its aggregation"""
+    
+    def setUp(self):
+        from . import llm_metrics
+        self.metrics = llm_metrics
+        llm_metrics.clear()
+    
+    def test_run_attempts_records_calls(self):
+        """Test each provider call is recorded with status, tokens and fallback depth"""
+        from .llm_routing import ProviderAttempt, run_attempts
+        
+        def rate_limited():
+            raise Exception("Error code: 429 - rate limit exceeded")
+        
+        text, provider = run_attempts('chat', [
+            ProviderAttempt('groq', rate_limited, model='llama-3.1-8b-instant'),
+            ProviderAttempt('cohere', lambda: self.metrics.with_usage("Drink water.", 12, 5), model='default'),
+        ])
+        
+        self.assertEqual((text, provider), ("Drink water.", 'cohere'))
+        self.assertIs(type(text), str)
+        answered, failed = self.metrics.recent()
+        self.assertEqual((failed['provider'], failed['status'], failed['ok']), ('groq', 429, False))
+        self.assertEqual((answered['status'], answered['fallback_depth']), (200, 1))
+        self.assertEqual((answered['prompt_tokens'], answered['completion_tokens']), (12, 5))
+        
+        self.assertEqual(self.metrics.flush(), 2)
+        stats = LLMCallStats.objects.get(provider='cohere')
+        self.assertEqual((stats.calls, stats.fallback_wins, stats.prompt_tokens), (1, 1, 12))
+        self.assertEqual(LLMCallStats.objects.get(provider='groq').status_counts, {'429': 1})
+    
+    def test_provider_percentiles(self):
+        """Test p50/p95/p99 are read from the merged latency histograms"""
+        for latency in [0.05] * 90 + [2.5] * 10:
+            self.metrics.record('chat', 'cohere', 'default', latency, ok=True)
+        self.metrics.flush()
+        # A second flush into the same hour adds to the row
+        self.metrics.record('chat', 'cohere', 'default', 40.0, ok=False, error=TimeoutError('timed out'))
+        self.metrics.flush()
+        
+        summary, = self.metrics.provider_summary()
+        self.assertEqual(summary['calls'], 101)
+        self.assertEqual(summary['failures'], 1)
+        self.assertLessEqual(summary['p50_ms'], 100)
+        self.assertTrue(2000 <= summary['p95_ms'] <= 3000)
+        self.assertTrue(2000 <= summary['p99_ms'] <= 3000)
+        self.assertEqual(summary['status_counts'], {'200': 100, 'error': 1})
+    
+    def test_event_counts_flush_without_provider(self):
+        """Test counted events are kept across flushes and left out of the provider summary"""
+        self.metrics.count('chat', 'cache_hits')
+        self.metrics.count('chat', 'cache_hits')
+        self.metrics.flush()
+        self.metrics.count('chat', 'cache_hits')
+        
+        self.assertEqual(self.metrics.counter('chat', 'cache_hits'), 3)
+        self.assertEqual(LLMCallStats.objects.get(method='chat', provider='').counters, {'cache_hits': 2})
+        self.assertEqual(self.metrics.provider_summary(), [])
+    
+    def test_api_analytics_page_shows_percentiles(self):
+        """Test the analytics page flushes this worker's calls and lists provider percentiles"""
+        admin = User.objects.create_superuser(school_id='ADMIN-LM-001', password='pass123', name='Admin')
+        self.metrics.record('extract_and_predict', 'groq', 'llama-3.1-8b-instant', 0.8, ok=True)
+        self.client.force_login(admin)
+        
+        storages = {'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}}
+        with self.settings(STORAGES=storages):
+            response = self.client.get('/api/admin/api-analytics/')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'LLM Provider Latency')
+        self.assertEqual(response.context['llm_providers'][0]['provider'], 'groq')
+        self.assertEqual(response.context['llm_providers'][0]['calls'], 1)
+
+
+class ChatStreamingAPITests(APITestCase):
+    """Test the Server-Sent Events variant of the chat endpoint"""
+    
+    def setUp(self):
+        self.student = User.objects.create_user(
+            school_id='2024-SSE-001',
+            password='pass123',
+            name='Stream Test Student',
+            role='student',
+            data_consent_given=True
+        )
+        self.session = ChatSession.objects.create(student=self.student)
+        self.client.force_authenticate(user=self.student)
+    
+    def _events(self, response):
+        body = b''.join(response.streaming_content).decode()
+        events = []
+        for frame in body.strip().split('\n\n'):
+            event, data = frame.split('\n', 1)
+            events.append((event[len('event: '):], json.loads(data[len('data: '):])))
+        return events
+    
+    def _groq_mock(self):
+        diagnosis_json = json.dumps({
+            "has_symptoms": True, "extracted_symptoms": ["fever", "cough"],
+            "predicted_disease": "Common Cold", "confidence_score": 0.8, "severity": "mild"
+        })
+        
+        def create(**kwargs):
+            if kwargs.get('stream'):
+                chunks = []
+                for text in ("Rest ", "and drink ", "fluids."):
+                    chunk = Mock()
+                    chunk.choices = [Mock()]
+                    chunk.choices[0].delta.content = text
+                    chunks.append(chunk)
+                return iter(chunks)
+            response = Mock()
+            response.choices = [Mock()]
+            response.choices[0].message.content = diagnosis_json
+            return response
+        
+        client = Mock()
+        client.chat.completions.create.side_effect = create
+        return client
+    
+    def test_stream_followup_then_diagnosis(self):
+        """Test tokens are streamed and the final event carries the diagnosis and record_id"""
+        ai_generator = AIInsightGenerator()
+        with patch.object(ai_generator, 'groq_client', self._groq_mock()), \
+                patch.object(ai_generator, 'cohere_client', None), \
+                patch.object(ai_generator, 'gemini_client', None), \
+                patch.object(ai_generator, 'openrouter_api_key', None):
+            first = self.client.post('/api/chat/message/stream/', {
+                'message': 'I have fever and cough', 'session_id': str(self.session.id)
+            }, format='json')
+            first_events = self._events(first)
+            
+            second = self.client.post('/api/chat/message/stream/', {
+                'message': 'Two days, dry cough', 'session_id': str(self.session.id)
+            }, format='json')
+            second_events = self._events(second)
+        
+        self.assertEqual(first['Content-Type'], 'text/event-stream')
+        self.assertEqual(first_events[-1][0], 'done')
+        self.assertTrue(first_events[-1][1]['awaiting_followup'])
+        
+        tokens = [data['text'] for event, data in second_events if event == 'token']
+        self.assertEqual(tokens, ["Rest ", "and drink ", "fluids."])
+        event, done = second_events[-1]
+        self.assertEqual(event, 'done')
+        self.assertEqual(done['response'], "Rest and drink fluids.")
+        self.assertEqual(done['diagnosis']['predicted_disease'], 'Common Cold')
+        self.assertTrue(SymptomRecord.objects.filter(id=done['record_id']).exists())
+    
+    def test_openrouter_stream_parsing(self):
+        """Test OpenRouter SSE chunks are decoded, skipping keep-alive comments"""
+        import httpx
+        
+        body = (
+            ': OPENROUTER PROCESSING\n\n'
+            'data: {"choices": [{"delta": {"content": "Stay "}}]}\n\n'
+            'data: {"choices": [{"delta": {"content": "hydrated."}}]}\n\n'
+            'data: [DONE]\n\n'
+        )
+        pooled = httpx.Client(transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, text=body, headers={'content-type': 'text/event-stream'})
+        ))
+        ai_generator = AIInsightGenerator()
+        with patch('clinic.llm_service.get_http_client', return_value=pooled), \
+                patch.object(ai_generator, 'openrouter_api_key', 'test-key'):
+            chunks = list(ai_generator._openrouter_stream("I feel dizzy"))
+        
+        self.assertEqual(chunks, ["Stay ", "hydrated."])
+
+
+class CombinedChatTurnTests(APITestCase):
+    """Test the single-completion chat turn (diagnosis and reply in one JSON answer)"""
+    
+    def setUp(self):
+        self.student = User.objects.create_user(
+            school_id='2024-TURN-001',
+            password='pass123',
+            name='Chat Turn Student',
+            role='student',
+            data_consent_given=True
+        )
+        self.session = ChatSession.objects.create(student=self.student)
+        self.client.force_authenticate(user=self.student)
+    
+    def _groq_mock(self, reply):
+        response = Mock()
+        response.choices = [Mock()]
+        response.choices[0].message.content = json.dumps({
+            "has_symptoms": True, "extracted_symptoms": ["fever", "cough"],
+            "predicted_disease": "Common Cold", "confidence_score": 0.8, "severity": "mild",
+            "reply": reply
+        })
+        client = Mock()
+        client.chat.completions.create.return_value = response
+        return client
+    
+    def _providers(self, groq):
+        ai_generator = AIInsightGenerator()
+        return (patch.object(ai_generator, 'groq_client', groq),
+                patch.object(ai_generator, 'cohere_client', None),
+                patch.object(ai_generator, 'gemini_client', None),
+                patch.object(ai_generator, 'openrouter_api_key', None))
+    
+    def test_generate_chat_turn_single_call(self):
+        """Test one JSON-mode completion yields the diagnosis and the follow-up questions"""
+        groq = self._groq_mock("How many days have you had the fever?")
+        g, c, ge, o = self._providers(groq)
+        with g, c, ge, o:
+            turn = AIInsightGenerator().generate_chat_turn("I have fever and cough")
+        
+        self.assertEqual(groq.chat.completions.create.call_count, 1)
+        kwargs = groq.chat.completions.create.call_args.kwargs
+        self.assertEqual(kwargs['response_format'], {'type': 'json_object'})
+        self.assertTrue(turn['awaiting_followup'])
+        self.assertEqual(turn['reply'], "How many days have you had the fever?")
+        self.assertEqual(turn['diagnosis']['predicted_disease'], 'Common Cold')
+        self.assertEqual(turn['diagnosis']['extracted_symptoms'], ['fever', 'cough'])
+    
+    def test_chat_message_one_provider_call_per_turn(self):
+        """Test the chat endpoint makes a single provider call for each turn"""
+        groq = self._groq_mock("Please rest and drink fluids.")
+        g, c, ge, o = self._providers(groq)
+        with g, c, ge, o:
+            first = self.client.post('/api/chat/message/', {
+                'message': 'I have fever and cough', 'session_id': str(self.session.id)
+            }, format='json')
+            self.assertEqual(groq.chat.completions.create.call_count, 1)
+            
+            second = self.client.post('/api/chat/message/', {
+                'message': 'Two days, dry cough', 'session_id': str(self.session.id)
+            }, format='json')
+            self.assertEqual(groq.chat.completions.create.call_count, 2)
+        
+        self.assertTrue(first.data['awaiting_followup'])
+        self.assertEqual(second.data['response'], "Please rest and drink fluids.")
+        self.assertTrue(SymptomRecord.objects.filter(id=second.data['record_id']).exists())
+    
+    def test_no_structured_provider(self):
+        """Test None is returned when only providers without a JSON mode are configured"""
+        ai_generator = AIInsightGenerator()
+        with patch.object(ai_generator, 'groq_client', None), \
+                patch.object(ai_generator, 'cohere_client', None), \
+                patch.object(ai_generator, 'gemini_client', None), \
+                patch.object(ai_generator, 'openrouter_api_key', 'test-key'), \
+                patch.object(ai_generator, '_openrouter_complete') as openrouter:
+            self.assertIsNone(ai_generator.generate_chat_turn("I have fever"))
+        
+        openrouter.assert_not_called()
+
+
+class LLMFanOutTests(TestCase):
+    """Test independent LLM calls running concurrently under a shared deadline"""
+    
+    def _slow(self, seconds, value):
+        from time import sleep
+        
+        def call(*args, **kwargs):
+            sleep(seconds)
+            return value
+        return call
+    
+    def test_calls_run_in_parallel(self):
+        """Test the wait is the slowest call, not the sum"""
+        from time import monotonic
+        
+        started = monotonic()
+        results = AIInsightGenerator().run_concurrently({
+            'first': self._slow(0.3, 1), 'second': self._slow(0.3, 2)
+        }, timeout=5)
+        
+        self.assertEqual(results, {'first': 1, 'second': 2})
+        self.assertLess(monotonic() - started, 0.55)
+    
+    def test_partial_results_at_deadline(self):
+        """Test calls that fail or miss the deadline are left out of the results"""
+        def broken():
+            raise ValueError("provider down")
+        
+        results = AIInsightGenerator().run_concurrently({
+            'fast': self._slow(0.01, 'ok'), 'slow': self._slow(1.0, 'late'), 'broken': broken
+        }, timeout=0.3)
+        
+        self.assertEqual(results, {'fast': 'ok'})
+    
+    def test_prediction_review_validates_and_generates_concurrently(self):
+        """Test the Rasa review waits for the slower of validation and insights"""
+        from time import monotonic
+        from .llm_jobs import prediction_review
+        
+        ai_generator = AIInsightGenerator()
+        validation = {'agrees_with_ml': True, 'confidence_boost': 0.1, 'reasoning': 'Consistent'}
+        insights = [{'text': 'Rest well.', 'reliability_score': 0.9}]
+        with patch.object(ai_generator, 'validate_ml_prediction', side_effect=self._slow(0.3, validation)), \
+                patch.object(ai_generator, 'generate_health_insights', side_effect=self._slow(0.3, insights)):
+            started = monotonic()
+            review = prediction_review(['fever'], {'predicted_disease': 'Flu', 'confidence_score': 0.6})
+            elapsed = monotonic() - started
+        
+        self.assertLess(elapsed, 0.55)
+        self.assertTrue(review['llm_validated'])
+        self.assertAlmostEqual(review['confidence'], 0.7)
+        self.assertEqual(review['insights'], insights)
+
+
+class LLMRateLimitTests(TestCase):
+    """Test per-provider request and token budgets shared through the 'llm_state' cache"""
+    
+    LIMITS = {'cohere': {'rpm': 2}, 'groq': {'rpm': 30, 'tpm': 1000}}
+    
+    def test_exhausted_provider_is_skipped(self):
+        """Test calls spill over to the next provider once one has used its requests per minute"""
+        from . import llm_ratelimit
+        from .llm_routing import ProviderAttempt, run_attempts
+        
+        calls = []
+        
+        def cohere():
+            calls.append('cohere')
+            return 'Rest.'
+        
+        attempts = [ProviderAttempt('cohere', cohere), ProviderAttempt('groq', lambda: 'Drink water.')]
+        with self.settings(LLM_RATE_LIMITS=self.LIMITS, LLM_RATE_LIMIT_MAX_WAIT=0):
+            results = [run_attempts('chat', attempts) for _ in range(3)]
+            self.assertEqual(llm_ratelimit.snapshot()[0]['throttled'], 1)
+        
+        self.assertEqual(results, [('Rest.', 'cohere'), ('Rest.', 'cohere'), ('Drink water.', 'groq')])
+        self.assertEqual(len(calls), 2)
+    
+    def test_unused_tokens_are_refunded(self):
+        """Test a reservation is corrected with the usage the provider reported"""
+        from . import llm_ratelimit
+        from .llm_metrics import Completion
+        from .llm_routing import ProviderAttempt, run_attempts
+        
+        attempts = [ProviderAttempt('groq', lambda: Completion('Rest.', 100, 50), tokens=600)]
+        with self.settings(LLM_RATE_LIMITS=self.LIMITS):
+            self.assertEqual(run_attempts('chat', attempts), ('Rest.', 'groq'))
+            # 600 reserved, 150 used: a second 600-token call still fits
+            self.assertEqual(run_attempts('chat', attempts), ('Rest.', 'groq'))
+            groq = llm_ratelimit.snapshot()[1]
+        
+        self.assertEqual(groq['tokens_left'], 700)
+        self.assertEqual(groq['requests_left'], 28)
+    
+    def test_429_empties_budget(self):
+        """Test a provider answering 429 is held back until its budget refills"""
+        from . import llm_ratelimit
+        from .llm_routing import ProviderAttempt, run_attempts
+        
+        def limited():
+            raise RuntimeError("Error code: 429 - rate_limit_exceeded")
+        
+        with self.settings(LLM_RATE_LIMITS=self.LIMITS):
+            run_attempts('chat', [ProviderAttempt('groq', limited, tokens=100)])
+            admitted, retry_after = llm_ratelimit.acquire('groq', 100)
+        
+        self.assertFalse(admitted)
+        self.assertGreater(retry_after, 0)
+    
+    def test_stream_settles_rate_limit(self):
+        """Test a streamed call gives back the unused token estimate and a 429 uses up the budget"""
+        from . import llm_ratelimit
+        from .llm_routing import ProviderAttempt, stream_attempts
+        
+        def limited():
+            raise RuntimeError("Error code: 429 - rate_limit_exceeded")
+        
+        attempts = [
+            ProviderAttempt('cohere', limited, tokens=600, prompt_tokens=100),
+            ProviderAttempt('groq', lambda: iter(['Rest ', 'well.']), tokens=600, prompt_tokens=100),
+        ]
+        limits = {'cohere': {'rpm': 5}, 'groq': {'rpm': 30, 'tpm': 1000}}
+        with self.settings(LLM_RATE_LIMITS=limits):
+            self.assertEqual(''.join(stream_attempts('chat', attempts)), 'Rest well.')
+            cohere, groq = llm_ratelimit.snapshot()
+        
+        self.assertEqual(cohere['requests_left'], 0)
+        # 100 prompt tokens + 10 characters streamed
+        self.assertEqual(groq['tokens_left'], 1000 - 102)
+
+
+class LLMCoalescingTests(TestCase):
+    """Test identical concurrent LLM requests sharing one provider call"""
+    
+    def test_concurrent_identical_requests_share_call(self):
+        """Test waiters get the leader's result while only one call is made"""
+        import threading
+        from time import sleep
+        from . import llm_coalesce
+        
+        release = threading.Event()
+        calls = []
+        
+        def call():
+            calls.append(1)
+            release.wait(5)
+            return 'Rest and fluids.', 'cohere'
+        
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(llm_coalesce.single_flight('insights', ['fever'], call)))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        key = llm_coalesce.digest('insights', ['fever'])
+        for _ in range(100):
+            flight = llm_coalesce._flights.get(key)
+            if flight and flight.waiters == 3:
+                break
+            sleep(0.02)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [('Rest and fluids.', 'cohere')] * 4)
+        stats = llm_coalesce.stats()['insights']
+        self.assertEqual((stats['flights'], stats['coalesced']), (1, 3))
+        self.assertEqual(stats['coalesced_rate'], 0.75)
+    
+    def test_result_shared_across_workers(self):
+        """Test a request another worker already answered is served from the lock table"""
+        from . import llm_coalesce
+        
+        key = llm_coalesce.digest('chat', ['Hello', None])
+        LLMInflightRequest.objects.create(
+            key=key, method='chat', owner='web-2:41', done=True, text='Hi there!', provider='groq',
+            expires_at=timezone.now() + timedelta(seconds=5)
+        )
+        
+        with self.settings(LLM_COALESCE_SHARED=True):
+            result = llm_coalesce.single_flight('chat', ['Hello', None], lambda: self.fail('provider called'))
+        
+        self.assertEqual(result, ('Hi there!', 'groq'))
+        self.assertEqual(llm_coalesce.stats()['chat']['coalesced'], 1)
+    
+    def test_crashed_worker_request_taken_over(self):
+        """Test an expired in-flight row is taken over and answered by this worker"""
+        from . import llm_coalesce
+        from .llm_routing import ProviderAttempt, run_attempts
+        
+        key = llm_coalesce.digest('chat', 'Hello')
+        LLMInflightRequest.objects.create(
+            key=key, method='chat', owner='web-2:41', expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        
+        with self.settings(LLM_COALESCE_SHARED=True):
+            result = run_attempts('chat', [ProviderAttempt('groq', lambda: 'Hi!')], key='Hello')
+        
+        self.assertEqual(result, ('Hi!', 'groq'))
+        row = LLMInflightRequest.objects.get(key=key)
+        self.assertTrue(row.done)
+        self.assertEqual((row.text, row.provider), ('Hi!', 'groq'))
+
+
+class LLMStandInTests(TestCase):
+    """Test the local stand-in for the provider APIs"""
+    
+    def setUp(self):
+        from .llm_standin import StandInServer
+        self.server = StandInServer(port=0, config={
+            'seed': 1, 'default': {'latency': {'distribution': 'fixed', 'ms': 5}, 'chunk_delay_ms': 0}
+        }).start()
+        self.addCleanup(self.server.stop)
+        self.ai_generator = AIInsightGenerator()
+    
+    def test_replays_recorded_answer(self):
+        """Test AIInsightGenerator pointed at the stand-in gets the recorded chat reply"""
+        from .llm_service import CHAT_SYSTEM_PROMPT
+        from .llm_standin import prompt_key
+        
+        self.server.recordings.add('groq', prompt_key(CHAT_SYSTEM_PROMPT, 'Hello'), 'Hello', 'Hi! How are you feeling?', 0.8)
+        with self.settings(LLM_STANDIN_URL=self.server.url), \
+                patch.object(self.ai_generator, 'groq_client', self.ai_generator._create_groq_client()), \
+                patch.object(self.ai_generator, 'cohere_client', None), \
+                patch.object(self.ai_generator, 'openrouter_api_key', None), \
+                patch.object(self.ai_generator, 'gemini_client', None):
+            reply = self.ai_generator.generate_chat_response('Hello')
+        
+        self.assertEqual(reply, 'Hi! How are you feeling?')
+        self.assertEqual(self.server.stats[('groq', 200)], 1)
+    
+    def test_injected_errors_fall_back(self):
+        """Test a provider failing on the stand-in falls back to the next one"""
+        self.server.profiles['openrouter']['error_rate'] = 1.0
+        self.server.profiles['openrouter']['error_status'] = 503
+        with self.settings(LLM_STANDIN_URL=self.server.url), \
+                patch.object(self.ai_generator, 'groq_client', self.ai_generator._create_groq_client()), \
+                patch.object(self.ai_generator, 'cohere_client', None), \
+                patch.object(self.ai_generator, 'openrouter_api_key', 'standin'), \
+                patch.object(self.ai_generator, 'gemini_client', None):
+            reply = self.ai_generator.generate_chat_response('Hello')
+        
+        self.assertEqual(reply, self.server.default_text)
+        self.assertEqual(self.server.stats[('openrouter', 503)], 1)
+        self.assertEqual(self.server.stats[('groq', 200)], 1)
+    
+    def test_streams_cohere_events(self):
+        """Test the Cohere SDK streams a reply from the stand-in in chunks"""
+        self.server.profiles['cohere']['chunk_chars'] = 10
+        with self.settings(LLM_STANDIN_URL=self.server.url), \
+                patch.object(self.ai_generator, 'cohere_client', self.ai_generator._create_cohere_client()), \
+                patch.object(self.ai_generator, 'gemini_client', None):
+            chunks = list(self.ai_generator._cohere_stream('Hello'))
+        
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(''.join(chunks), self.server.default_text)
+
+
+class LLMJSONExtractTests(TestCase):
+    """Test the tolerant JSON extractor for LLM completions"""
+    
+    def test_repairs_known_quirks(self):
+        """Test fences, trailing commas, single quotes, Python literals and placeholders are repaired"""
+        from .llm_json import extract
+        
+        text = (
+            "Here is my analysis:\n```json\n"
+            "{'agrees': true/false, \"confidence_adjustment\": 0.05, reasoning: 'Fits dengue',\n"
+            " \"alternative_diagnosis\": None, \"flags\": [True, False,],}\n```"
+        )
+        
+        self.assertEqual(extract(text), {
+            'agrees': True, 'confidence_adjustment': 0.05, 'reasoning': 'Fits dengue',
+            'alternative_diagnosis': None, 'flags': [True, False],
+        })
+    
+    def test_schema_selects_answer(self):
+        """Test an example object that does not match the schema is skipped for the answer"""
+        from .llm_json import SchemaError, extract
+        from .llm_service import CHAT_TURN_SCHEMA, DIAGNOSIS_SCHEMA
+        
+        text = 'Format: {"example": 1}\nAnswer: {"has_symptoms": true, "extracted_symptoms": ["cough"]}'
+        self.assertEqual(extract(text, DIAGNOSIS_SCHEMA)['extracted_symptoms'], ['cough'])
+        
+        with self.assertRaises(SchemaError) as raised:
+            extract('{"has_symptoms": "yes", "extracted_symptoms": ["cough"]}', CHAT_TURN_SCHEMA)
+        self.assertIn('$.has_symptoms: expected boolean, got str', raised.exception.errors)
+        self.assertIn('$.reply: missing', raised.exception.errors)
+        self.assertIsNone(AIInsightGenerator()._parse_chat_turn('{"has_symptoms": false}', followup=True))
+    
+    def test_benchmark_corpus_handled(self):
+        """Test every completion in the benchmark corpus is parsed or rejected as labelled"""
+        import re
+        from io import StringIO
+        from django.core.management import call_command
+        
+        out = StringIO()
+        call_command('benchmark_llm_json', repeat=1, stdout=out)
+        
+        handled, total = re.search(r'(\d+)/(\d+) completions handled', out.getvalue()).groups()
+        self.assertEqual(handled, total)
+
+
+class LLMLazyImportTests(TestCase):
+    """Test provider SDKs are imported on first use only"""
+    
+    def test_startup_does_not_import_sdks(self):
+        """Test a worker's startup imports (settings, URLs, views) leave out the provider SDKs"""
+        from .management.commands.check_import_time import LAZY_SDKS, measure
+        
+        total, modules = measure()
+        
+        self.assertGreater(total, 0)
+        self.assertIn('clinic.llm_service', modules)
+        for sdk in LAZY_SDKS:
+            self.assertNotIn(sdk, modules)
+    
+    def test_lazy_client(self):
+        """Test a client is created on first access if configured, and None otherwise"""
+        from .llm_sdk import LazyClient
+        
+        created = []
+        
+        class Generator:
+            configured = False
+            client = LazyClient('test', lambda self: created.append(1) or 'client', lambda self: self.configured)
+        
+        unconfigured, configured = Generator(), Generator()
+        configured.configured = True
+        
+        self.assertFalse(Generator.client.is_configured(unconfigured))
+        self.assertIsNone(unconfigured.client)
+        self.assertTrue(Generator.client.is_configured(configured))
+        self.assertEqual(created, [])
+        self.assertEqual(configured.client, 'client')
+        self.assertEqual(configured.client, 'client')
+        self.assertEqual(created, [1])
+        
+        # Assigning the attribute replaces (or disables) the client
+        configured.client = None
+        self.assertFalse(Generator.client.is_configured(configured))
+    
+    def test_import_budget_enforced(self):
+        """Test check_import_time fails when startup exceeds the budget"""
+        from io import StringIO
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        
+        with self.assertRaisesRegex(CommandError, 'budget 1ms'):
+            call_command('check_import_time', budget=1, stdout=StringIO())
+
+
+class LLMProviderRegistryTests(TestCase):
+    """Test provider adapters, the registry and the settings-driven routing policy"""
+    
+    def setUp(self):
+        from . import llm_providers
+        self.llm_providers = llm_providers
+        self.ai_generator = AIInsightGenerator()
+    
+    def _register(self, name, adapter):
+        self.llm_providers.register(name, lambda owner: adapter)
+        self.addCleanup(self.llm_providers.unregister, name)
+        return adapter
+    
+    def test_policy_routes_methods(self):
+        """Test generator methods reach the providers and parameters of their LLM_ROUTING entry"""
+        from .llm_providers import FakeProvider
+        from .llm_service import CHAT_SYSTEM_PROMPT
+        
+        fake = self._register('fake', FakeProvider(['Drink water.', 'How many days?']))
+        routing = {
+            'default': {'providers': ['fake'], 'max_tokens': 500},
+            'followup': {'max_tokens': 150, 'options': {'fake': {'temperature': 0.1}}},
+        }
+        with self.settings(LLM_ROUTING=routing):
+            self.assertEqual(self.ai_generator.generate_chat_response('I am thirsty'), 'Drink water.')
+            self.assertEqual(self.ai_generator.generate_followup_questions(['cough'], 'I cough'), 'How many days?')
+        
+        chat, followup = fake.calls
+        self.assertEqual(chat['messages'], [
+            {'role': 'system', 'content': CHAT_SYSTEM_PROMPT}, {'role': 'user', 'content': 'I am thirsty'}
+        ])
+        self.assertEqual((chat['max_tokens'], chat['temperature']), (500, 0.6))
+        self.assertEqual((followup['max_tokens'], followup['temperature']), (150, 0.1))
+    
+    def test_json_mode_and_fallback(self):
+        """Test json_mode skips providers without a JSON mode and failures fall through to the next"""
+        from .llm_providers import FakeProvider
+        
+        text_only = self._register('text_only', FakeProvider(['not used']))
+        text_only.json_mode = False
+        broken = self._register('broken', FakeProvider([RuntimeError('503')]))
+        answer = '{"has_symptoms": false, "reply": "Hello! How can I help?"}'
+        fake = self._register('fake', FakeProvider([answer]))
+        
+        with self.settings(LLM_ROUTING={'default': {'providers': ['text_only', 'broken', 'fake']},
+                                        'chat_turn': {'json_mode': True}}):
+            turn = self.ai_generator.generate_chat_turn('Hello')
+        
+        self.assertEqual(turn['reply'], 'Hello! How can I help?')
+        self.assertEqual(text_only.calls, [])
+        self.assertEqual(len(broken.calls), 1)
+        self.assertTrue(fake.calls[0]['json_mode'])
+    
+    def test_streams_through_adapter(self):
+        """Test streaming replies come from the adapter in chunks"""
+        from .llm_providers import FakeProvider
+        
+        self._register('fake', FakeProvider(['Rest and drink fluids.'], chunk_size=5))
+        with self.settings(LLM_ROUTING={'default': {'providers': ['fake']}}):
+            chunks = list(self.ai_generator.stream_chat_response('I feel tired'))
+        
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(''.join(chunks), 'Rest and drink fluids.')
+
+
+class SpeculativeDiagnosisTests(APITestCase):
+    """Test the diagnosis made in the background while follow-up questions are answered"""
+    
+    ROUTING = {'default': {'providers': ['fake']}, 'chat_turn': {'json_mode': True}}
+    
+    def setUp(self):
+        from . import llm_providers
+        
+        self.student = User.objects.create_user(
+            school_id='2024-SPEC-001',
+            password='pass123',
+            name='Speculation Student',
+            role='student',
+            data_consent_given=True
+        )
+        self.session = ChatSession.objects.create(student=self.student)
+        self.client.force_authenticate(user=self.student)
+        self.fake = llm_providers.FakeProvider([self._answer])
+        llm_providers.register('fake', lambda owner: self.fake)
+        self.addCleanup(llm_providers.unregister, 'fake')
+    
+    def _answer(self, messages):
+        first_turn = 'do NOT give the diagnosis yet' in messages[-1]['content']
+        return json.dumps({
+            "has_symptoms": True, "extracted_symptoms": ["fever", "cough"],
+            "predicted_disease": "Common Cold", "confidence_score": 0.8, "severity": "mild",
+            "reply": "How many days have you had them?" if first_turn else "Likely a common cold. Rest well."
+        })
+    
+    def _send(self, message):
+        return self.client.post('/api/chat/message/', {
+            'message': message, 'session_id': str(self.session.id)
+        }, format='json')
+    
+    def test_answer_without_news_uses_speculation(self):
+        """Test a duration-only answer gets the background diagnosis without another provider call"""
+        from . import llm_jobs
+        
+        with self.settings(LLM_ROUTING=self.ROUTING):
+            first = self._send('I have fever and cough')
+            self.assertTrue(first.data['awaiting_followup'])
+            self.assertEqual(llm_jobs.run_pending(), 1)
+            self.assertEqual(len(self.fake.calls), 2)
+            
+            second = self._send('3 days po')
+        
+        self.assertEqual(len(self.fake.calls), 2)
+        self.assertEqual(second.data['response'], "Likely a common cold. Rest well.")
+        record = SymptomRecord.objects.get(id=second.data['record_id'])
+        self.assertEqual(record.duration_days, 3)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.topics_discussed, [])
+    
+    def test_new_information_diagnosed_again(self):
+        """Test an answer with new symptoms, or one arriving first, gets a fresh diagnosis"""
+        from . import llm_jobs
+        from .llm_speculation import adds_nothing_new, answer_days
+        
+        with self.settings(LLM_ROUTING=self.ROUTING):
+            self._send('I have fever and cough')
+            llm_jobs.run_pending()
+            self._send('2 days, and now I am vomiting')
+            self.assertEqual(len(self.fake.calls), 3)
+            
+            # Answered before the job ran: its result is dropped
+            self._send('I have fever and cough again')
+            self._send('about a week')
+            self.assertEqual(llm_jobs.run_pending(), 1)
+        
+        self.assertEqual(LLMJob.objects.filter(kind='speculative_diagnosis').latest('created_at').result['stored'], False)
+        self.assertFalse(adds_nothing_new('no, just 2 days', ['fever']))
+        self.assertTrue(adds_nothing_new('Yes, fever for 2 days', ['high_fever', 'cough']))
+        self.assertEqual(answer_days('about a week'), 7)
+        self.assertEqual(answer_days('tatlong araw na'), 3)
+
+
+class LLMJobQueueTests(APITestCase):
+    """Test slow LLM work being queued and run by the job worker"""
+    
+    INSIGHTS = [
+        {'text': 'Drink plenty of fluids.', 'reliability_score': 0.9, 'category': 'Hydration'},
+        {'text': 'Get enough rest.', 'reliability_score': 0.85, 'category': 'Rest'},
+        {'text': 'Visit the clinic if fever persists.', 'reliability_score': 0.8, 'category': 'Prevention'},
+    ]
+    
+    def setUp(self):
+        self.student = User.objects.create_user(
+            school_id='2024-JOB-001',
+            password='pass123',
+            name='Job Test Student',
+            role='student',
+            data_consent_given=True
+        )
+        self.session = ChatSession.objects.create(student=self.student)
+        self.client.force_authenticate(user=self.student)
+    
+    def test_insights_queued_then_run_by_worker(self):
+        """Test the insights request answers 202 and the worker stores the insights as the job result"""
+        from . import llm_jobs
+        
+        response = self.client.post('/api/chat/insights/', {
+            'session_id': str(self.session.id), 'symptoms': ['fever', 'cough']
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        status_url = response.data['status_url']
+        self.assertEqual(self.client.get(status_url).data['status'], 'queued')
+        
+        with patch.object(AIInsightGenerator(), 'generate_health_insights', return_value=self.INSIGHTS):
+            self.assertEqual(llm_jobs.run_pending('test-worker'), 1)
+        
+        job = self.client.get(status_url).data
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual(len(job['result']), 3)
+        self.assertEqual(HealthInsight.objects.filter(session_id=self.session.id).count(), 3)
+        
+        # Jobs are only visible to the user who queued them
+        other = User.objects.create_user(school_id='2024-JOB-002', password='pass123', name='Other', role='student')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(status_url).status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_insights_for_session_awaiting_followup(self):
+        """Test insights are generated for a session holding follow-up state among its topics"""
+        from . import llm_jobs
+        
+        self.session.topics_discussed = ['fever', {'_followup_pending': True, 'original_message': 'I have fever',
+                                                   'symptoms': ['fever'], 'speculative': None}]
+        self.session.save()
+        response = self.client.post('/api/chat/insights/', {
+            'session_id': str(self.session.id), 'symptoms': ['fever']
+        }, format='json')
+        
+        ai_generator = AIInsightGenerator()
+        with patch.object(ai_generator, 'generate_health_insights', return_value=self.INSIGHTS) as generate:
+            llm_jobs.run_pending('test-worker')
+        
+        self.assertEqual(LLMJob.objects.get(pk=response.data['job_id']).status, 'succeeded')
+        self.assertEqual(generate.call_args.kwargs['chat_summary'], 'fever')
+    
+    def test_eager_mode_answers_inline(self):
+        """Test LLM_JOBS_EAGER runs the job in the request and returns the insights"""
+        with self.settings(LLM_JOBS_EAGER=True), \
+                patch.object(AIInsightGenerator(), 'generate_health_insights', return_value=self.INSIGHTS):
+            response = self.client.post('/api/chat/insights/', {
+                'session_id': str(self.session.id), 'symptoms': ['fever']
+            }, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['insight_text'], 'Drink plenty of fluids.')
+    
+    def test_rasa_predict_queues_llm_review(self):
+        """Test the Rasa webhook returns the ML result at once and the Rasa action can follow the review job"""
+        from . import llm_jobs
+        
+        response = self.client.post('/api/rasa/predict/', {
+            'symptoms': ['continuous_sneezing', 'chills'], 'generate_insights': True
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['llm_validated'])
+        review = response.data['llm_review']
+        self.assertEqual(review['status'], 'queued')
+        
+        ai_generator = AIInsightGenerator()
+        validation = {'agrees_with_ml': True, 'confidence_boost': 0.05, 'reasoning': 'Consistent'}
+        with patch.object(ai_generator, 'validate_ml_prediction', return_value=validation), \
+                patch.object(ai_generator, 'generate_health_insights', return_value=self.INSIGHTS):
+            llm_jobs.run_pending()
+        
+        # Polled by the Rasa action, which has no user to authenticate as
+        job = self.client.get(review['status_url'])
+        self.assertEqual(job.status_code, status.HTTP_200_OK)
+        self.assertEqual((job.data['job_id'], job.data['status']), (review['job_id'], 'succeeded'))
+        self.assertTrue(job.data['result']['llm_validated'])
+        self.assertAlmostEqual(job.data['result']['confidence'], min(response.data['ml_confidence'] + 0.05, 1.0))
+        self.assertEqual(len(job.data['result']['insights']), 3)
+    
+    def test_rasa_review_serves_review_jobs_only(self):
+        """Test the anonymous Rasa review endpoint does not expose other jobs"""
+        job = LLMJob.objects.create(kind='health_insights', status='succeeded', result=[])
+        
+        response = self.client.get(f'/api/rasa/review/{job.pk}/')
+        
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_stale_jobs_requeued_then_failed(self):
+        """Test a job abandoned by its worker is retried once, then marked failed"""
+        from . import llm_jobs
+        
+        long_ago = timezone.now() - timedelta(hours=1)
+        retry = LLMJob.objects.create(kind='prediction_review', status='running', attempts=1, started_at=long_ago)
+        given_up = LLMJob.objects.create(kind='prediction_review', status='running', attempts=2, started_at=long_ago)
+        
+        claimed = llm_jobs.claim('test-worker')
+        
+        self.assertEqual(claimed.pk, retry.pk)
+        self.assertEqual((claimed.status, claimed.attempts), ('running', 2))
+        given_up.refresh_from_db()
+        self.assertEqual((given_up.status, given_up.error), ('failed', 'Timed out'))
+    
+    def test_ownerless_jobs_staff_only(self):
+        """Test a job queued without a user is visible to staff only, and jobs never to anonymous clients"""
+        job = LLMJob.objects.create(kind='prediction_review', status='succeeded', result={})
+        staff = User.objects.create_user(school_id='staff-JOB-001', password='pass123', name='Staff', role='staff')
+        
+        self.assertEqual(self.client.get(f'/api/jobs/{job.pk}/').status_code, status.HTTP_404_NOT_FOUND)
+        self.client.force_authenticate(user=staff)
+        self.assertEqual(self.client.get(f'/api/jobs/{job.pk}/').status_code, status.HTTP_200_OK)
+        self.client.force_authenticate(user=None)
+        self.assertIn(self.client.get(f'/api/jobs/{job.pk}/').status_code,
+                      (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+    
+    def test_job_events_stream(self):
+        """Test the events endpoint reports the status and ends with the finished job"""
+        job = LLMJob.objects.create(
+            kind='health_insights', status='succeeded', result=[], created_by=self.student
+        )
+        
+        response = self.client.get(f'/api/jobs/{job.pk}/events/')
+        body = b''.join(response.streaming_content).decode()
+        
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertIn('event: status\ndata: {"status": "succeeded"}', body)
+        self.assertIn('event: done', body)
+    
+    def test_job_events_timeout_sets_retry_after(self):
+        """Test an unfinished job's stream ends at once with a timeout event and a Retry-After header"""
+        job = LLMJob.objects.create(kind='health_insights', created_by=self.student)
+        
+        with self.settings(LLM_JOB_EVENTS_TIMEOUT=0):
+            response = self.client.get(f'/api/jobs/{job.pk}/events/')
+            body = b''.join(response.streaming_content).decode()
+        
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertIn('retry: 1000\n', body)
+        self.assertIn('event: timeout', body)
+
+
 # ============================================================================
 # Rasa Integration Tests
 # ============================================================================
@@ -1086,3 +2295,42 @@ class PerformanceTests(TestCase):
             # Access related student (shouldn't trigger new query)
             for record in records:
                 _ = record.student.name
+    
+    def test_clinic_dashboard_query_budget(self):
+        """Test the staff dashboard runs a constant number of queries whatever the department count"""
+        staff = User.objects.create_user(school_id='staff-DASH-001', password='pass123', role='staff')
+        client = APIClient()
+        client.force_authenticate(user=staff)
+        departments = [choice for choice, _ in User.DEPARTMENT_CHOICES]
+        
+        def add_students(department, count):
+            for i in range(count):
+                student = User.objects.create_user(
+                    school_id=f'2024-DASH-{User.objects.count():03d}',
+                    password='pass123',
+                    department=department,
+                    data_consent_given=True
+                )
+                if i == 0:
+                    SymptomRecord.objects.create(student=student, symptoms=['fever'], duration_days=1,
+                                                 predicted_disease='Common Cold')
+        
+        add_students(departments[0], 3)
+        # Records, students, top disease, recent records
+        with self.assertNumQueries(4):
+            response = client.get('/api/staff/dashboard/')
+        self.assertEqual(len(response.data['department_breakdown']), 1)
+        
+        for department in departments[1:]:
+            add_students(department, 2)
+        with self.assertNumQueries(4):
+            response = client.get('/api/staff/dashboard/')
+        
+        breakdown = {row['department']: row for row in response.data['department_breakdown']}
+        self.assertEqual(len(breakdown), len(departments))
+        self.assertEqual(breakdown[departments[0]]['total_students'], 3)
+        self.assertEqual(breakdown[departments[0]]['students_with_symptoms'], 1)
+        self.assertEqual(breakdown[departments[0]]['percentage'], 33.3)
+        self.assertEqual(response.data['total_students'], 3 + 2 * (len(departments) - 1))
+        self.assertEqual(response.data['students_with_symptoms_today'], len(departments))
+        self.assertEqual(response.data['top_insight'], f"Common Cold ({len(departments)} cases this month)")
@@ -11,7 +11,7 @@ from rest_framework import status
 from datetime import timedelta
 import uuid
 
-from .models import SymptomRecord, HealthInsight, ChatSession, ConsentLog, AuditLog
+from .models import SymptomRecord, HealthInsight, ChatSession, ConsentLog, AuditLog, DiseaseOverride
 from .ml_service import get_ml_predictor
 
 User = get_user_model()
@@ -406,3 +406,324 @@ class MLPredictorTests(TestCase):
         
         self.assertIsInstance(symptoms, list)
         self.assertGreater(len(symptoms), 0)
+    
+    def test_predict_batch_matches_single_predictions(self):
+        """Test batch prediction returns the same results as single predictions"""
+        predictor = get_ml_predictor()
+        
+        symptom_lists = [
+            ['continuous_sneezing', 'shivering', 'chills'],
+            ['itching', 'skin_rash', 'nodal_skin_eruptions'],
+            ['unknown_symptom'],
+        ]
+        results = predictor.predict_batch(symptom_lists)
+        
+        self.assertEqual(len(results), 3)
+        for symptoms, result in zip(symptom_lists, results):
+            single = predictor.predict(symptoms)
+            self.assertEqual(result['predicted_disease'], single['predicted_disease'])
+            self.assertAlmostEqual(result['confidence_score'], single['confidence_score'])
+        self.assertEqual(results[2]['matched_symptoms'], [])
+    
+    def test_tied_probabilities_follow_model_argmax(self):
+        """Test tied classes are ranked in classes_ order, matching the model's own prediction"""
+        import numpy as np
+        from unittest.mock import patch
+        
+        predictor = get_ml_predictor()
+        classes = predictor.model.classes_
+        
+        class TiedModel:
+            classes_ = classes
+            
+            def predict_proba(self, X):
+                return np.full((X.shape[0], len(classes)), 1.0 / len(classes))
+            
+            def predict(self, X):
+                return classes[np.argmax(self.predict_proba(X), axis=1)]
+        
+        symptom_lists = [['continuous_sneezing', 'chills'], ['itching', 'skin_rash']]
+        predictor.prediction_cache.clear()
+        try:
+            with patch.object(predictor, 'model', TiedModel()):
+                batch = predictor.predict_batch(symptom_lists)
+                single = [predictor.predict(symptoms) for symptoms in symptom_lists]
+                expected = predictor.model.predict(predictor._model_input(*predictor._encode_batch(
+                    [predictor.encode_symptoms(s)[0] for s in symptom_lists]
+                )))
+        finally:
+            predictor.prediction_cache.clear()
+        
+        for result, one, disease in zip(batch, single, expected):
+            self.assertEqual(result['predicted_disease'], disease)
+            self.assertEqual(one['predicted_disease'], disease)
+            self.assertEqual([p['disease'] for p in result['top_predictions']], list(classes[:3]))
+    
+    def test_encode_symptoms_uses_aliases(self):
+        """Test alias and spacing variants map to model columns"""
+        predictor = get_ml_predictor()
+        
+        cols, matched = predictor.encode_symptoms(['Continuous Sneezing', 'sore throat', 'chills', 'chills', 'not_a_symptom'])
+        
+        self.assertEqual(matched, ['continuous_sneezing', 'throat_irritation', 'chills'])
+        self.assertEqual(len(cols), 3)
+        self.assertEqual(list(cols), sorted(cols))
+    
+    def test_compiled_model_matches_pickle(self):
+        """Test the compiled tree engine reproduces the scikit-learn model"""
+        import pickle
+        import numpy as np
+        from django.conf import settings
+        from .tree_engine import CompiledTreeEnsemble
+        
+        compiled_path = settings.ML_MODEL_PATH.with_suffix('.npz')
+        if not compiled_path.exists():
+            self.skipTest('Compiled model not exported')
+        
+        with open(settings.ML_MODEL_PATH, 'rb') as f:
+            sklearn_model = pickle.load(f)['model']
+        compiled = CompiledTreeEnsemble.load(compiled_path)
+        
+        rng = np.random.default_rng(42)
+        X = (rng.random((200, len(compiled.feature_names))) < 0.05).astype(np.float32)
+        
+        np.testing.assert_allclose(compiled.predict_proba(X), sklearn_model.predict_proba(X), atol=1e-9)
+        self.assertEqual(list(compiled.classes_), [str(c) for c in sklearn_model.classes_])
+    
+    def test_compiled_model_memory_mapped(self):
+        """Test the memory-mapped compiled model shares the file instead of copying it"""
+        import numpy as np
+        from django.conf import settings
+        from .tree_engine import CompiledTreeEnsemble
+        
+        compiled_path = settings.ML_MODEL_PATH.with_suffix('.npz')
+        if not compiled_path.exists():
+            self.skipTest('Compiled model not exported')
+        
+        mapped = CompiledTreeEnsemble.load(compiled_path, mmap=True)
+        loaded = CompiledTreeEnsemble.load(compiled_path)
+        
+        self.assertFalse(mapped.leaf_values.flags.owndata)
+        self.assertFalse(mapped.leaf_values.flags.writeable)
+        X = np.zeros((2, len(mapped.feature_names)), dtype=np.float32)
+        X[1, :5] = 1
+        np.testing.assert_array_equal(mapped.predict_proba(X), loaded.predict_proba(X))
+    
+    def test_prediction_cache_keyed_by_canonical_symptoms(self):
+        """Test reordered/aliased symptom lists hit the prediction cache"""
+        predictor = get_ml_predictor()
+        predictor.prediction_cache.clear()
+        before = predictor.cache_stats()
+        
+        first = predictor.predict(['chills', 'Continuous Sneezing', 'shivering'])
+        second = predictor.predict(['shivering', 'sneezing', 'chills'])
+        stats = predictor.cache_stats()
+        
+        self.assertEqual(stats['misses'] - before['misses'], 1)
+        self.assertEqual(stats['hits'] - before['hits'], 1)
+        self.assertEqual(first['predicted_disease'], second['predicted_disease'])
+        self.assertEqual(second['matched_symptoms'], ['shivering', 'continuous_sneezing', 'chills'])
+        
+        # Callers get private copies
+        second['top_predictions'].clear()
+        self.assertTrue(predictor.predict(['chills', 'shivering', 'sneezing'])['top_predictions'])
+    
+    def test_compiled_metadata_matches_datasets(self):
+        """Test the compiled metadata artifact matches the source CSVs and covers every class"""
+        from django.conf import settings
+        from .disease_metadata import load_metadata, metadata_path, read_datasets
+        
+        if not metadata_path().exists():
+            self.skipTest('Disease metadata not compiled')
+        
+        metadata = load_metadata()
+        self.assertEqual(metadata, read_datasets(settings.ML_DATASETS_PATH))
+        
+        predictor = get_ml_predictor()
+        for disease in predictor.model.classes_:
+            self.assertIn(disease, metadata['diseases'])
+        self.assertEqual(metadata['diseases']['Malaria']['icd10'], 'B54')
+        self.assertTrue(metadata['diseases']['Malaria']['communicable'])
+    
+    def test_class_table_follows_model_classes(self):
+        """Test every model class has a precomputed metadata row"""
+        predictor = get_ml_predictor()
+        
+        self.assertEqual(len(predictor.class_table), len(predictor.model.classes_))
+        malaria = predictor.disease_info_for('Malaria')
+        self.assertEqual(malaria.icd10_code, 'B54')
+        self.assertTrue(malaria.is_communicable)
+        self.assertTrue(malaria.precautions)
+        self.assertEqual(predictor.disease_info_for('Unknown Disease').icd10_code, '')
+    
+    def test_disease_override_applied_on_reload(self):
+        """Test staff overrides replace the compiled metadata after a reload"""
+        from . import ml_service
+        
+        original = get_ml_predictor()
+        DiseaseOverride.objects.create(disease='Malaria', icd10_code='B50.9', precautions=['Visit the clinic'])
+        try:
+            ml_service._reload_predictor()
+            malaria = get_ml_predictor().disease_info_for('Malaria')
+            
+            self.assertEqual(malaria.icd10_code, 'B50.9')
+            self.assertEqual(malaria.precautions, ('Visit the clinic',))
+            self.assertTrue(malaria.is_communicable)  # not overridden
+        finally:
+            ml_service._ml_predictor = original
+    
+    def test_hot_reload_swaps_in_published_model(self):
+        """Test publishing to the registry swaps the predictor without a restart"""
+        import tempfile
+        from pathlib import Path
+        from django.conf import settings
+        from . import ml_service
+        from .model_registry import publish_model
+        
+        original = get_ml_predictor()
+        original.predict(['itching', 'skin_rash'])
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with self.settings(ML_MODEL_REGISTRY=str(Path(tmp_dir) / 'registry.json'), ML_MODEL_CHECK_INTERVAL=0):
+                try:
+                    version = publish_model(settings.ML_MODEL_PATH)
+                    reload_thread = ml_service.check_for_model_update()
+                    self.assertIsNotNone(reload_thread)
+                    reload_thread.join(timeout=60)
+                    
+                    reloaded = get_ml_predictor()
+                    self.assertIsNot(reloaded, original)
+                    self.assertEqual(reloaded.model_path.parent, Path(tmp_dir))
+                    self.assertEqual(reloaded.predict(['itching', 'skin_rash'])['model_version'], version)
+                    self.assertEqual(reloaded.cache_stats()['hits'], 0)
+                finally:
+                    ml_service._ml_predictor = original
+            ml_service._model_stamp = ml_service._current_stamp()
+    
+    def test_override_change_detected_without_query(self):
+        """Test the reload check reads the overrides version from the cache, not the database"""
+        from unittest.mock import patch
+        from . import ml_service
+        
+        with self.assertNumQueries(0):
+            before = ml_service._current_stamp()
+        with patch.object(ml_service, 'check_for_model_update') as check:
+            ml_service.overrides_changed()
+        
+        check.assert_called_once_with(force=True)
+        self.assertNotEqual(ml_service._current_stamp(), before)
+        ml_service._model_stamp = ml_service._current_stamp()
+
+
+class BatchPredictionAPITests(APITestCase):
+    """Test staff batch prediction endpoint"""
+    
+    def setUp(self):
+        self.staff = User.objects.create_user(
+            school_id='staff-batch-001',
+            password='pass123',
+            name='Batch Staff',
+            role='staff'
+        )
+        self.student = User.objects.create_user(
+            school_id='2024-600',
+            password='pass123',
+            name='Batch Student',
+            data_consent_given=True
+        )
+    
+    def test_predict_batch_symptom_lists(self):
+        """Test scoring raw symptom lists"""
+        self.client.force_authenticate(user=self.staff)
+        
+        data = {'symptom_lists': [['continuous_sneezing', 'chills'], ['itching', 'skin_rash']]}
+        response = self.client.post('/api/symptoms/predict-batch/', data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        self.assertIn('predicted_disease', response.data['results'][0])
+    
+    def test_predict_batch_rescores_records(self):
+        """Test re-scoring historical symptom records"""
+        record = SymptomRecord.objects.create(
+            student=self.student,
+            symptoms=['continuous_sneezing', 'shivering', 'chills'],
+            duration_days=1,
+            severity=1,
+            predicted_disease='Outdated'
+        )
+        self.client.force_authenticate(user=self.staff)
+        
+        data = {'record_ids': [str(record.id)], 'update_records': True}
+        response = self.client.post('/api/symptoms/predict-batch/', data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], 1)
+        record.refresh_from_db()
+        self.assertNotEqual(record.predicted_disease, 'Outdated')
+    
+    def test_predict_batch_staff_only(self):
+        """Test students cannot call the batch endpoint"""
+        self.client.force_authenticate(user=self.student)
+        
+        response = self.client.post('/api/symptoms/predict-batch/', {'symptom_lists': [['fever']]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class DiseaseInfoAPITests(APITestCase):
+    """Test staff disease metadata overrides"""
+    
+    def setUp(self):
+        self.staff = User.objects.create_user(
+            school_id='staff-info-001',
+            password='pass123',
+            name='Info Staff',
+            role='staff'
+        )
+        self.student = User.objects.create_user(
+            school_id='2024-700',
+            password='pass123',
+            name='Info Student',
+            data_consent_given=True
+        )
+    
+    def test_list_disease_info(self):
+        """Test staff can list the metadata of every predictable disease"""
+        self.client.force_authenticate(user=self.staff)
+        
+        response = self.client.get('/api/staff/disease-info/')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], len(get_ml_predictor().model.classes_))
+        self.assertIn('icd10_code', response.data['diseases'][0])
+    
+    def test_create_and_update_override(self):
+        """Test posting twice for one disease updates the same override"""
+        self.client.force_authenticate(user=self.staff)
+        
+        response = self.client.post('/api/staff/disease-info/', {'disease': 'Malaria', 'icd10_code': 'B50'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        
+        response = self.client.post('/api/staff/disease-info/', {'disease': 'Malaria', 'is_acute': True}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        override = DiseaseOverride.objects.get(disease='Malaria')
+        self.assertEqual(override.icd10_code, 'B50')
+        self.assertTrue(override.is_acute)
+        self.assertEqual(override.updated_by, self.staff)
+    
+    def test_override_rejects_unknown_disease(self):
+        """Test overrides must name a model class"""
+        self.client.force_authenticate(user=self.staff)
+        
+        response = self.client.post('/api/staff/disease-info/', {'disease': 'Not A Disease'}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_student_cannot_override(self):
+        """Test students cannot change disease metadata"""
+        self.client.force_authenticate(user=self.student)
+        
+        response = self.client.post('/api/staff/disease-info/', {'disease': 'Malaria'}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
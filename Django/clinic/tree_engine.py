@@ -0,0 +1,150 @@
+"""
+Compiled tree-ensemble inference engine
+Evaluates a RandomForest / GradientBoosting model that was flattened into
+contiguous NumPy node arrays by ML/scripts/export_compiled_model.py.
+Only NumPy is needed at request time (no scikit-learn import).
+"""
+
+import hashlib
+import struct
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+
+def file_sha256(path: Path) -> str:
+    """Checksum used to tie a compiled artifact to the pickle it was exported from"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def mmap_npz(path: Path) -> dict:
+    """
+    Memory-map every member of an uncompressed .npz (as written by np.savez).
+    Pages come from the OS page cache, so every process mapping the file -
+    e.g. all gunicorn workers - shares one physical copy of the node arrays.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{info.filename} is compressed and cannot be memory-mapped")
+            
+            # Local file header: 30 fixed bytes, then file name and extra field
+            f.seek(info.header_offset)
+            header = f.read(30)
+            name_length, extra_length = struct.unpack('<HH', header[26:30])
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            
+            if np.lib.format.read_magic(f) == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject:
+                raise ValueError(f"{info.filename} contains Python objects")
+            
+            name = info.filename[:-len('.npy')] if info.filename.endswith('.npy') else info.filename
+            if not shape or 0 in shape:
+                # np.memmap cannot map empty or 0-d arrays; they are tiny anyway
+                arrays[name] = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+            else:
+                arrays[name] = np.memmap(
+                    path, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                    order='F' if fortran_order else 'C',
+                )
+    return arrays
+
+
+class CompiledTreeEnsemble:
+    """
+    Vectorized traversal over flattened decision trees.
+
+    Node arrays (all trees concatenated, absolute indices):
+        feature    int32   split feature per node (-2 for leaves)
+        threshold  float64 go left when x[feature] <= threshold
+        left/right int32   child node indices (-1 for leaves)
+        leaf_index int32   row into leaf_values for leaves (-1 for internal nodes)
+        roots      int32   root node of each tree
+    leaf_values:
+        forest -> (n_leaves, n_classes) class probabilities, averaged over trees
+        gbdt   -> (n_leaves, 1) raw scores, summed per class then softmax/sigmoid
+    """
+
+    def __init__(self, arrays):
+        self.kind = str(arrays['kind'])
+        self.feature = np.ascontiguousarray(arrays['feature'], dtype=np.int32)
+        self.threshold = np.ascontiguousarray(arrays['threshold'], dtype=np.float64)
+        self.left = np.ascontiguousarray(arrays['left'], dtype=np.int32)
+        self.right = np.ascontiguousarray(arrays['right'], dtype=np.int32)
+        self.leaf_index = np.ascontiguousarray(arrays['leaf_index'], dtype=np.int32)
+        self.leaf_values = np.ascontiguousarray(arrays['leaf_values'], dtype=np.float64)
+        self.roots = np.ascontiguousarray(arrays['roots'], dtype=np.int32)
+        self.max_depth = int(arrays['max_depth'])
+        self.classes_ = np.asarray(arrays['classes'])
+        self.feature_names = [str(name) for name in arrays['feature_names']]
+        self.source_sha256 = str(arrays['source_sha256'])
+
+        if self.kind == 'gbdt':
+            self.init_raw = np.asarray(arrays['init_raw'], dtype=np.float64)
+            self.learning_rate = float(arrays['learning_rate'])
+            self.trees_per_stage = int(arrays['trees_per_stage'])
+        elif self.kind != 'forest':
+            raise ValueError(f"Unsupported compiled model kind: {self.kind}")
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = False) -> 'CompiledTreeEnsemble':
+        """
+        Load a compiled model artifact (.npz, no pickled objects).
+        With mmap=True the node arrays are read-only views of the file instead
+        of private heap copies; falls back to a normal load if mapping fails.
+        """
+        if mmap:
+            try:
+                return cls(mmap_npz(path))
+            except (ValueError, OSError):
+                pass
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls({key: arrays[key] for key in arrays.files})
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Return the leaf row reached in every tree: shape (n_samples, n_trees)"""
+        n_samples = X.shape[0]
+        nodes = np.tile(self.roots, (n_samples, 1))
+        rows = np.arange(n_samples)[:, None]
+
+        # All trees and samples advance one level per iteration
+        for _ in range(self.max_depth):
+            left = self.left[nodes]
+            internal = left >= 0
+            if not internal.any():
+                break
+            features = np.maximum(self.feature[nodes], 0)
+            go_left = X[rows, features] <= self.threshold[nodes]
+            nodes = np.where(internal, np.where(go_left, left, self.right[nodes]), nodes)
+
+        return self.leaf_index[nodes]
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Class probabilities, matching the exported scikit-learn model"""
+        X = np.asarray(X)
+        leaves = self.apply(X)
+
+        if self.kind == 'forest':
+            return self.leaf_values[leaves].mean(axis=1)
+
+        contributions = self.leaf_values[leaves, 0].reshape(X.shape[0], -1, self.trees_per_stage)
+        raw = self.init_raw + self.learning_rate * contributions.sum(axis=1)
+        if raw.shape[1] == 1:
+            positive = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        raw = raw - raw.max(axis=1, keepdims=True)
+        exp = np.exp(raw)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predicted class labels (argmax of predict_proba)"""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
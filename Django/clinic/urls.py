@@ -31,22 +31,31 @@ urlpatterns = [
     # Symptom & ML endpoints
     path('symptoms/submit/', views.submit_symptoms, name='submit-symptoms'),
     path('symptoms/available/', views.get_available_symptoms, name='available-symptoms'),
+    path('symptoms/predict-batch/', views.predict_batch, name='predict-batch'),
     
     # Rasa Webhook endpoints (for Rasa → Django ML integration)
     path('rasa/predict/', rasa_webhooks.rasa_webhook_predict, name='rasa-predict'),
     path('rasa/symptoms/', rasa_webhooks.rasa_webhook_symptoms, name='rasa-symptoms'),
+    path('rasa/review/<uuid:job_id>/', rasa_webhooks.rasa_webhook_review, name='rasa-review'),
     
     # AI Chat endpoints
     path('chat/start/', views.start_chat_session, name='start-chat'),
     path('chat/message/', views.send_chat_message, name='send-message'),
+    path('chat/message/stream/', views.send_chat_message_stream, name='send-message-stream'),
     path('chat/insights/', views.generate_insights, name='generate-insights'),
     path('chat/end/', views.end_chat_session, name='end-chat'),
     
+    # Background LLM jobs (queued by chat/insights and rasa/predict)
+    path('jobs/<uuid:job_id>/', views.llm_job_status, name='llm-job'),
+    path('jobs/<uuid:job_id>/events/', views.llm_job_events, name='llm-job-events'),
+    
     # Clinic staff endpoints
     path('staff/dashboard/', views.clinic_dashboard, name='dashboard'),
     path('staff/students/', views.student_directory, name='students'),
     path('staff/analytics/', views.staff_analytics, name='analytics'),
     path('staff/export/', views.export_report, name='export'),
+    path('staff/disease-info/', views.disease_info, name='disease-info'),
+    path('staff/disease-info/<uuid:override_id>/', views.disease_info_reset, name='disease-info-reset'),
     
     # Emergency SOS endpoints
     path('emergency/trigger/', views.trigger_emergency, name='emergency-trigger'),
@@ -10,32 +10,35 @@ from rest_framework.exceptions import APIException
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate, get_user_model
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from django.core.exceptions import ObjectDoesNotExist
 from django.db.models import Count, Q
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from datetime import timedelta
+import json
+import time
 import uuid
 import logging
 
-from .models import SymptomRecord, HealthInsight, ChatSession, ConsentLog, AuditLog, DepartmentStats, EmergencyAlert, Medication, MedicationLog, FollowUp, Message, Appointment
+from .models import SymptomRecord, ChatSession, ConsentLog, AuditLog, DepartmentStats, EmergencyAlert, Medication, MedicationLog, FollowUp, Message, Appointment, DiseaseOverride, LLMJob
 from .serializers import (
     UserRegistrationSerializer, UserProfileSerializer,
-    SymptomRecordSerializer, SymptomSubmissionSerializer,
-    DiseasePredictionSerializer, HealthInsightSerializer,
+    SymptomRecordSerializer, SymptomSubmissionSerializer, BatchPredictionSerializer,
+    DiseasePredictionSerializer,
     ChatSessionSerializer, ChatMessageSerializer,
     ConsentLogSerializer, AuditLogSerializer,
     DepartmentStatsSerializer, DashboardStatsSerializer,
     EmergencyAlertSerializer, EmergencyTriggerSerializer,
     MedicationSerializer, MedicationCreateSerializer, MedicationLogSerializer,
     FollowUpSerializer, FollowUpResponseSerializer,
-    MessageSerializer, AppointmentSerializer
+    MessageSerializer, AppointmentSerializer, DiseaseOverrideSerializer, LLMJobSerializer
 )
 from .permissions import IsStudent, IsClinicStaff, IsOwnerOrStaff, CanModifyProfile, HasDataConsent
-from .ml_service import get_ml_predictor
+from .ml_service import get_ml_predictor, get_ai_generator, overrides_changed
+from . import llm_jobs, llm_speculation
 
 logger = logging.getLogger(__name__)
-from .llm_service import AIInsightGenerator
 
 # ------------------------------------------------------------------
 # Rasa integration – commented out until Rasa is deployed.
@@ -45,9 +48,8 @@ from .llm_service import AIInsightGenerator
 # from .rasa_service import RasaChatService
 # rasa_service = RasaChatService()
 
-# Get singleton instances
-ml_predictor = get_ml_predictor()
-ai_generator = AIInsightGenerator()
+# ML/LLM singletons are created on first use (get_ml_predictor / get_ai_generator),
+# so importing this module stays cheap; gunicorn.conf.py preloads the model in the master
 
 User = get_user_model()
 
@@ -627,6 +629,68 @@ def submit_symptoms(request):
         )
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsClinicStaff])
+def predict_batch(request):
+    """
+    Score many symptom lists with one model call (staff only)
+    POST /api/symptoms/predict-batch/
+    Body: { symptom_lists: [[...], ...] } or { record_ids: [...], update_records: bool }
+    """
+    serializer = BatchPredictionSerializer(data=request.data)
+    
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    data = serializer.validated_data
+    
+    try:
+        predictor = get_ml_predictor()
+        
+        if data.get('record_ids'):
+            records = list(SymptomRecord.objects.filter(id__in=data['record_ids']))
+            predictions = predictor.predict_batch([record.symptoms or [] for record in records])
+            
+            results = []
+            for record, prediction in zip(records, predictions):
+                if data['update_records'] and predictor.model:
+                    record.predicted_disease = prediction['predicted_disease']
+                    record.confidence_score = prediction['confidence_score']
+                    record.top_predictions = prediction['top_predictions']
+                    record.is_communicable = prediction['is_communicable']
+                    record.is_acute = prediction['is_acute']
+                    record.icd10_code = prediction['icd10_code']
+                results.append({'record_id': str(record.id), 'prediction': prediction})
+            
+            updated = 0
+            if data['update_records'] and predictor.model:
+                SymptomRecord.objects.bulk_update(
+                    records,
+                    ['predicted_disease', 'confidence_score', 'top_predictions',
+                     'is_communicable', 'is_acute', 'icd10_code'],
+                    batch_size=500
+                )
+                updated = len(records)
+            
+            return Response({
+                'count': len(results),
+                'updated': updated,
+                'results': results
+            })
+        
+        predictions = predictor.predict_batch(data['symptom_lists'])
+        return Response({
+            'count': len(predictions),
+            'results': predictions
+        })
+    
+    except Exception as e:
+        return Response(
+            {'error': f'Batch prediction failed: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_available_symptoms(request):
@@ -649,6 +713,76 @@ def get_available_symptoms(request):
         )
 
 
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated, IsClinicStaff])
+def disease_info(request):
+    """
+    Metadata attached to each predictable disease, with staff overrides (staff only)
+    GET  /api/staff/disease-info/ - effective communicable/acute/ICD-10/description/precautions per disease
+    POST /api/staff/disease-info/ - create or update the override for one disease
+    Changes reach every worker within ML_MODEL_CHECK_INTERVAL seconds.
+    """
+    predictor = get_ml_predictor()
+    
+    if request.method == 'GET':
+        overrides = {override.disease: override for override in DiseaseOverride.objects.select_related('updated_by')}
+        diseases = []
+        for disease, info in zip(predictor.class_names(), predictor.class_table):
+            override = overrides.get(disease)
+            diseases.append({
+                'disease': disease,
+                'is_communicable': info.is_communicable,
+                'is_acute': info.is_acute,
+                'icd10_code': info.icd10_code,
+                'description': info.description,
+                'precautions': list(info.precautions),
+                'override': DiseaseOverrideSerializer(override).data if override else None,
+            })
+        return Response({
+            'model_version': predictor.model_version,
+            'count': len(diseases),
+            'diseases': diseases
+        })
+    
+    serializer = DiseaseOverrideSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    disease = serializer.validated_data['disease']
+    if predictor.model is not None and disease not in predictor.class_names():
+        return Response(
+            {'disease': [f'"{disease}" is not a disease the model predicts']},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    override, created = DiseaseOverride.objects.update_or_create(
+        disease=disease,
+        defaults={**serializer.validated_data, 'updated_by': request.user}
+    )
+    # Rebuild this worker's class table now, and the others' at their next check
+    transaction.on_commit(overrides_changed)
+    
+    return Response(
+        DiseaseOverrideSerializer(override).data,
+        status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+    )
+
+
+@api_view(['DELETE'])
+@permission_classes([IsAuthenticated, IsClinicStaff])
+def disease_info_reset(request, override_id):
+    """
+    Remove a staff override, restoring the compiled metadata (staff only)
+    DELETE /api/staff/disease-info/<id>/
+    """
+    deleted, _ = DiseaseOverride.objects.filter(id=override_id).delete()
+    if not deleted:
+        return Response({'error': 'Override not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    transaction.on_commit(overrides_changed)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 # ============================================================================
 # AI Chat & Insights Views
 # ============================================================================
@@ -674,6 +808,134 @@ def start_chat_session(request):
     }, status=status.HTTP_201_CREATED)
 
 
+CHAT_UNAVAILABLE_REPLY = (
+    "Thank you for your message. I'm here to help with health concerns. "
+    "Could you describe your symptoms so I can assist you better?"
+)
+CHAT_ERROR_REPLY = (
+    "Thank you for your message. I'm experiencing technical difficulties. "
+    "Please consult with our clinic staff for proper evaluation."
+)
+
+
+def _chat_turn_diagnosis(session, message, combined=False):
+    """
+    Step 1 of a Cohere-only chat turn: extract symptoms and predict a disease.
+    If the student is answering our follow-up questions, the original complaint
+    is folded into the prompt and the pending follow-up state is cleared.
+
+    With combined=True the reply text is requested in the same completion
+    (AIInsightGenerator.generate_chat_turn); a follow-up answer may also be
+    met with the speculative diagnosis and reply made while the student typed
+    (see llm_speculation). reply is None otherwise and step 2 generates it.
+
+    Returns:
+        (diagnosis, has_symptoms, ask_followup, reply)
+    """
+    # Follow-up question state is stored in session.topics_discussed;
+    # topics is a list, our state object is its last element when pending
+    topics = session.topics_discussed or []
+    followup_state = llm_speculation.pending_state(topics)
+
+    if followup_state:
+        # Student replied to our clarifying questions — build enriched context
+        original_message = followup_state.get('original_message', '')
+        original_symptoms = followup_state.get('symptoms', [])
+        symptoms_str = ', '.join(s.replace('_', ' ') for s in original_symptoms)
+        enriched_message = (
+            f"Original complaint: {original_message}. "
+            f"Symptoms identified: {symptoms_str}. "
+            f"Student's follow-up answer: {message}"
+        )
+        # Diagnosed in the background meanwhile; used if the answer adds nothing new
+        speculative = llm_speculation.reuse(followup_state, message)
+        if speculative:
+            diagnosis, reply = speculative
+        else:
+            turn = get_ai_generator().generate_chat_turn(enriched_message, followup=False) if combined else None
+            diagnosis = turn['diagnosis'] if turn else get_ai_generator().extract_and_predict(enriched_message)
+            reply = turn and turn['reply']
+        # Preserve original symptoms if Cohere didn't re-extract them
+        if not diagnosis.get('extracted_symptoms'):
+            diagnosis['extracted_symptoms'] = original_symptoms
+        if not diagnosis.get('has_symptoms'):
+            diagnosis['has_symptoms'] = bool(original_symptoms)
+        # Clear follow-up state from session
+        session.topics_discussed = [t for t in topics if not (isinstance(t, dict) and t.get('_followup_pending'))]
+        session.save(update_fields=['topics_discussed'])
+        has_symptoms = diagnosis.get('has_symptoms', True)
+        logger.info(f"Follow-up answer received — enriched diagnosis: {diagnosis.get('predicted_disease')}")
+        return diagnosis, has_symptoms, False, reply
+
+    turn = get_ai_generator().generate_chat_turn(message) if combined else None
+    diagnosis = turn['diagnosis'] if turn else get_ai_generator().extract_and_predict(message)
+    has_symptoms = diagnosis.get('has_symptoms', False)
+    logger.info(
+        f"Cohere diagnosis: has_symptoms={has_symptoms}, "
+        f"symptoms={diagnosis.get('extracted_symptoms')}, "
+        f"disease={diagnosis.get('predicted_disease')}"
+    )
+    if turn:
+        # The reply was written as follow-up questions exactly when symptoms were found
+        return diagnosis, has_symptoms, turn['awaiting_followup'], turn['reply']
+    return diagnosis, has_symptoms, bool(has_symptoms and diagnosis.get('extracted_symptoms')), None
+
+
+def _start_followup(session, message, symptoms, user=None):
+    """
+    Remember that the next message answers our follow-up questions, and start
+    diagnosing the complaint meanwhile (see llm_speculation)
+    """
+    topics = session.topics_discussed or []
+    session.topics_discussed = [t for t in topics if not (isinstance(t, dict) and t.get('_followup_pending'))]
+    session.topics_discussed.append({
+        '_followup_pending': True,
+        'original_message': message,
+        'symptoms': symptoms,
+    })
+    session.save(update_fields=['topics_discussed'])
+    llm_speculation.start(session, message, user)
+
+
+def _save_chat_diagnosis(user, diagnosis, has_symptoms):
+    """Step 3 of a chat turn: save the diagnosis as a SymptomRecord; returns its id or None"""
+    if not (has_symptoms and diagnosis.get('predicted_disease')):
+        return None
+    try:
+        severity_map = {'mild': 1, 'moderate': 2, 'severe': 3}
+        severity_value = diagnosis.get('severity', 'moderate')
+        if isinstance(severity_value, str):
+            severity_int = severity_map.get(severity_value.lower(), 2)
+        else:
+            severity_int = int(severity_value) if severity_value else 2
+
+        record = SymptomRecord.objects.create(
+            student=user,
+            symptoms=diagnosis['extracted_symptoms'],
+            duration_days=diagnosis.get('duration_days', 1),
+            severity=severity_int,
+            predicted_disease=diagnosis['predicted_disease'],
+            confidence_score=diagnosis.get('confidence_score', 0.0),
+            top_predictions=diagnosis.get('top_predictions', []),
+            is_communicable=diagnosis.get('is_communicable', False),
+            is_acute=diagnosis.get('is_acute', True),
+            icd10_code=diagnosis.get('icd10_code', ''),
+        )
+
+        record.check_referral_criteria()
+        record.save()
+
+        FollowUp.create_from_symptom(record, days_ahead=3)
+
+        record_id = str(record.id)
+        logger.info(f"Created symptom record {record_id} from Cohere chat diagnosis")
+        return record_id
+
+    except Exception as e:
+        logger.error(f"Failed to create symptom record from chat: {e}")
+        return None
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsStudent, HasDataConsent])
 def send_chat_message(request):
@@ -713,137 +975,57 @@ def send_chat_message(request):
         # Step 3: Save SymptomRecord to DB (shows in history, same as Rasa)
         # =================================================================
 
-        # ── Follow-up question state (stored in session.topics_discussed) ──────
-        topics = session.topics_discussed or []
-        # topics is a list; we store our state object as the last element when needed
-        followup_state = None
-        if topics and isinstance(topics[-1], dict) and topics[-1].get('_followup_pending'):
-            followup_state = topics[-1]
-
-        # ── Step 1: If we are waiting for the student's follow-up answer ─────────
-        if followup_state:
-            # Student replied to our clarifying questions — build enriched context
-            original_message = followup_state.get('original_message', '')
-            original_symptoms = followup_state.get('symptoms', [])
-            symptoms_str = ', '.join(s.replace('_', ' ') for s in original_symptoms)
-            enriched_message = (
-                f"Original complaint: {original_message}. "
-                f"Symptoms identified: {symptoms_str}. "
-                f"Student's follow-up answer: {message}"
-            )
-            diagnosis = ai_generator.extract_and_predict(enriched_message)
-            # Preserve original symptoms if Cohere didn't re-extract them
-            if not diagnosis.get('extracted_symptoms'):
-                diagnosis['extracted_symptoms'] = original_symptoms
-            if not diagnosis.get('has_symptoms'):
-                diagnosis['has_symptoms'] = bool(original_symptoms)
-            # Clear follow-up state from session
-            session.topics_discussed = [t for t in topics if not (isinstance(t, dict) and t.get('_followup_pending'))]
-            session.save(update_fields=['topics_discussed'])
-            has_symptoms = diagnosis.get('has_symptoms', True)
-            logger.info(f"Follow-up answer received — enriched diagnosis: {diagnosis.get('predicted_disease')}")
+        # One structured completion gives the diagnosis and the reply when a
+        # provider with JSON output is available; otherwise separate calls
+        diagnosis, has_symptoms, ask_followup, reply = _chat_turn_diagnosis(session, message, combined=True)
 
-        else:
-            # ── Step 1 (normal): Cohere extracts symptoms + predicts disease ────
-            diagnosis = ai_generator.extract_and_predict(message)
-            has_symptoms = diagnosis.get('has_symptoms', False)
-            logger.info(
-                f"Cohere diagnosis: has_symptoms={has_symptoms}, "
-                f"symptoms={diagnosis.get('extracted_symptoms')}, "
-                f"disease={diagnosis.get('predicted_disease')}"
-            )
-
-            # ── Ask follow-up questions on FIRST symptom detection ───────────
-            if has_symptoms and diagnosis.get('extracted_symptoms'):
-                try:
-                    followup_response = ai_generator.generate_followup_questions(
-                        diagnosis['extracted_symptoms'], message
-                    )
-                except Exception as fq_err:
-                    logger.error(f"Follow-up question generation failed: {fq_err}")
-                    followup_response = None
-
-                if followup_response:
-                    # Save state so next message knows to skip straight to diagnosis
-                    new_state = {
-                        '_followup_pending': True,
-                        'original_message': message,
-                        'symptoms': diagnosis['extracted_symptoms'],
-                    }
-                    session.topics_discussed = [t for t in topics
-                                                if not (isinstance(t, dict) and t.get('_followup_pending'))]
-                    session.topics_discussed.append(new_state)
-                    session.save(update_fields=['topics_discussed'])
-                    return Response({
-                        'response': followup_response,
-                        'session_id': str(session.id),
-                        'awaiting_followup': True,
-                        'diagnosis_saved': False,
-                    })
+        # ── Ask follow-up questions on FIRST symptom detection ───────────────
+        if ask_followup:
+            try:
+                followup_response = reply or get_ai_generator().generate_followup_questions(
+                    diagnosis['extracted_symptoms'], message
+                )
+            except Exception as fq_err:
+                logger.error(f"Follow-up question generation failed: {fq_err}")
+                followup_response = None
+
+            if followup_response:
+                # Save state so next message knows to skip straight to diagnosis
+                _start_followup(session, message, diagnosis['extracted_symptoms'], request.user)
+                return Response({
+                    'response': followup_response,
+                    'session_id': str(session.id),
+                    'awaiting_followup': True,
+                    'diagnosis_saved': False,
+                })
 
         # ── Step 2 – Generate full diagnostic chat response ───────────────────
-        if has_symptoms and diagnosis.get('predicted_disease'):
+        if reply:
+            response_text = reply
+        elif has_symptoms and diagnosis.get('predicted_disease'):
             try:
-                response_text = ai_generator.generate_diagnosis_response(message, diagnosis)
+                response_text = get_ai_generator().generate_diagnosis_response(message, diagnosis)
             except Exception as resp_err:
                 logger.error(f"Diagnosis response generation failed: {resp_err}")
-                response_text = ai_generator.generate_chat_response(
+                response_text = get_ai_generator().generate_chat_response(
                     message=message,
                     context={'language': language}
                 )
         else:
             try:
-                response_text = ai_generator.generate_chat_response(
+                response_text = get_ai_generator().generate_chat_response(
                     message=message,
                     context={'language': language, 'session_id': str(session_id)}
                 )
             except Exception as chat_err:
                 logger.error(f"Chat response generation failed: {chat_err}")
-                response_text = (
-                    "Thank you for your message. I'm here to help with health concerns. "
-                    "Could you describe your symptoms so I can assist you better?"
-                )
+                response_text = CHAT_UNAVAILABLE_REPLY
 
         if not response_text or not response_text.strip():
-            response_text = (
-                "Thank you for your message. I'm experiencing technical difficulties. "
-                "Please consult with our clinic staff for proper evaluation."
-            )
+            response_text = CHAT_ERROR_REPLY
 
         # Step 3 – Save SymptomRecord (same shape as old Rasa flow)
-        record_id = None
-        if has_symptoms and diagnosis.get('predicted_disease'):
-            try:
-                severity_map = {'mild': 1, 'moderate': 2, 'severe': 3}
-                severity_value = diagnosis.get('severity', 'moderate')
-                if isinstance(severity_value, str):
-                    severity_int = severity_map.get(severity_value.lower(), 2)
-                else:
-                    severity_int = int(severity_value) if severity_value else 2
-
-                record = SymptomRecord.objects.create(
-                    student=request.user,
-                    symptoms=diagnosis['extracted_symptoms'],
-                    duration_days=diagnosis.get('duration_days', 1),
-                    severity=severity_int,
-                    predicted_disease=diagnosis['predicted_disease'],
-                    confidence_score=diagnosis.get('confidence_score', 0.0),
-                    top_predictions=diagnosis.get('top_predictions', []),
-                    is_communicable=diagnosis.get('is_communicable', False),
-                    is_acute=diagnosis.get('is_acute', True),
-                    icd10_code=diagnosis.get('icd10_code', ''),
-                )
-
-                record.check_referral_criteria()
-                record.save()
-
-                FollowUp.create_from_symptom(record, days_ahead=3)
-
-                record_id = str(record.id)
-                logger.info(f"Created symptom record {record_id} from Cohere chat diagnosis")
-
-            except Exception as e:
-                logger.error(f"Failed to create symptom record from chat: {e}")
+        record_id = _save_chat_diagnosis(request.user, diagnosis, has_symptoms)
 
         return Response({
             'response': response_text,
@@ -875,7 +1057,7 @@ def send_chat_message(request):
         # if rasa_service.should_use_llm_fallback(rasa_response):
         #     logger.warning(f"Using LLM fallback (Rasa unavailable or low confidence)")
         #     try:
-        #         response_text = ai_generator.generate_chat_response(
+        #         response_text = get_ai_generator().generate_chat_response(
         #             message=message,
         #             context={'language': language, 'session_id': str(session_id), 'rasa_failed': True}
         #         )
@@ -963,12 +1145,115 @@ def send_chat_message(request):
         )
 
 
+def _sse(event, data):
+    """One Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsStudent, HasDataConsent])
+def send_chat_message_stream(request):
+    """
+    Streaming variant of send_chat_message over Server-Sent Events
+    POST /api/chat/message/stream/
+
+    Same request body and conversation flow; the reply text is sent as it
+    arrives from the provider instead of in one JSON blob.
+    Events:
+        token  {"text": "..."}        reply chunks, in order
+        done   {...}                  final payload (same fields as send_chat_message,
+                                      plus the structured diagnosis)
+        error  {"error": "..."}
+    """
+    serializer = ChatMessageSerializer(data=request.data)
+
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    data = serializer.validated_data
+    message = data['message']
+    language = data.get('language', 'english')
+    session_id = data.get('session_id')
+
+    if not session_id:
+        return Response({'error': 'session_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        session = ChatSession.objects.get(id=session_id, student=request.user)
+    except ChatSession.DoesNotExist:
+        return Response({'error': 'Invalid session_id'}, status=status.HTTP_404_NOT_FOUND)
+
+    user = request.user
+
+    def events():
+        try:
+            # Separate calls here: the reply is streamed, a JSON completion cannot be
+            diagnosis, has_symptoms, ask_followup, reply = _chat_turn_diagnosis(session, message)
+            ai_generator = get_ai_generator()
+
+            if reply:
+                # Speculative diagnosis reply, already complete
+                chunks = [reply]
+            elif ask_followup:
+                chunks = ai_generator.stream_followup_questions(diagnosis['extracted_symptoms'], message)
+            elif has_symptoms and diagnosis.get('predicted_disease'):
+                chunks = ai_generator.stream_diagnosis_response(message, diagnosis)
+            else:
+                chunks = ai_generator.stream_chat_response(
+                    message, context={'language': language, 'session_id': str(session_id)}
+                )
+
+            parts = []
+            for chunk in chunks:
+                parts.append(chunk)
+                yield _sse('token', {'text': chunk})
+            response_text = ''.join(parts)
+
+            if ask_followup:
+                _start_followup(session, message, diagnosis['extracted_symptoms'], user)
+                yield _sse('done', {
+                    'response': response_text,
+                    'session_id': str(session.id),
+                    'awaiting_followup': True,
+                    'diagnosis_saved': False,
+                })
+                return
+
+            if not response_text.strip():
+                response_text = CHAT_ERROR_REPLY
+                yield _sse('token', {'text': response_text})
+
+            record_id = _save_chat_diagnosis(user, diagnosis, has_symptoms)
+            yield _sse('done', {
+                'response': response_text,
+                'session_id': str(session_id),
+                'source': 'cohere',
+                'buttons': [],
+                'rasa_available': False,
+                'diagnosis': diagnosis if has_symptoms else None,
+                'record_id': record_id,
+                'diagnosis_saved': record_id is not None,
+            })
+        except Exception as e:
+            logger.error(f"send_chat_message_stream error: {e}")
+            yield _sse('error', {'error': str(e)})
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop reverse proxies from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsStudent, HasDataConsent])
 def generate_insights(request):
     """
     Generate top 3 health insights for current session
     POST /api/chat/insights/
+
+    The LLM call runs in a background job (manage.py run_llm_worker): answers
+    202 with {"job_id", "status", "status_url", "events_url"}; the job result is
+    the list of saved insights. With LLM_JOBS_EAGER the list is returned directly.
     """
     session_id = request.data.get('session_id')
     symptoms = request.data.get('symptoms', [])
@@ -983,38 +1268,19 @@ def generate_insights(request):
     try:
         session = ChatSession.objects.get(id=session_id, student=request.user)
         
-        # Delete old insights for this session
-        HealthInsight.objects.filter(student=request.user, session_id=session_id).delete()
-        
-        # Get ML predictions for context
-        predictor = get_ml_predictor()
-        prediction_results = predictor.predict(symptoms)
-        
-        # Generate new insights using LLM service
-        insights_data = ai_generator.generate_health_insights(
-            symptoms=symptoms,
-            predictions=prediction_results,
-            chat_summary=session.metadata.get('topics_discussed', '')
-        )
+        job = llm_jobs.enqueue('health_insights', {
+            'session_id': str(session.id),
+            'student_id': str(request.user.id),
+            'symptoms': symptoms,
+        }, user=request.user)
         
-        # Save top 3 insights
-        insights = []
-        for insight_data in insights_data[:3]:
-            insight = HealthInsight.objects.create(
-                student=request.user,
-                session_id=session_id,
-                insight_text=insight_data['text'],
-                references=[],  # LLM doesn't provide references yet
-                reliability_score=insight_data['reliability_score']
-            )
-            insights.append(insight)
-        
-        # Update session
-        session.insights_generated_count = len(insights)
-        session.save()
+        # Ran inline (LLM_JOBS_EAGER)
+        if job.status == llm_jobs.SUCCEEDED:
+            return Response(job.result)
+        if job.status == llm_jobs.FAILED:
+            return Response({'error': job.error}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
-        serializer = HealthInsightSerializer(insights, many=True)
-        return Response(serializer.data)
+        return Response(llm_jobs.job_reference(job), status=status.HTTP_202_ACCEPTED)
     
     except ChatSession.DoesNotExist:
         return Response(
@@ -1028,6 +1294,78 @@ def generate_insights(request):
         )
 
 
+def _visible_job(request, job_id):
+    """The job if this requester may see it: its owner, or clinic staff (the only ones to see ownerless jobs)"""
+    job = LLMJob.objects.filter(pk=job_id).first()
+    if job is None:
+        return None
+    if request.user.role == 'staff' or (job.created_by_id and job.created_by_id == request.user.id):
+        return job
+    return None
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def llm_job_status(request, job_id):
+    """
+    Status and result of a queued LLM job
+    GET /api/jobs/<job_id>/
+    """
+    job = _visible_job(request, job_id)
+    if job is None:
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(LLMJobSerializer(job).data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def llm_job_events(request, job_id):
+    """
+    Follow a queued LLM job over Server-Sent Events
+    GET /api/jobs/<job_id>/events/
+
+    Events:
+        status   {"status": "..."}    on every status change
+        done     {...}                the finished job (same fields as /api/jobs/<job_id>/)
+        timeout  {"status": "..."}    still unfinished after LLM_JOB_EVENTS_TIMEOUT seconds;
+                                      reconnect after Retry-After seconds
+
+    The stream holds a worker while it waits, so LLM_JOB_EVENTS_TIMEOUT is kept
+    to a few seconds; EventSource clients reconnect on their own (the stream sets
+    its retry delay), others poll /api/jobs/<job_id>/.
+    """
+    job = _visible_job(request, job_id)
+    if job is None:
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    poll_interval = getattr(settings, 'LLM_JOB_POLL_INTERVAL', 1.0)
+    deadline = time.monotonic() + getattr(settings, 'LLM_JOB_EVENTS_TIMEOUT', 5)
+    retry_after = max(1, round(poll_interval))
+
+    def events():
+        last_status = None
+        while True:
+            job.refresh_from_db()
+            if job.status != last_status:
+                last_status = job.status
+                yield _sse('status', {'status': job.status})
+            if job.is_finished:
+                yield _sse('done', LLMJobSerializer(job).data)
+                return
+            if time.monotonic() >= deadline:
+                yield f"retry: {retry_after * 1000}\n"
+                yield _sse('timeout', {'status': job.status})
+                return
+            time.sleep(poll_interval)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    if not job.is_finished:
+        response['Retry-After'] = str(retry_after)
+    return response
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsStudent])
 def end_chat_session(request):
@@ -1078,47 +1416,42 @@ def clinic_dashboard(request):
     """
     Get clinic dashboard overview with statistics
     GET /api/staff/dashboard/
+    
+    Four queries whatever the number of departments: record counts, students
+    per department, top disease and recent records.
     """
     today = timezone.now().date()
     seven_days_ago = today - timedelta(days=7)
     thirty_days_ago = today - timedelta(days=30)
     
-    # Overall statistics
-    total_students = User.objects.filter(role='student').count()
-    
-    students_today = SymptomRecord.objects.filter(
-        created_at__date=today
-    ).values('student').distinct().count()
-    
-    students_7days = SymptomRecord.objects.filter(
-        created_at__date__gte=seven_days_ago
-    ).values('student').distinct().count()
-    
-    students_30days = SymptomRecord.objects.filter(
-        created_at__date__gte=thirty_days_ago
-    ).values('student').distinct().count()
-    
-    pending_referrals = SymptomRecord.objects.filter(
-        requires_referral=True,
-        referral_triggered=False
-    ).count()
+    # Overall statistics: one pass over the symptom records (conditional aggregation)
+    record_stats = SymptomRecord.objects.aggregate(
+        students_today=Count('student', filter=Q(created_at__date=today), distinct=True),
+        students_7days=Count('student', filter=Q(created_at__date__gte=seven_days_ago), distinct=True),
+        students_30days=Count('student', filter=Q(created_at__date__gte=thirty_days_ago), distinct=True),
+        pending_referrals=Count('id', filter=Q(requires_referral=True, referral_triggered=False)),
+    )
     
-    # Department breakdown - Calculate from real data
-    departments = User.objects.filter(role='student').values_list('department', flat=True).distinct()
+    # Department breakdown - one grouped query whatever the number of departments;
+    # students without a department only count towards the total
+    department_rows = User.objects.filter(role='student').values('department').annotate(
+        total_students=Count('id', distinct=True),
+        students_with_symptoms=Count(
+            'id', filter=Q(symptom_records__created_at__date__gte=thirty_days_ago), distinct=True
+        ),
+    ).order_by()
+    total_students = 0
     dept_breakdown = []
     
-    for dept in departments:
-        if not dept:  # Skip None/empty departments
+    for row in department_rows:
+        total_students += row['total_students']
+        if not row['department']:  # Skip None/empty departments
             continue
-            
-        total_in_dept = User.objects.filter(role='student', department=dept).count()
-        students_with_symptoms = SymptomRecord.objects.filter(
-            student__department=dept,
-            created_at__date__gte=thirty_days_ago
-        ).values('student').distinct().count()
         
+        total_in_dept = row['total_students']
+        students_with_symptoms = row['students_with_symptoms']
         dept_breakdown.append({
-            'department': dept,
+            'department': row['department'],
             'total_students': total_in_dept,
             'students_with_symptoms': students_with_symptoms,
             'percentage': round((students_with_symptoms / total_in_dept * 100), 1) if total_in_dept > 0 else 0
@@ -1142,13 +1475,13 @@ def clinic_dashboard(request):
     # Prepare response
     data = {
         'total_students': total_students,
-        'students_with_symptoms_today': students_today,
-        'students_with_symptoms_7days': students_7days,
-        'students_with_symptoms_30days': students_30days,
+        'students_with_symptoms_today': record_stats['students_today'],
+        'students_with_symptoms_7days': record_stats['students_7days'],
+        'students_with_symptoms_30days': record_stats['students_30days'],
         'top_insight': top_insight,
         'department_breakdown': dept_breakdown,
         'recent_symptoms': SymptomRecordSerializer(recent_symptoms, many=True).data,
-        'pending_referrals': pending_referrals
+        'pending_referrals': record_stats['pending_referrals']
     }
     
     return Response(data)
@@ -3,6 +3,7 @@ pytest configuration for Django tests
 """
 import os
 import django
+import pytest
 from django.conf import settings
 
 # Configure Django settings before any tests run
@@ -51,3 +52,19 @@ def pytest_configure():
             USE_TZ=True,
         )
         django.setup()
+
+
+@pytest.fixture(autouse=True)
+def llm_response_cache(settings):
+    """Fresh in-memory LLM response cache, breaker / rate limit state and event counts per test"""
+    settings.CACHES = {
+        **settings.CACHES,
+        'llm': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'llm-tests'},
+        'llm_state': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'llm-state-tests'},
+    }
+    from django.core.cache import caches
+    caches['llm'].clear()
+    caches['llm_state'].clear()
+    from clinic import llm_metrics
+    llm_metrics.clear()
+    yield
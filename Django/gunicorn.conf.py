@@ -1,6 +1,9 @@
 """Gunicorn configuration for Azure App Service."""
+import gc
 import multiprocessing
 import os
+import resource
+import time
 
 # Server socket
 bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
@@ -13,6 +16,10 @@ worker_connections = 1000
 timeout = 300
 keepalive = 2
 
+# Load Django and the ML model once in the master, then fork workers that share
+# the model pages copy-on-write (set GUNICORN_PRELOAD=False to load per worker)
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+
 # Logging
 accesslog = '-'
 errorlog = '-'
@@ -33,3 +40,61 @@ tmp_upload_dir = None
 # SSL (handled by Azure)
 keyfile = None
 certfile = None
+
+
+# Worker lifecycle hooks
+def _memory_usage():
+    """Resident / proportional / private memory of this process in MB"""
+    usage = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('Rss', 'Pss', 'Private_Clean', 'Private_Dirty'):
+                    usage[key] = int(value.split()[0]) / 1024
+    except OSError:
+        # Non-Linux: only peak RSS is available (kilobytes on Linux, bytes on macOS)
+        usage['Rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return usage
+
+
+def _format_memory(usage):
+    private = usage.get('Private_Clean', 0) + usage.get('Private_Dirty', 0)
+    if 'Pss' not in usage:
+        return f"peak RSS {usage['Rss']:.1f} MB"
+    return f"RSS {usage['Rss']:.1f} MB, PSS {usage['Pss']:.1f} MB, private {private:.1f} MB"
+
+
+def _load_models():
+    # LLM SDK clients hold network connection pools, so they are never created in
+    # the master - each worker builds its own AIInsightGenerator on first use
+    from django.db import connections
+    from clinic.ml_service import get_ml_predictor
+    get_ml_predictor()
+    # Disease overrides were read from the DB; workers must not inherit that connection
+    connections.close_all()
+
+
+def when_ready(server):
+    if preload_app:
+        started = time.monotonic()
+        _load_models()
+        # Keep the garbage collector from touching (and un-sharing) preloaded objects
+        gc.freeze()
+        server.log.info(
+            f"[OK] ML model preloaded in master in {(time.monotonic() - started) * 1000:.0f} ms "
+            f"({_format_memory(_memory_usage())})"
+        )
+
+
+def post_fork(server, worker):
+    worker.boot_started = time.monotonic()
+
+
+def post_worker_init(worker):
+    if not preload_app:
+        _load_models()
+    worker.log.info(
+        f"[OK] Worker {worker.pid} booted in {(time.monotonic() - worker.boot_started) * 1000:.0f} ms "
+        f"({_format_memory(_memory_usage())})"
+    )
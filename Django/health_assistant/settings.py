@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -246,6 +247,18 @@ else:
 
 ML_MODEL_PATH = _ml_base / 'models' / 'disease_predictor_v2.pkl'
 ML_DATASETS_PATH = _ml_base / 'Datasets' / 'active'
+# Severity / descriptions / precautions / classification, compiled by manage.py compile_disease_metadata
+ML_METADATA_PATH = ML_DATASETS_PATH / 'disease_metadata.json'
+# Use the NumPy-compiled model (ML_MODEL_PATH with .npz suffix) when it is present and fresh
+ML_USE_COMPILED_MODEL = os.getenv('ML_USE_COMPILED_MODEL', 'True') == 'True'
+# Memory-map the compiled model's arrays so all gunicorn workers share one copy
+ML_MMAP_MODEL = os.getenv('ML_MMAP_MODEL', 'True') == 'True'
+# LRU cache of predictions per canonical symptom set (0 disables)
+ML_PREDICTION_CACHE_SIZE = int(os.getenv('ML_PREDICTION_CACHE_SIZE', '1024'))
+# Workers poll the model registry / files at most every ML_MODEL_CHECK_INTERVAL seconds
+# and swap in a newly published model in the background (manage.py publish_model)
+ML_MODEL_HOT_RELOAD = os.getenv('ML_MODEL_HOT_RELOAD', 'True') == 'True'
+ML_MODEL_CHECK_INTERVAL = float(os.getenv('ML_MODEL_CHECK_INTERVAL', '5'))
 
 # LLM API Configuration
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
@@ -253,6 +266,134 @@ OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY')
 GROQ_API_KEY = os.getenv('GROQ_API_KEY')
 COHERE_API_KEY = os.getenv('COHERE_API_KEY')
 
+# Keep-alive connection pools per LLM provider (clinic/llm_http.py); unset keys use the defaults there
+_llm_max_connections = int(os.getenv('LLM_HTTP_MAX_CONNECTIONS', '10'))
+LLM_HTTP_POOLS = {
+    'cohere': {'max_connections': _llm_max_connections},
+    'openrouter': {'max_connections': _llm_max_connections},
+    'groq': {'max_connections': _llm_max_connections},
+    'gemini': {'max_connections': 5},
+}
+
+# Provider routing (clinic/llm_routing.py). Hedging races a slow provider against the
+# next one after its p95 latency; off by default since it spends free-tier quota.
+LLM_HEDGING_ENABLED = os.getenv('LLM_HEDGING_ENABLED', 'False') == 'True'
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv('LLM_HEDGE_DEFAULT_DELAY', '2.0'))  # seconds, until p95 is known
+LLM_HEDGE_DELAY_BOUNDS = (0.5, 10.0)
+LLM_PROVIDER_TIMEOUT = 30
+# Reorder providers by observed latency / error rate once each has this many calls (0 = fixed order)
+LLM_ADAPTIVE_ORDER_MIN_SAMPLES = int(os.getenv('LLM_ADAPTIVE_ORDER_MIN_SAMPLES', '20'))
+
+# Per-provider circuit breakers, state shared through the 'llm_state' cache (clinic/llm_breaker.py)
+LLM_CIRCUIT_BREAKER_ENABLED = os.getenv('LLM_CIRCUIT_BREAKER_ENABLED', 'True') == 'True'
+LLM_CIRCUIT_WINDOW = 60         # seconds of calls the error rate is measured over
+LLM_CIRCUIT_MIN_CALLS = 5       # calls in the window before the circuit can open
+LLM_CIRCUIT_ERROR_RATE = 0.5    # failure ratio that opens the circuit
+LLM_CIRCUIT_SLOW_CALL = 15      # seconds; slower calls count as failures
+LLM_CIRCUIT_COOLDOWN = int(os.getenv('LLM_CIRCUIT_COOLDOWN', '60'))  # seconds before a half-open probe
+
+# Chat turns ask a JSON-mode provider for diagnosis and reply in one completion;
+# False (or no Cohere/Groq/Gemini key) keeps the separate extraction + reply calls
+LLM_COMBINED_CHAT_TURN = os.getenv('LLM_COMBINED_CHAT_TURN', 'True') == 'True'
+
+# LLM call instrumentation (clinic/llm_metrics.py): per-process ring buffer,
+# aggregated into the llm_call_stats table for the API analytics page
+LLM_METRICS_ENABLED = os.getenv('LLM_METRICS_ENABLED', 'True') == 'True'
+LLM_METRICS_BUFFER_SIZE = 2000      # calls kept in memory per worker
+LLM_METRICS_FLUSH_INTERVAL = int(os.getenv('LLM_METRICS_FLUSH_INTERVAL', '60'))  # seconds
+
+# Which LLM providers each AIInsightGenerator method tries, in order, and with
+# which parameters (clinic/llm_providers.py); an entry is merged over 'default'.
+# Cohere is most reliable for global deployments, Gemini is only configured in
+# local development
+LLM_ROUTING = {
+    'default': {
+        'providers': ['cohere', 'openrouter', 'groq', 'gemini'],
+        'temperature': 0.6, 'max_tokens': 500, 'timeout': 30,
+    },
+    'chat': {'options': {'groq': {'max_tokens': 1024, 'top_p': 0.95}}},
+    'insights': {'temperature': 0.5, 'max_tokens': 800},
+    # Groq before OpenRouter: fast, but 403 from some Azure regions
+    'validation': {'providers': ['cohere', 'groq', 'openrouter', 'gemini'], 'temperature': 0.3},
+    'extract_and_predict': {'providers': ['cohere', 'openrouter', 'groq'], 'temperature': 0.3, 'max_tokens': 600},
+    # One JSON answer per chat turn: only providers with a JSON output mode
+    'chat_turn': {'temperature': 0.3, 'max_tokens': 900, 'json_mode': True},
+    'followup': {'providers': ['cohere', 'openrouter'], 'max_tokens': 150, 'timeout': 20},
+}
+
+# Free-tier budgets per provider (clinic/llm_ratelimit.py), counted per minute in the
+# 'llm_state' cache; a provider without capacity is skipped before calling it
+LLM_RATE_LIMIT_ENABLED = os.getenv('LLM_RATE_LIMIT_ENABLED', 'True') == 'True'
+LLM_RATE_LIMITS = {
+    'cohere': {'rpm': 20},                      # trial key
+    'openrouter': {'rpm': 20},                  # :free models
+    'groq': {'rpm': 30, 'tpm': 6000},           # llama-3.1-8b-instant
+    'gemini': {'rpm': 15, 'tpm': 250000},       # gemini-2.5-flash-lite
+}
+LLM_RATE_LIMIT_MAX_WAIT = 2.0   # seconds a call may wait when every provider is at its limit
+
+# Identical LLM requests in flight at the same time share one provider call
+# (clinic/llm_coalesce.py); LLM_COALESCE_SHARED extends this across workers
+# through the llm_inflight_requests table
+LLM_COALESCE_ENABLED = os.getenv('LLM_COALESCE_ENABLED', 'True') == 'True'
+LLM_COALESCE_SHARED = os.getenv('LLM_COALESCE_SHARED', 'False') == 'True'
+LLM_COALESCE_TIMEOUT = 45          # seconds a waiter waits before calling itself
+LLM_COALESCE_POLL_INTERVAL = 0.1   # seconds between checks of another worker's request
+LLM_COALESCE_RESULT_TTL = 5        # seconds a finished request's result stays readable
+
+# Send every LLM call to a local stand-in server that replays recorded answers
+# (clinic/llm_standin.py, `python manage.py run_llm_standin`); for load tests only
+LLM_STANDIN_URL = os.getenv('LLM_STANDIN_URL', '')
+
+# Worker startup import budget for `python manage.py check_import_time` (the
+# provider SDKs are imported on first use, see clinic/llm_sdk.py)
+IMPORT_TIME_BUDGET_MS = int(os.getenv('IMPORT_TIME_BUDGET_MS', '1200'))
+
+# Independent LLM calls run in parallel (AIInsightGenerator.run_concurrently)
+LLM_FAN_OUT_WORKERS = 8         # threads per process
+LLM_FAN_OUT_TIMEOUT = 45        # seconds; shared deadline, below the Rasa action's 60s timeout
+
+# Diagnose a complaint in the background while the student answers the
+# follow-up questions (clinic/llm_speculation.py); needs the job worker below
+LLM_SPECULATIVE_DIAGNOSIS = os.getenv('LLM_SPECULATIVE_DIAGNOSIS', 'True') == 'True'
+
+# Background LLM jobs (clinic/llm_jobs.py), run by `manage.py run_llm_worker`.
+# LLM_JOBS_EAGER runs them inside the request instead (no worker process needed)
+LLM_JOBS_EAGER = os.getenv('LLM_JOBS_EAGER', 'False') == 'True'
+LLM_JOB_TIMEOUT = 300           # seconds before a running job counts as abandoned
+LLM_JOB_MAX_ATTEMPTS = 2
+LLM_JOB_POLL_INTERVAL = 1.0     # seconds between queue / status checks
+LLM_JOB_EVENTS_TIMEOUT = 5      # seconds an /events/ stream waits for the result (holds a worker)
+
+# LLM response cache (clinic/llm_cache.py): file-based so all workers on a host share it
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'True') == 'True'
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', str(24 * 3600)))  # seconds
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'llm': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('LLM_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'cpsu-llm-cache')),
+        'TIMEOUT': LLM_CACHE_TTL,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('LLM_CACHE_MAX_ENTRIES', '5000')),
+            'CULL_FREQUENCY': 4,  # drop a quarter of the entries when full
+        },
+    },
+    # Circuit breaker and rate limit counters shared by every worker (atomic add/incr
+    # on each LLM call). The llm_state_cache table by default (`manage.py createcachetable`,
+    # run by startup.sh); LLM_STATE_REDIS_URL keeps them in Redis instead
+    'llm_state': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('LLM_STATE_REDIS_URL'),
+    } if os.getenv('LLM_STATE_REDIS_URL') else {
+        'BACKEND': 'clinic.cache_backends.AtomicDatabaseCache',
+        'LOCATION': 'llm_state_cache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
 # Rasa Configuration
 RASA_ENABLED = os.getenv('RASA_ENABLED', 'True') == 'True'
 RASA_SERVER_URL = os.getenv('RASA_SERVER_URL', 'http://localhost:5005')
@@ -37,7 +37,9 @@ fi
 
 echo "📂 Found ML folder"
 echo "   - models/disease_predictor_v2.pkl"
+echo "   - models/disease_predictor_v2.npz (compiled)"
 echo "   - Datasets/active/*.csv"
+echo "   - Datasets/active/disease_metadata.json (compiled)"
 echo ""
 
 # Create zip of ML folder
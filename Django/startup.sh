@@ -18,6 +18,25 @@ python manage.py collectstatic --noinput 2>/dev/null || true
 echo "Running migrations..."
 python manage.py migrate --noinput 2>/dev/null || true
 
+echo "Creating cache tables (LLM circuit breakers and rate limits)..."
+python manage.py createcachetable 2>/dev/null || true
+
+# Background LLM jobs (insights, speculative diagnosis) need a worker process.
+# It is restarted whenever it exits; set LLM_JOBS_EAGER=True to run the jobs
+# inside the requests instead (slower responses, no worker to keep alive).
+if [ "$LLM_JOBS_EAGER" = "True" ]; then
+    echo "LLM_JOBS_EAGER=True - not starting the LLM job worker"
+else
+    echo "Starting LLM job worker..."
+    (
+        while true; do
+            python manage.py run_llm_worker
+            echo "LLM job worker exited with status $? - restarting in 5 seconds"
+            sleep 5
+        done
+    ) &
+fi
+
 echo "Starting Gunicorn..."
 gunicorn health_assistant.wsgi:application \
     --bind 0.0.0.0:8000 \
@@ -0,0 +1,124 @@
+"""
+Export a trained tree ensemble into contiguous NumPy node arrays
+The Django backend (clinic/tree_engine.py) evaluates the exported .npz with
+plain NumPy, so the web path never has to import scikit-learn.
+
+Usage:
+    python export_compiled_model.py [path/to/disease_predictor_v2.pkl]
+"""
+
+import hashlib
+import pickle
+import sys
+from pathlib import Path
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+
+
+def file_sha256(path):
+    """Checksum of the source pickle, stored so stale exports can be detected"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def flatten_trees(trees, leaf_value_fn):
+    """Concatenate sklearn Tree objects into one set of node arrays with absolute indices"""
+    feature, threshold, left, right, leaf_index, roots = [], [], [], [], [], []
+    leaf_values = []
+    offset = 0
+    n_leaves = 0
+    max_depth = 0
+
+    for tree in trees:
+        is_leaf = tree.children_left == -1
+        roots.append(offset)
+        max_depth = max(max_depth, tree.max_depth)
+
+        feature.append(np.where(is_leaf, -2, tree.feature).astype(np.int32))
+        threshold.append(tree.threshold.astype(np.float64))
+        left.append(np.where(is_leaf, -1, tree.children_left + offset).astype(np.int32))
+        right.append(np.where(is_leaf, -1, tree.children_right + offset).astype(np.int32))
+
+        tree_leaf_index = np.full(tree.node_count, -1, dtype=np.int32)
+        tree_leaf_index[is_leaf] = np.arange(n_leaves, n_leaves + is_leaf.sum(), dtype=np.int32)
+        leaf_index.append(tree_leaf_index)
+        leaf_values.append(leaf_value_fn(tree)[is_leaf])
+
+        n_leaves += int(is_leaf.sum())
+        offset += tree.node_count
+
+    return {
+        'feature': np.concatenate(feature),
+        'threshold': np.concatenate(threshold),
+        'left': np.concatenate(left),
+        'right': np.concatenate(right),
+        'leaf_index': np.concatenate(leaf_index),
+        'leaf_values': np.concatenate(leaf_values),
+        'roots': np.array(roots, dtype=np.int32),
+        'max_depth': np.int32(max_depth),
+    }
+
+
+def forest_leaf_proba(tree):
+    """Per-node class probabilities (normalized, as DecisionTreeClassifier.predict_proba)"""
+    value = tree.value[:, 0, :].astype(np.float64)
+    totals = value.sum(axis=1, keepdims=True)
+    totals[totals == 0] = 1.0
+    return value / totals
+
+
+def gbdt_leaf_score(tree):
+    """Per-node raw regression output of a boosting stage"""
+    return tree.value[:, 0, :1].astype(np.float64)
+
+
+def export_compiled_model(model, feature_names, output_path, source_path=None):
+    """
+    Flatten a RandomForest or GradientBoosting classifier to a .npz artifact.
+    Returns the output path, or None if the model type cannot be compiled (e.g. SVC).
+    """
+    if isinstance(model, RandomForestClassifier):
+        arrays = flatten_trees([est.tree_ for est in model.estimators_], forest_leaf_proba)
+        arrays['kind'] = np.array('forest')
+    elif isinstance(model, GradientBoostingClassifier):
+        stages = model.estimators_
+        arrays = flatten_trees([est.tree_ for stage in stages for est in stage], gbdt_leaf_score)
+        arrays['kind'] = np.array('gbdt')
+        arrays['init_raw'] = model._raw_predict_init(np.zeros((1, len(feature_names))))[0]
+        arrays['learning_rate'] = np.float64(model.learning_rate)
+        arrays['trees_per_stage'] = np.int32(stages.shape[1])
+    else:
+        print(f"[WARNING] {type(model).__name__} is not a tree ensemble - skipping compiled export")
+        return None
+
+    arrays['classes'] = np.array([str(c) for c in model.classes_])
+    arrays['feature_names'] = np.array(feature_names)
+    arrays['source_sha256'] = np.array(file_sha256(source_path) if source_path else '')
+
+    output_path = Path(output_path)
+    np.savez(output_path, **arrays)
+    print(f"[OK] Compiled model exported to {output_path} "
+          f"({len(arrays['feature'])} nodes, {len(arrays['leaf_values'])} leaves)")
+    return output_path
+
+
+def main():
+    model_path = Path(sys.argv[1] if len(sys.argv) > 1 else '../models/disease_predictor_v2.pkl')
+
+    with open(model_path, 'rb') as f:
+        model_data = pickle.load(f)
+
+    export_compiled_model(
+        model_data['model'],
+        model_data['feature_names'],
+        model_path.with_suffix('.npz'),
+        source_path=model_path,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,8 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, classification_report
 import pickle
 import warnings
+from pathlib import Path
+from export_compiled_model import export_compiled_model
 warnings.filterwarnings('ignore')
 
 def add_realistic_noise(X, noise_level=0.05):
@@ -126,6 +128,9 @@ def save_model(model, feature_names, model_name='../models/disease_predictor_v2.
         pickle.dump(model_data, f)
     
     print(f"[OK] Model saved successfully!")
+    
+    # Flatten tree ensembles for the NumPy-only inference engine used by Django
+    export_compiled_model(model, feature_names, Path(model_name).with_suffix('.npz'), source_path=model_name)
 
 def main():
     print("="*60)
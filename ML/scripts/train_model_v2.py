@@ -12,6 +12,8 @@ from sklearn.svm import SVC
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 import pickle
 import warnings
+from pathlib import Path
+from export_compiled_model import export_compiled_model
 warnings.filterwarnings('ignore')
 
 def load_and_prepare_data():
@@ -151,6 +153,9 @@ def save_model(model, feature_names, model_name='../models/disease_predictor_v2.
         pickle.dump(model_data, f)
     
     print(f"Model saved successfully!")
+    
+    # Flatten tree ensembles for the NumPy-only inference engine used by Django
+    export_compiled_model(model, feature_names, Path(model_name).with_suffix('.npz'), source_path=model_name)
 
 def main():
     print("="*60)
@@ -7,6 +7,7 @@ from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.events import SlotSet
 import requests
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +15,11 @@ logger = logging.getLogger(__name__)
 DJANGO_BASE_URL = "http://localhost:8000"
 DJANGO_ML_ENDPOINT = f"{DJANGO_BASE_URL}/api/rasa/predict/"
 
+# The LLM review of a prediction runs as a Django background job; how long to
+# wait for it (seconds) before answering with the ML result alone
+LLM_REVIEW_WAIT = 50
+LLM_REVIEW_POLL_INTERVAL = 1.0
+
 # Emergency symptoms that require immediate attention
 EMERGENCY_SYMPTOMS = [
     'chest_pain', 'severe_chest_pain', 'difficulty_breathing', 'breathlessness',
@@ -54,6 +60,38 @@ class ActionExtractSymptoms(Action):
         return [SlotSet("symptoms", all_symptoms)]
 
 
+def follow_llm_review(data: Dict[Text, Any]) -> Dict[Text, Any]:
+    """
+    Merge the queued LLM review ("llm_review" in the prediction response) into
+    the prediction once its job has finished. The prediction is returned
+    unchanged if the job fails or is still running after LLM_REVIEW_WAIT seconds.
+    """
+    review = data.get('llm_review')
+    if not review:
+        return data
+    
+    deadline = time.monotonic() + LLM_REVIEW_WAIT
+    while time.monotonic() < deadline:
+        try:
+            response = requests.get(f"{DJANGO_BASE_URL}{review['status_url']}", timeout=10)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Could not poll LLM review {review['job_id']}: {e}")
+            return data
+        if response.status_code != 200:
+            logger.warning(f"LLM review {review['job_id']}: {response.status_code}")
+            return data
+        job = response.json()
+        if job.get('status') == 'succeeded':
+            return {**data, **(job.get('result') or {})}
+        if job.get('status') == 'failed':
+            logger.warning(f"LLM review {review['job_id']} failed: {job.get('error')}")
+            return data
+        time.sleep(LLM_REVIEW_POLL_INTERVAL)
+    
+    logger.warning(f"LLM review {review['job_id']} not finished after {LLM_REVIEW_WAIT}s")
+    return data
+
+
 class ActionPredictDisease(Action):
     """Call Django ML API to predict disease from symptoms"""
     
@@ -85,11 +123,11 @@ class ActionPredictDisease(Action):
                     "sender_id": sender_id,
                     "generate_insights": True  # Enable ML+LLM hybrid validation for reliable output
                 },
-                timeout=60  # Increased timeout for ML + LLM validation
+                timeout=15  # ML only: the LLM validation is queued and followed below
             )
             
             if response.status_code == 200:
-                data = response.json()
+                data = follow_llm_review(response.json())
                 
                 predicted_disease = data.get('predicted_disease', 'Unknown')
                 confidence = data.get('confidence', 0.0)